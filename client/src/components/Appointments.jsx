@@ -2,15 +2,19 @@ import { useState, useEffect } from 'react';
 import { useAuth } from '../contexts/AuthContext';
 import api from '../services/api';
 import { Icons, UserAvatar } from './Icons';
+import PatientPicker from './PatientPicker';
 import './Appointments.css';
 import './Modal.css';
 
 export default function Appointments() {
   const { user } = useAuth();
   const [appointments, setAppointments] = useState([]);
-  const [patients, setPatients] = useState([]);
+  const [patientName, setPatientName] = useState('');
+  const [stats, setStats] = useState(null);
   const [doctors, setDoctors] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [showModal, setShowModal] = useState(false);
   const [modalMode, setModalMode] = useState('create');
@@ -34,35 +38,45 @@ export default function Appointments() {
 
   useEffect(() => {
     fetchAppointments();
-    fetchPatients();
+    fetchStats();
     fetchDoctors();
   }, []);
 
-  const fetchAppointments = async () => {
+  const fetchAppointments = async (cursor = null) => {
     try {
-      setLoading(true);
-      const response = await api.get('/appointments/');
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
+      const response = await api.get('/appointments/', { params: cursor ? { cursor } : {} });
       if (response.data.success) {
-        setAppointments(response.data.appointments);
+        setAppointments((prev) => (cursor ? [...prev, ...response.data.appointments] : response.data.appointments));
+        setNextCursor(response.data.next_cursor || null);
       }
     } catch (err) {
       setError(err.response?.data?.message || 'Failed to fetch appointments');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
-  const fetchPatients = async () => {
+  // Card counts cover every appointment, not just the pages loaded
+  const fetchStats = async () => {
     try {
-      const response = await api.get('/patients/');
+      const response = await api.get('/appointments/stats');
       if (response.data.success) {
-        setPatients(response.data.patients);
+        setStats(response.data.stats);
       }
     } catch (err) {
-      console.error('Failed to fetch patients:', err);
+      console.error('Failed to fetch appointment stats:', err);
     }
   };
 
+  const statusCount = (status) =>
+    (stats?.by_status || []).filter(s => !status || s.status === status).reduce((sum, s) => sum + s.count, 0);
+
   const fetchDoctors = async () => {
     try {
       const response = await api.get('/users/doctors');
@@ -80,6 +94,7 @@ export default function Appointments() {
     setCurrentAppointment(appointment);
     
     if (mode === 'edit' && appointment) {
+      setPatientName(appointment.patient_name || '');
       setFormData({
         patient_id: appointment.patient_id || '',
         doctor_id: appointment.doctor_id || '',
@@ -90,6 +105,7 @@ export default function Appointments() {
         notes: appointment.notes || ''
       });
     } else {
+      setPatientName('');
       setFormData({
         patient_id: '',
         doctor_id: '',
@@ -119,12 +135,14 @@ export default function Appointments() {
         const response = await api.post('/appointments/', formData);
         if (response.data.success) {
           fetchAppointments();
+          fetchStats();
           handleCloseModal();
         }
       } else {
         const response = await api.put(`/appointments/${currentAppointment.appointment_id}`, formData);
         if (response.data.success) {
           fetchAppointments();
+          fetchStats();
           handleCloseModal();
         }
       }
@@ -138,6 +156,7 @@ export default function Appointments() {
       const response = await api.delete(`/appointments/${appointmentToDelete.appointment_id}`);
       if (response.data.success) {
         fetchAppointments();
+        fetchStats();
         setShowDeleteConfirm(false);
         setAppointmentToDelete(null);
       }
@@ -201,7 +220,7 @@ export default function Appointments() {
           <div className="stat-icon-wrapper">{Icons.calendar}</div>
           <div className="stat-content">
             <div className="stat-label">Total Appointments</div>
-            <div className="stat-value">{appointments.length}</div>
+            <div className="stat-value">{stats ? statusCount() : '-'}</div>
           </div>
         </div>
         <div className="stat-card">
@@ -209,7 +228,7 @@ export default function Appointments() {
           <div className="stat-content">
             <div className="stat-label">Scheduled</div>
             <div className="stat-value">
-              {appointments.filter(a => a.status === 'Scheduled').length}
+              {stats ? statusCount('Scheduled') : '-'}
             </div>
           </div>
         </div>
@@ -306,6 +325,18 @@ export default function Appointments() {
         </table>
       </div>
 
+      {nextCursor && (
+        <div className="load-more">
+          <button
+            className="btn-secondary"
+            onClick={() => fetchAppointments(nextCursor)}
+            disabled={loadingMore}
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
+
       {/* Create/Edit Modal */}
       {showModal && (
         <div className="modal-overlay" onClick={handleCloseModal}>
@@ -320,18 +351,15 @@ export default function Appointments() {
                 <div className="form-grid">
                   <div className="form-group">
                     <label>Patient *</label>
-                    <select
+                    <PatientPicker
                       value={formData.patient_id}
-                      onChange={(e) => setFormData({...formData, patient_id: e.target.value})}
+                      selectedName={patientName}
+                      onChange={(patientId, name) => {
+                        setFormData({...formData, patient_id: patientId});
+                        setPatientName(name);
+                      }}
                       required
-                    >
-                      <option value="">Select Patient</option>
-                      {patients.map(p => (
-                        <option key={p.patient_id} value={p.patient_id}>
-                          {p.first_name} {p.last_name}
-                        </option>
-                      ))}
-                    </select>
+                    />
                   </div>
                   
                   <div className="form-group">
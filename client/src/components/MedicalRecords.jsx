@@ -2,15 +2,18 @@ import { useState, useEffect } from 'react';
 import { useAuth } from '../contexts/AuthContext';
 import api from '../services/api';
 import { Icons, UserAvatar } from './Icons';
+import PatientPicker from './PatientPicker';
 import './MedicalRecords.css';
 import './Modal.css';
 
 export default function MedicalRecords() {
   const { user } = useAuth();
   const [records, setRecords] = useState([]);
-  const [patients, setPatients] = useState([]);
+  const [patientName, setPatientName] = useState('');
   const [doctors, setDoctors] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [showModal, setShowModal] = useState(false);
   const [modalMode, setModalMode] = useState('create');
@@ -34,32 +37,26 @@ export default function MedicalRecords() {
 
   useEffect(() => {
     fetchRecords();
-    fetchPatients();
     fetchDoctors();
   }, []);
 
-  const fetchRecords = async () => {
+  const fetchRecords = async (cursor = null) => {
     try {
-      setLoading(true);
-      const response = await api.get('/medical-records/');
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
+      const response = await api.get('/medical-records/', { params: cursor ? { cursor } : {} });
       if (response.data.success) {
-        setRecords(response.data.records);
+        setRecords((prev) => (cursor ? [...prev, ...response.data.records] : response.data.records));
+        setNextCursor(response.data.next_cursor || null);
       }
     } catch (err) {
       setError(err.response?.data?.message || 'Failed to fetch medical records');
     } finally {
       setLoading(false);
-    }
-  };
-
-  const fetchPatients = async () => {
-    try {
-      const response = await api.get('/patients/');
-      if (response.data.success) {
-        setPatients(response.data.patients);
-      }
-    } catch (err) {
-      console.error('Failed to fetch patients:', err);
+      setLoadingMore(false);
     }
   };
 
@@ -80,6 +77,7 @@ export default function MedicalRecords() {
     setCurrentRecord(record);
     
     if (mode === 'edit' && record) {
+      setPatientName(record.patient_name || '');
       setFormData({
         patient_id: record.patient_id || '',
         doctor_id: record.doctor_id || '',
@@ -90,6 +88,7 @@ export default function MedicalRecords() {
         record_date: record.record_date || ''
       });
     } else {
+      setPatientName('');
       setFormData({
         patient_id: '',
         doctor_id: user?.role_name === 'Doctor' ? user.user_id : '',
@@ -190,8 +189,8 @@ export default function MedicalRecords() {
         <div className="stat-card">
           <div className="stat-icon-wrapper">{Icons.clipboard}</div>
           <div className="stat-content">
-            <div className="stat-label">Total Records</div>
-            <div className="stat-value">{records.length}</div>
+            <div className="stat-label">Records Loaded</div>
+            <div className="stat-value">{records.length}{nextCursor ? '+' : ''}</div>
           </div>
         </div>
         <div className="stat-card">
@@ -282,6 +281,18 @@ export default function MedicalRecords() {
         </table>
       </div>
 
+      {nextCursor && (
+        <div className="load-more">
+          <button
+            className="btn-secondary"
+            onClick={() => fetchRecords(nextCursor)}
+            disabled={loadingMore}
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
+
       {/* Create/Edit Modal */}
       {showModal && (
         <div className="modal-overlay" onClick={handleCloseModal}>
@@ -296,18 +307,15 @@ export default function MedicalRecords() {
                 <div className="form-grid">
                   <div className="form-group">
                     <label>Patient *</label>
-                    <select
+                    <PatientPicker
                       value={formData.patient_id}
-                      onChange={(e) => setFormData({...formData, patient_id: e.target.value})}
+                      selectedName={patientName}
+                      onChange={(patientId, name) => {
+                        setFormData({...formData, patient_id: patientId});
+                        setPatientName(name);
+                      }}
                       required
-                    >
-                      <option value="">Select Patient</option>
-                      {patients.map(p => (
-                        <option key={p.patient_id} value={p.patient_id}>
-                          {p.first_name} {p.last_name}
-                        </option>
-                      ))}
-                    </select>
+                    />
                   </div>
                   
                   <div className="form-group">
@@ -0,0 +1,73 @@
+import { useEffect, useState } from 'react';
+import api from '../services/api';
+
+// Patient type-ahead for forms. /patients/ is paged (newest first), so the
+// options come from /patients/search instead of a preloaded list.
+export default function PatientPicker({ value, selectedName, onChange, required }) {
+  const [query, setQuery] = useState('');
+  const [results, setResults] = useState([]);
+  const [searching, setSearching] = useState(false);
+
+  useEffect(() => {
+    const q = query.trim();
+    if (q.length < 2) {
+      setResults([]);
+      return undefined;
+    }
+    let cancelled = false;
+    const timer = setTimeout(async () => {
+      setSearching(true);
+      try {
+        const response = await api.get('/patients/search', { params: { q, limit: 20 } });
+        if (!cancelled && response.data.success) {
+          setResults(response.data.patients);
+        }
+      } catch (err) {
+        if (!cancelled) console.error('Failed to search patients:', err);
+      } finally {
+        if (!cancelled) setSearching(false);
+      }
+    }, 250);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [query]);
+
+  // The current patient stays selectable when the search does not return it
+  const options = results.map(p => ({
+    patient_id: String(p.patient_id),
+    name: `${p.first_name} ${p.last_name}${p.date_of_birth ? ` (${p.date_of_birth})` : ''}`
+  }));
+  if (value && !options.some(p => p.patient_id === String(value))) {
+    options.unshift({ patient_id: String(value), name: selectedName || `Patient #${value}` });
+  }
+
+  return (
+    <>
+      <input
+        type="search"
+        placeholder="Search by name (at least 2 letters)"
+        value={query}
+        onChange={(e) => setQuery(e.target.value)}
+      />
+      <select
+        value={value ? String(value) : ''}
+        onChange={(e) => {
+          const option = options.find(p => p.patient_id === e.target.value);
+          onChange(e.target.value, option ? option.name : '');
+        }}
+        required={required}
+      >
+        <option value="">
+          {searching ? 'Searching...' : options.length ? 'Select Patient' : 'Type a name to find a patient'}
+        </option>
+        {options.map(p => (
+          <option key={p.patient_id} value={p.patient_id}>
+            {p.name}
+          </option>
+        ))}
+      </select>
+    </>
+  );
+}
@@ -9,6 +9,8 @@ export default function Patients() {
   const { user } = useAuth();
   const [patients, setPatients] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [error, setError] = useState('');
   const [showModal, setShowModal] = useState(false);
   const [modalMode, setModalMode] = useState('create');
@@ -34,17 +36,23 @@ export default function Patients() {
     fetchPatients();
   }, []);
 
-  const fetchPatients = async () => {
+  const fetchPatients = async (cursor = null) => {
     try {
-      setLoading(true);
-      const response = await api.get('/patients/');
+      if (cursor) {
+        setLoadingMore(true);
+      } else {
+        setLoading(true);
+      }
+      const response = await api.get('/patients/', { params: cursor ? { cursor } : {} });
       if (response.data.success) {
-        setPatients(response.data.patients);
+        setPatients((prev) => (cursor ? [...prev, ...response.data.patients] : response.data.patients));
+        setNextCursor(response.data.next_cursor || null);
       }
     } catch (err) {
       setError(err.response?.data?.message || 'Failed to fetch patients');
     } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
@@ -163,8 +171,8 @@ export default function Patients() {
         <div className="stat-card">
           <div className="stat-icon-wrapper">{Icons.users}</div>
           <div className="stat-content">
-            <div className="stat-label">Total Patients</div>
-            <div className="stat-value">{patients.length}</div>
+            <div className="stat-label">Patients Loaded</div>
+            <div className="stat-value">{patients.length}{nextCursor ? '+' : ''}</div>
           </div>
         </div>
         <div className="stat-card">
@@ -257,6 +265,18 @@ export default function Patients() {
         </table>
       </div>
 
+      {nextCursor && (
+        <div className="load-more">
+          <button
+            className="btn-secondary"
+            onClick={() => fetchPatients(nextCursor)}
+            disabled={loadingMore}
+          >
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
+
       {/* Create/Edit Modal */}
       {showModal && (
         <div className="modal-overlay" onClick={handleCloseModal}>
@@ -0,0 +1,38 @@
+-- =============================================
+-- AUDIT NOTIFICATIONS - PostgreSQL
+-- NOTIFY for every AuditLog insert, consumed by the API's shared
+-- LISTEN connection and pushed to dashboards over SSE
+-- (GET /api/audit/events). Notifications are delivered on commit
+-- and dropped when nobody is listening.
+-- Channels:
+--   audit_events     one JSON payload per new audit row
+--   security_alerts  alert changes (sent by security_alerts.sql)
+-- Run after create_audit_table.sql; re-running is safe.
+-- =============================================
+
+CREATE OR REPLACE FUNCTION trg_auditlog_notify()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- Payloads must stay under 8000 bytes: details are truncated
+    PERFORM pg_notify('audit_events', json_build_object(
+        'audit_id', audit_id,
+        'event_type', event_type,
+        'table_name', table_name,
+        'username', username,
+        'status', status,
+        'ip_address', ip_address,
+        'event_time', event_time,
+        'details', left(details, 500)
+    )::text)
+    FROM new_rows
+    ORDER BY event_time, audit_id;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_auditlog_notify ON AuditLog;
+CREATE TRIGGER trg_auditlog_notify
+AFTER INSERT ON AuditLog
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_auditlog_notify();
@@ -0,0 +1,108 @@
+-- =============================================
+-- AUDIT PARTITION MANAGEMENT - PostgreSQL
+-- Monthly partitions of AuditLog (partitioned on event_time)
+-- Run after create_audit_table.sql; re-running is safe
+-- =============================================
+
+-- Function: Create the partition holding p_month (auditlog_yYYYYmMM)
+-- Rows of that month already sitting in auditlog_default are moved into it
+CREATE OR REPLACE FUNCTION audit_create_partition(p_month DATE)
+RETURNS TEXT AS $$
+DECLARE
+    v_start DATE := date_trunc('month', p_month)::DATE;
+    v_end DATE := (date_trunc('month', p_month) + INTERVAL '1 month')::DATE;
+    v_name TEXT := 'auditlog_' || to_char(p_month, '"y"YYYY"m"MM');
+BEGIN
+    IF to_regclass(v_name) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+
+    -- Build the partition standalone so rows can be moved out of the
+    -- default partition before the range is attached
+    EXECUTE format('CREATE TABLE %I (LIKE AuditLog INCLUDING DEFAULTS)', v_name);
+    EXECUTE format(
+        'WITH moved AS (
+             DELETE FROM auditlog_default
+             WHERE event_time >= %L AND event_time < %L
+             RETURNING *
+         )
+         INSERT INTO %I SELECT * FROM moved',
+        v_start, v_end, v_name
+    );
+
+    -- Matching CHECK lets ATTACH skip its validation scan
+    EXECUTE format(
+        'ALTER TABLE %I ADD CONSTRAINT %I CHECK (event_time >= %L AND event_time < %L)',
+        v_name, v_name || '_range', v_start, v_end
+    );
+    EXECUTE format(
+        'ALTER TABLE AuditLog ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+        v_name, v_start, v_end
+    );
+    EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', v_name, v_name || '_range');
+
+    RETURN v_name;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION audit_create_partition IS 'Create the monthly AuditLog partition containing p_month';
+
+-- Function: Pre-create partitions for the current month and p_months_ahead months
+CREATE OR REPLACE FUNCTION audit_ensure_partitions(p_months_ahead INT DEFAULT 3)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v_month DATE;
+    v_name TEXT;
+BEGIN
+    FOR v_month IN
+        SELECT generate_series(
+            date_trunc('month', CURRENT_DATE),
+            date_trunc('month', CURRENT_DATE) + make_interval(months => p_months_ahead),
+            INTERVAL '1 month'
+        )::DATE
+    LOOP
+        v_name := audit_create_partition(v_month);
+        IF v_name IS NOT NULL THEN
+            RETURN NEXT v_name;
+        END IF;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION audit_ensure_partitions IS 'Create missing AuditLog partitions up to p_months_ahead months ahead';
+
+-- Function: Retention - detach partitions older than p_retain_months and
+-- move them to p_archive_schema (no bulk DELETE on the live table).
+-- Archived tables can be dumped with pg_dump -n audit_archive and dropped.
+CREATE OR REPLACE FUNCTION audit_detach_partitions(
+    p_retain_months INT,
+    p_archive_schema TEXT DEFAULT 'audit_archive'
+)
+RETURNS SETOF TEXT AS $$
+DECLARE
+    v_cutoff DATE := (date_trunc('month', CURRENT_DATE) - make_interval(months => p_retain_months))::DATE;
+    v_partition RECORD;
+BEGIN
+    FOR v_partition IN
+        SELECT c.relname,
+               to_date(substring(c.relname FROM '^auditlog_y(\d{4}m\d{2})$'), 'YYYY"m"MM') AS month_start
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'auditlog'::regclass
+          AND c.relname ~ '^auditlog_y\d{4}m\d{2}$'
+        ORDER BY month_start
+    LOOP
+        EXIT WHEN v_partition.month_start + INTERVAL '1 month' > v_cutoff;
+
+        EXECUTE format('CREATE SCHEMA IF NOT EXISTS %I', p_archive_schema);
+        EXECUTE format('ALTER TABLE AuditLog DETACH PARTITION %I', v_partition.relname);
+        EXECUTE format('ALTER TABLE %I SET SCHEMA %I', v_partition.relname, p_archive_schema);
+        RETURN NEXT p_archive_schema || '.' || v_partition.relname;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+COMMENT ON FUNCTION audit_detach_partitions IS 'Detach and archive AuditLog partitions older than p_retain_months';
+
+-- Create the current month and the next 3 months
+SELECT audit_ensure_partitions(3);
@@ -3,16 +3,16 @@
 -- Views and Functions for querying audit logs
 -- =============================================
 
--- View: Daily audit summary
+-- View: Daily audit summary (from the hourly rollup, see audit_rollups.sql)
 CREATE OR REPLACE VIEW vw_audit_summary AS
 SELECT 
-    DATE(event_time) AS audit_date,
+    DATE(bucket) AS audit_date,
     event_type,
     status,
-    COUNT(*) AS event_count,
+    SUM(event_count)::BIGINT AS event_count,
     COUNT(DISTINCT username) AS unique_users
-FROM AuditLog
-GROUP BY DATE(event_time), event_type, status
+FROM audit_rollup_hourly
+GROUP BY DATE(bucket), event_type, status
 ORDER BY audit_date DESC, event_count DESC;
 
 COMMENT ON VIEW vw_audit_summary IS 'Daily summary view of audit logs';
@@ -79,12 +79,12 @@ RETURNS TABLE (
 BEGIN
     RETURN QUERY
     SELECT 
-        CAST(EXTRACT(HOUR FROM event_time) AS INT) AS hour_of_day,  -- FIXED: Cast to INT
-        COUNT(*) AS activity_count,
-        COUNT(CASE WHEN status = 'FAILED' THEN 1 END) AS failed_count
-    FROM AuditLog
-    WHERE event_time > CURRENT_TIMESTAMP - INTERVAL '7 days'
-    GROUP BY CAST(EXTRACT(HOUR FROM event_time) AS INT)
+        CAST(EXTRACT(HOUR FROM bucket) AS INT) AS hour_of_day,  -- FIXED: Cast to INT
+        SUM(event_count)::BIGINT AS activity_count,
+        COALESCE(SUM(event_count) FILTER (WHERE status = 'FAILED'), 0)::BIGINT AS failed_count
+    FROM audit_rollup_hourly
+    WHERE bucket > date_trunc('hour', LOCALTIMESTAMP - INTERVAL '7 days')
+    GROUP BY CAST(EXTRACT(HOUR FROM bucket) AS INT)
     ORDER BY hour_of_day;
 END;
 $$ LANGUAGE plpgsql;
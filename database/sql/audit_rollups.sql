@@ -0,0 +1,61 @@
+-- =============================================
+-- AUDIT ROLLUPS - PostgreSQL
+-- Hourly event counts by event_type, status and username,
+-- kept current by a statement-level trigger on AuditLog.
+-- Dashboard/audit stats read these instead of scanning AuditLog.
+-- Run after create_audit_table.sql / audit_partitions.sql; re-running
+-- rebuilds the counts from the partitions currently attached
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS audit_rollup_hourly (
+    bucket TIMESTAMP NOT NULL,                 -- date_trunc('hour', event_time)
+    event_type VARCHAR(50) NOT NULL,
+    status VARCHAR(20) NOT NULL,
+    username VARCHAR(100) NOT NULL,
+    event_count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (bucket, event_type, status, username)
+);
+
+CREATE INDEX IF NOT EXISTS idx_audit_rollup_event_type_bucket ON audit_rollup_hourly(event_type, bucket);
+
+COMMENT ON TABLE audit_rollup_hourly IS 'Hourly AuditLog counts; rows outlive detached/archived partitions';
+
+-- Trigger function: fold each INSERT statement's rows into the rollup.
+-- One upsert per statement, so a batched multi-row insert costs one
+-- aggregate instead of one upsert per row.
+CREATE OR REPLACE FUNCTION trg_auditlog_rollup()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO audit_rollup_hourly AS r (bucket, event_type, status, username, event_count)
+    SELECT date_trunc('hour', event_time), event_type, status, username, COUNT(*)
+    FROM new_rows
+    GROUP BY 1, 2, 3, 4
+    -- Deterministic order keeps concurrent writers from deadlocking
+    ORDER BY 1, 2, 3, 4
+    ON CONFLICT (bucket, event_type, status, username)
+    DO UPDATE SET event_count = r.event_count + EXCLUDED.event_count;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Install the trigger and backfill atomically: SHARE mode blocks inserts
+-- while existing rows are counted, so nothing is counted twice or missed
+BEGIN;
+
+LOCK TABLE AuditLog IN SHARE MODE;
+
+DROP TRIGGER IF EXISTS trg_auditlog_rollup ON AuditLog;
+CREATE TRIGGER trg_auditlog_rollup
+AFTER INSERT ON AuditLog
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION trg_auditlog_rollup();
+
+TRUNCATE audit_rollup_hourly;
+INSERT INTO audit_rollup_hourly (bucket, event_type, status, username, event_count)
+SELECT date_trunc('hour', event_time), event_type, status, username, COUNT(*)
+FROM AuditLog
+GROUP BY 1, 2, 3, 4;
+
+COMMIT;
+
+ANALYZE audit_rollup_hourly;
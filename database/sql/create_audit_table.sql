@@ -1,27 +1,38 @@
+-- AuditLog được partition theo tháng trên event_time (RANGE).
+-- Các partition tháng do audit_partitions.sql tạo và bảo trì;
+-- auditlog_default giữ các dòng nằm ngoài mọi partition đã tạo.
 CREATE TABLE IF NOT EXISTS AuditLog (
-    audit_id SERIAL PRIMARY KEY,
+    audit_id BIGSERIAL,
     event_type VARCHAR(50) NOT NULL,           -- Loại sự kiện: LOGIN, LOGOUT, SELECT, INSERT, UPDATE, DELETE, GRANT, REVOKE
     table_name VARCHAR(100),                   -- Bảng bị tác động
     username VARCHAR(100) NOT NULL,            -- Người dùng thực hiện
-    event_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, -- Thời gian sự kiện
+    event_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP, -- Thời gian sự kiện (partition key)
     status VARCHAR(20) NOT NULL,               -- SUCCESS hoặc FAILED
     details TEXT,                              -- Chi tiết sự kiện
     ip_address VARCHAR(50),                    -- Địa chỉ IP (nếu có)
     application_name VARCHAR(100),             -- Tên ứng dụng
-    host_name VARCHAR(100)                     -- Tên máy trạm
-);
+    host_name VARCHAR(100),                    -- Tên máy trạm
+    PRIMARY KEY (audit_id, event_time)         -- Khóa chính của bảng partition phải chứa partition key
+) PARTITION BY RANGE (event_time);
+
+CREATE TABLE IF NOT EXISTS auditlog_default PARTITION OF AuditLog DEFAULT;
 
 -- Tạo index để tăng hiệu suất truy vấn audit log
-CREATE INDEX idx_auditlog_event_time ON AuditLog(event_time DESC);
-CREATE INDEX idx_auditlog_username ON AuditLog(username);
-CREATE INDEX idx_auditlog_event_type ON AuditLog(event_type);
-CREATE INDEX idx_auditlog_status ON AuditLog(status);
+-- (index trên bảng cha được tạo tự động cho từng partition)
+-- (event_time, audit_id) là khóa keyset của GET /api/audit; index tìm kiếm
+-- trigram nằm trong performance_indexes.sql (cần extension pg_trgm)
+CREATE INDEX IF NOT EXISTS idx_auditlog_event_time_id ON AuditLog(event_time DESC, audit_id DESC);
+CREATE INDEX IF NOT EXISTS idx_auditlog_username ON AuditLog(username);
+CREATE INDEX IF NOT EXISTS idx_auditlog_event_type_time ON AuditLog(event_type, event_time DESC, audit_id DESC);
+CREATE INDEX IF NOT EXISTS idx_auditlog_status_time ON AuditLog(lower(status), event_time DESC, audit_id DESC);
+CREATE INDEX IF NOT EXISTS idx_auditlog_ip_time ON AuditLog(ip_address, event_time DESC, audit_id DESC);
 
 -- Comment cho bảng
 COMMENT ON TABLE AuditLog IS 'Bảng lưu trữ audit log cho toàn bộ hệ thống';
 COMMENT ON COLUMN AuditLog.audit_id IS 'ID tự động tăng cho mỗi audit record';
 COMMENT ON COLUMN AuditLog.event_type IS 'Loại sự kiện: LOGIN, INSERT, UPDATE, DELETE, GRANT, REVOKE, etc.';
 COMMENT ON COLUMN AuditLog.status IS 'Trạng thái: SUCCESS hoặc FAILED';
+COMMENT ON COLUMN AuditLog.event_time IS 'Partition key: mỗi tháng một partition auditlog_yYYYYmMM';
 
 -- Tạo view để xem các sự kiện failed
 CREATE OR REPLACE VIEW vw_failed_events AS
@@ -0,0 +1,92 @@
+-- =============================================
+-- LOGIN THROTTLE - PostgreSQL
+-- Shared failed-login windows for LOGIN_THROTTLE_BACKEND=database,
+-- so every API process sees the same counts and lockouts.
+-- Principals are 'user:<username>' and 'ip:<address>'.
+-- Run after audit_permission.sql (replaces is_account_locked); re-running is safe.
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS login_throttle (
+    principal VARCHAR(200) PRIMARY KEY,
+    failures TIMESTAMP[] NOT NULL DEFAULT '{}',   -- most recent failures, newest first
+    lockouts INTEGER NOT NULL DEFAULT 0,          -- consecutive lockouts (drives the backoff)
+    locked_until TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_login_throttle_locked ON login_throttle(locked_until)
+    WHERE locked_until IS NOT NULL;
+
+-- Record one failure. Keeps only the last p_limit failures inside the
+-- window; reaching p_limit locks the principal for
+-- p_base_seconds * 2^lockouts (capped at p_max_seconds).
+-- Returns the lock expiry, or NULL while still under the limit.
+CREATE OR REPLACE FUNCTION login_throttle_fail(
+    p_principal VARCHAR,
+    p_limit INT,
+    p_window_seconds INT,
+    p_base_seconds INT,
+    p_max_seconds INT
+)
+RETURNS TIMESTAMP AS $$
+DECLARE
+    v_now TIMESTAMP := LOCALTIMESTAMP;
+    v_cutoff TIMESTAMP := LOCALTIMESTAMP - make_interval(secs => p_window_seconds);
+    v_failures TIMESTAMP[];
+    v_lockouts INT;
+    v_locked_until TIMESTAMP;
+BEGIN
+    INSERT INTO login_throttle AS t (principal, failures)
+    VALUES (p_principal, ARRAY[v_now])
+    ON CONFLICT (principal) DO UPDATE
+    SET failures = ARRAY[v_now] || ARRAY(
+            SELECT f FROM unnest(t.failures) AS f
+            WHERE f > v_cutoff
+            ORDER BY f DESC
+            LIMIT GREATEST(p_limit - 1, 0)
+        ),
+        -- A quiet window ends the backoff
+        lockouts = CASE WHEN EXISTS (SELECT 1 FROM unnest(t.failures) AS f WHERE f > v_cutoff)
+                        THEN t.lockouts ELSE 0 END
+    RETURNING failures, lockouts INTO v_failures, v_lockouts;
+
+    IF cardinality(v_failures) < p_limit THEN
+        RETURN NULL;
+    END IF;
+
+    v_locked_until := v_now + make_interval(
+        secs => LEAST(p_base_seconds * power(2, LEAST(v_lockouts, 20)), p_max_seconds));
+
+    UPDATE login_throttle
+    SET lockouts = lockouts + 1, locked_until = v_locked_until
+    WHERE principal = p_principal;
+
+    RETURN v_locked_until;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Lockout check without scanning AuditLog
+CREATE OR REPLACE FUNCTION is_account_locked(p_username VARCHAR)
+RETURNS BOOLEAN AS $$
+    SELECT EXISTS (
+        SELECT 1 FROM login_throttle
+        WHERE principal = 'user:' || lower(p_username)
+          AND locked_until > LOCALTIMESTAMP
+    );
+$$ LANGUAGE sql STABLE;
+
+COMMENT ON FUNCTION is_account_locked IS 'Account locked by the login throttle (reads login_throttle, not AuditLog)';
+
+-- Housekeeping: drop principals with no recent failures and no active lock
+CREATE OR REPLACE FUNCTION login_throttle_prune(p_window_seconds INT)
+RETURNS INTEGER AS $$
+DECLARE
+    v_deleted INT;
+BEGIN
+    DELETE FROM login_throttle
+    WHERE (locked_until IS NULL OR locked_until < LOCALTIMESTAMP)
+      AND (cardinality(failures) = 0
+           OR failures[1] < LOCALTIMESTAMP - make_interval(secs => p_window_seconds));
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    RETURN v_deleted;
+END;
+$$ LANGUAGE plpgsql;
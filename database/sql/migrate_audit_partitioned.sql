@@ -0,0 +1,87 @@
+-- =============================================
+-- MIGRATION: AuditLog heap -> monthly partitioned AuditLog
+-- For databases created with the old create_audit_table.sql.
+-- Run audit_partitions.sql first (defines the partition functions),
+-- then this file. Runs in a single transaction; writers block on the
+-- table lock until it commits.
+-- Views, triggers and rollups are not (re)defined here: run the rest of
+-- the upgrade sequence in README.md afterwards.
+-- =============================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+BEGIN;
+
+LOCK TABLE AuditLog IN ACCESS EXCLUSIVE MODE;
+
+-- Keep the old table (and its id sequence) aside
+ALTER TABLE AuditLog RENAME TO auditlog_legacy;
+ALTER SEQUENCE auditlog_audit_id_seq OWNED BY NONE;
+ALTER INDEX IF EXISTS idx_auditlog_event_time RENAME TO idx_auditlog_legacy_event_time;
+ALTER INDEX IF EXISTS idx_auditlog_username RENAME TO idx_auditlog_legacy_username;
+ALTER INDEX IF EXISTS idx_auditlog_event_type RENAME TO idx_auditlog_legacy_event_type;
+ALTER INDEX IF EXISTS idx_auditlog_status RENAME TO idx_auditlog_legacy_status;
+ALTER INDEX IF EXISTS idx_auditlog_event_time_id RENAME TO idx_auditlog_legacy_event_time_id;
+ALTER INDEX IF EXISTS idx_auditlog_event_type_time RENAME TO idx_auditlog_legacy_event_type_time;
+ALTER INDEX IF EXISTS idx_auditlog_status_time RENAME TO idx_auditlog_legacy_status_time;
+ALTER INDEX IF EXISTS idx_auditlog_ip_time RENAME TO idx_auditlog_legacy_ip_time;
+ALTER INDEX IF EXISTS idx_auditlog_search_trgm RENAME TO idx_auditlog_legacy_search_trgm;
+
+-- The views follow the renamed table; create_audit_table.sql and
+-- audit_queries_and_views.sql recreate them on the new one
+DROP VIEW IF EXISTS vw_failed_events, vw_permission_changes, vw_audit_summary;
+
+CREATE TABLE AuditLog (
+    audit_id BIGINT NOT NULL DEFAULT nextval('auditlog_audit_id_seq'),
+    event_type VARCHAR(50) NOT NULL,
+    table_name VARCHAR(100),
+    username VARCHAR(100) NOT NULL,
+    event_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    status VARCHAR(20) NOT NULL,
+    details TEXT,
+    ip_address VARCHAR(50),
+    application_name VARCHAR(100),
+    host_name VARCHAR(100),
+    PRIMARY KEY (audit_id, event_time)
+) PARTITION BY RANGE (event_time);
+
+ALTER SEQUENCE auditlog_audit_id_seq AS BIGINT OWNED BY AuditLog.audit_id;
+
+CREATE TABLE auditlog_default PARTITION OF AuditLog DEFAULT;
+
+-- Same index set as create_audit_table.sql + performance_indexes.sql
+CREATE INDEX idx_auditlog_event_time_id ON AuditLog(event_time DESC, audit_id DESC);
+CREATE INDEX idx_auditlog_username ON AuditLog(username);
+CREATE INDEX idx_auditlog_event_type_time ON AuditLog(event_type, event_time DESC, audit_id DESC);
+CREATE INDEX idx_auditlog_status_time ON AuditLog(lower(status), event_time DESC, audit_id DESC);
+CREATE INDEX idx_auditlog_ip_time ON AuditLog(ip_address, event_time DESC, audit_id DESC);
+CREATE INDEX idx_auditlog_search_trgm ON AuditLog USING GIN (
+    (username || ' ' || COALESCE(table_name, '') || ' ' || COALESCE(details, '')) gin_trgm_ops
+);
+
+-- One partition per month present in the old table, plus the months ahead
+SELECT audit_create_partition(month::DATE)
+FROM (
+    SELECT DISTINCT date_trunc('month', event_time) AS month
+    FROM auditlog_legacy
+) months;
+
+SELECT audit_ensure_partitions(3);
+
+-- Move the rows; each lands directly in its month's partition
+INSERT INTO AuditLog (
+    audit_id, event_type, table_name, username, event_time,
+    status, details, ip_address, application_name, host_name
+)
+SELECT
+    audit_id, event_type, table_name, username, event_time,
+    status, details, ip_address, application_name, host_name
+FROM auditlog_legacy;
+
+COMMIT;
+
+ANALYZE AuditLog;
+
+-- After verifying the row counts match:
+--   SELECT (SELECT COUNT(*) FROM auditlog_legacy) AS legacy, (SELECT COUNT(*) FROM AuditLog) AS partitioned;
+--   DROP TABLE auditlog_legacy;
@@ -0,0 +1,141 @@
+-- =============================================
+-- PATIENT SUMMARY - PostgreSQL
+-- One row per patient with the figures the patient list shows (last
+-- visit, next appointment, appointment/record counts, assigned doctor),
+-- kept current by row triggers on Appointments and MedicalRecords so
+-- GET /api/patients never scans the history tables.
+--   last_visit        latest Completed appointment or medical record date
+--   next_appointment  earliest Scheduled appointment from today on
+--   assigned_doctor   doctor of the latest non-cancelled appointment,
+--                     else of the latest medical record
+-- next_appointment goes stale when its day passes without any change to
+-- the patient's appointments: run patient_summary_refresh_due() daily
+-- (flask --app run patients refresh-summaries).
+-- Run after performance_indexes.sql (the refresh reads its per-patient
+-- indexes); re-running is safe and backfills every patient.
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS patient_summary (
+    patient_id INTEGER PRIMARY KEY REFERENCES Patients(patient_id) ON DELETE CASCADE,
+    last_visit DATE,
+    next_appointment_id INTEGER,
+    next_appointment_date DATE,
+    next_appointment_time TIME,
+    appointment_count INTEGER NOT NULL DEFAULT 0,
+    record_count INTEGER NOT NULL DEFAULT 0,
+    assigned_doctor_id INTEGER REFERENCES Users(user_id) ON DELETE SET NULL,
+    updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+-- patient_summary_refresh_due()
+CREATE INDEX IF NOT EXISTS idx_patient_summary_next_date
+    ON patient_summary(next_appointment_date);
+
+-- Recompute one patient's row from idx_appointments_patient_date and
+-- idx_medicalrecords_patient_date
+CREATE OR REPLACE FUNCTION patient_summary_refresh(p_patient_id INT)
+RETURNS VOID AS $$
+DECLARE
+    v_next_id INT;
+    v_next_date DATE;
+    v_next_time TIME;
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM Patients WHERE patient_id = p_patient_id) THEN
+        -- Patient deleted (cascade into its appointments/records)
+        DELETE FROM patient_summary WHERE patient_id = p_patient_id;
+        RETURN;
+    END IF;
+
+    -- Serialize concurrent refreshes of the same patient: the statements
+    -- below run after the lock is granted, so they see the other
+    -- transaction's committed rows
+    INSERT INTO patient_summary (patient_id) VALUES (p_patient_id)
+    ON CONFLICT (patient_id) DO NOTHING;
+    PERFORM 1 FROM patient_summary WHERE patient_id = p_patient_id FOR UPDATE;
+
+    SELECT appointment_id, appointment_date, appointment_time
+    INTO v_next_id, v_next_date, v_next_time
+    FROM Appointments
+    WHERE patient_id = p_patient_id
+      AND appointment_date >= CURRENT_DATE
+      AND status = 'Scheduled'
+    ORDER BY appointment_date, appointment_time
+    LIMIT 1;
+
+    UPDATE patient_summary
+    SET last_visit = GREATEST(
+            (SELECT max(appointment_date) FROM Appointments
+             WHERE patient_id = p_patient_id AND status = 'Completed'),
+            (SELECT max(record_date) FROM MedicalRecords
+             WHERE patient_id = p_patient_id)
+        ),
+        next_appointment_id = v_next_id,
+        next_appointment_date = v_next_date,
+        next_appointment_time = v_next_time,
+        appointment_count = (SELECT count(*) FROM Appointments WHERE patient_id = p_patient_id),
+        record_count = (SELECT count(*) FROM MedicalRecords WHERE patient_id = p_patient_id),
+        assigned_doctor_id = COALESCE(
+            (SELECT doctor_id FROM Appointments
+             WHERE patient_id = p_patient_id AND doctor_id IS NOT NULL
+               AND status IS DISTINCT FROM 'Cancelled'
+             ORDER BY appointment_date DESC, appointment_time DESC
+             LIMIT 1),
+            (SELECT doctor_id FROM MedicalRecords
+             WHERE patient_id = p_patient_id AND doctor_id IS NOT NULL
+             ORDER BY record_date DESC, created_at DESC
+             LIMIT 1)
+        ),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE patient_id = p_patient_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Rows whose next appointment day has passed; returns rows refreshed
+CREATE OR REPLACE FUNCTION patient_summary_refresh_due()
+RETURNS INTEGER AS $$
+DECLARE
+    v_patient_id INT;
+    v_count INT := 0;
+BEGIN
+    FOR v_patient_id IN
+        SELECT patient_id FROM patient_summary WHERE next_appointment_date < CURRENT_DATE
+    LOOP
+        PERFORM patient_summary_refresh(v_patient_id);
+        v_count := v_count + 1;
+    END LOOP;
+    RETURN v_count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION trg_patient_summary_sync()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP <> 'DELETE' AND NEW.patient_id IS NOT NULL THEN
+        PERFORM patient_summary_refresh(NEW.patient_id);
+    END IF;
+    IF TG_OP = 'DELETE' AND OLD.patient_id IS NOT NULL THEN
+        PERFORM patient_summary_refresh(OLD.patient_id);
+    ELSIF TG_OP = 'UPDATE' AND OLD.patient_id IS DISTINCT FROM NEW.patient_id
+          AND OLD.patient_id IS NOT NULL THEN
+        -- Moved to another patient: the old one loses it
+        PERFORM patient_summary_refresh(OLD.patient_id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Updates only matter when a summarized column changes
+DROP TRIGGER IF EXISTS patient_summary_appointments ON Appointments;
+CREATE TRIGGER patient_summary_appointments
+    AFTER INSERT OR DELETE OR UPDATE OF patient_id, doctor_id, appointment_date, appointment_time, status
+    ON Appointments
+    FOR EACH ROW EXECUTE FUNCTION trg_patient_summary_sync();
+
+DROP TRIGGER IF EXISTS patient_summary_medicalrecords ON MedicalRecords;
+CREATE TRIGGER patient_summary_medicalrecords
+    AFTER INSERT OR DELETE OR UPDATE OF patient_id, doctor_id, record_date
+    ON MedicalRecords
+    FOR EACH ROW EXECUTE FUNCTION trg_patient_summary_sync();
+
+-- Backfill (patients with no history get a zero row)
+SELECT patient_summary_refresh(patient_id) FROM Patients;
@@ -0,0 +1,108 @@
+-- =============================================
+-- PERFORMANCE INDEXES - PostgreSQL
+-- Indexes backing the API's list/search queries
+-- =============================================
+
+-- Keyset keys must not be NULL: a row comparison with NULL is never true,
+-- so such rows would end a page walk early (create_schema.sql leaves
+-- created_at nullable). Rows without one take their updated_at.
+UPDATE Patients SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL;
+ALTER TABLE Patients ALTER COLUMN created_at SET NOT NULL;
+UPDATE MedicalRecords SET created_at = COALESCE(updated_at, CURRENT_TIMESTAMP) WHERE created_at IS NULL;
+ALTER TABLE MedicalRecords ALTER COLUMN created_at SET NOT NULL;
+
+-- Keyset pagination: GET /api/patients
+-- ORDER BY created_at DESC, patient_id DESC
+CREATE INDEX IF NOT EXISTS idx_patients_created_at_id
+    ON Patients (created_at DESC, patient_id DESC);
+
+-- Keyset pagination: GET /api/appointments
+-- ORDER BY appointment_date DESC, appointment_time DESC, appointment_id DESC
+CREATE INDEX IF NOT EXISTS idx_appointments_date_time_id
+    ON Appointments (appointment_date DESC, appointment_time DESC, appointment_id DESC);
+
+-- Keyset pagination: GET /api/medical-records
+-- ORDER BY record_date DESC, created_at DESC, record_id DESC
+CREATE INDEX IF NOT EXISTS idx_medicalrecords_date_created_id
+    ON MedicalRecords (record_date DESC, created_at DESC, record_id DESC);
+
+
+-- =============================================
+-- AUDIT LOG SEARCH: GET /api/audit
+-- =============================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- Keyset pagination: ORDER BY event_time DESC, audit_id DESC
+CREATE INDEX IF NOT EXISTS idx_auditlog_event_time_id
+    ON AuditLog (event_time DESC, audit_id DESC);
+
+-- Equality filters, each followed by the keyset order
+CREATE INDEX IF NOT EXISTS idx_auditlog_event_type_time
+    ON AuditLog (event_type, event_time DESC, audit_id DESC);
+CREATE INDEX IF NOT EXISTS idx_auditlog_status_time
+    ON AuditLog (lower(status), event_time DESC, audit_id DESC);
+CREATE INDEX IF NOT EXISTS idx_auditlog_ip_time
+    ON AuditLog (ip_address, event_time DESC, audit_id DESC);
+
+-- ?search= : infix ILIKE over username/table/details
+-- (expression must match SEARCH_EXPR in server/app/routes/audit.py)
+CREATE INDEX IF NOT EXISTS idx_auditlog_search_trgm
+    ON AuditLog USING GIN (
+        (username || ' ' || COALESCE(table_name, '') || ' ' || COALESCE(details, '')) gin_trgm_ops
+    );
+
+-- Superseded by the composite indexes above
+DROP INDEX IF EXISTS idx_auditlog_event_time;
+DROP INDEX IF EXISTS idx_auditlog_event_type;
+DROP INDEX IF EXISTS idx_auditlog_status;
+
+
+-- =============================================
+-- PATIENT SEARCH: GET /api/patients/search
+-- Target: p95 under 50 ms with 1M patients. Every branch of the search
+-- query is answered from one of these indexes and stops after a fixed
+-- number of candidates, so cost does not grow with the table.
+-- (expressions must match NAME_EXPR / PHONE_EXPR / EMAIL_EXPR in
+-- server/app/routes/patients.py exactly)
+-- =============================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- ?q= exact and prefix match on either name (LIKE 'smi%' needs pattern ops)
+CREATE INDEX IF NOT EXISTS idx_patients_last_name_prefix
+    ON Patients (lower(last_name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS idx_patients_first_name_prefix
+    ON Patients (lower(first_name) text_pattern_ops);
+
+-- ?q= fuzzy match (pg_trgm % operator) and "first last" prefixes
+CREATE INDEX IF NOT EXISTS idx_patients_name_trgm
+    ON Patients USING GIN (lower(first_name || ' ' || last_name) gin_trgm_ops);
+
+-- ?phone= digits only, so "(555) 123-4567" and "555.123.4567" both match
+CREATE INDEX IF NOT EXISTS idx_patients_phone_digits
+    ON Patients (regexp_replace(phone, '[^0-9]', '', 'g') text_pattern_ops)
+    WHERE phone IS NOT NULL;
+
+-- ?email= case- and whitespace-insensitive
+CREATE INDEX IF NOT EXISTS idx_patients_email_lower
+    ON Patients (lower(btrim(email)))
+    WHERE email IS NOT NULL;
+
+-- ?dob=
+CREATE INDEX IF NOT EXISTS idx_patients_date_of_birth
+    ON Patients (date_of_birth);
+
+
+-- =============================================
+-- PATIENT HISTORY: GET /api/patients/<id>/chart,
+-- GET /api/appointments/patient/<id>, GET /api/medical-records/patient/<id>
+-- One index range per patient, already in display order (also used by
+-- ON DELETE CASCADE from Patients)
+-- =============================================
+
+CREATE INDEX IF NOT EXISTS idx_appointments_patient_date
+    ON Appointments (patient_id, appointment_date DESC, appointment_time DESC);
+
+CREATE INDEX IF NOT EXISTS idx_medicalrecords_patient_date
+    ON MedicalRecords (patient_id, record_date DESC, created_at DESC);
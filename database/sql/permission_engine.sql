@@ -0,0 +1,111 @@
+-- =============================================
+-- PERMISSION ENGINE - PostgreSQL
+-- Tables behind /api/permissions and the API's @permission_required
+-- checks, plus the version counter the API polls to reload its
+-- in-memory matrix. Run after create_schema.sql; re-running is safe.
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS permissions (
+    permission_id SERIAL PRIMARY KEY,
+    resource_name VARCHAR(50) NOT NULL,        -- Table / module, e.g. 'patients'
+    action_name VARCHAR(20) NOT NULL,          -- SELECT, INSERT, UPDATE, DELETE
+    description TEXT
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_permissions_resource_action
+    ON permissions (lower(resource_name), upper(action_name));
+
+CREATE TABLE IF NOT EXISTS role_permissions (
+    role_id INTEGER NOT NULL REFERENCES roles(role_id) ON DELETE CASCADE,
+    permission_id INTEGER NOT NULL REFERENCES permissions(permission_id) ON DELETE CASCADE,
+    PRIMARY KEY (role_id, permission_id)
+);
+
+-- =============================================
+-- VERSION COUNTER
+-- Bumped once per statement that changes grants; API processes compare
+-- it with the version they loaded and rebuild the matrix on mismatch
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS permission_version (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),   -- single row
+    version BIGINT NOT NULL DEFAULT 1,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+INSERT INTO permission_version (id) VALUES (TRUE) ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION trg_bump_permission_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE permission_version
+    SET version = version + 1, changed_at = CURRENT_TIMESTAMP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_role_permissions_version ON role_permissions;
+CREATE TRIGGER trg_role_permissions_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON role_permissions
+FOR EACH STATEMENT EXECUTE FUNCTION trg_bump_permission_version();
+
+DROP TRIGGER IF EXISTS trg_permissions_version ON permissions;
+CREATE TRIGGER trg_permissions_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON permissions
+FOR EACH STATEMENT EXECUTE FUNCTION trg_bump_permission_version();
+
+-- =============================================
+-- SEED: the grants the API enforced with hardcoded role lists
+-- (existing grants are kept; only missing rows are added)
+-- =============================================
+
+INSERT INTO roles (role_name) VALUES
+('Admin'),
+('Doctor'),
+('Nurse'),
+('Receptionist')
+ON CONFLICT (role_name) DO NOTHING;
+
+INSERT INTO permissions (resource_name, action_name, description)
+SELECT v.resource_name, v.action_name, v.description
+FROM (VALUES
+    ('patients', 'SELECT', 'View patients'),
+    ('patients', 'INSERT', 'Register patients'),
+    ('patients', 'UPDATE', 'Edit patients'),
+    ('patients', 'DELETE', 'Delete patients'),
+    ('appointments', 'SELECT', 'View appointments'),
+    ('appointments', 'INSERT', 'Book appointments'),
+    ('appointments', 'UPDATE', 'Edit appointments'),
+    ('appointments', 'DELETE', 'Cancel appointments'),
+    ('medicalrecords', 'SELECT', 'View medical records'),
+    ('medicalrecords', 'INSERT', 'Create medical records'),
+    ('medicalrecords', 'UPDATE', 'Edit medical records'),
+    ('medicalrecords', 'DELETE', 'Delete medical records')
+) AS v(resource_name, action_name, description)
+WHERE NOT EXISTS (
+    SELECT 1 FROM permissions p
+    WHERE lower(p.resource_name) = v.resource_name AND upper(p.action_name) = v.action_name
+);
+
+INSERT INTO role_permissions (role_id, permission_id)
+SELECT r.role_id, p.permission_id
+FROM (VALUES
+    ('Admin', 'patients', 'INSERT'),
+    ('Admin', 'patients', 'UPDATE'),
+    ('Admin', 'patients', 'DELETE'),
+    ('Receptionist', 'patients', 'INSERT'),
+    ('Admin', 'appointments', 'INSERT'),
+    ('Admin', 'appointments', 'UPDATE'),
+    ('Admin', 'appointments', 'DELETE'),
+    ('Receptionist', 'appointments', 'INSERT'),
+    ('Receptionist', 'appointments', 'UPDATE'),
+    ('Receptionist', 'appointments', 'DELETE'),
+    ('Admin', 'medicalrecords', 'INSERT'),
+    ('Admin', 'medicalrecords', 'UPDATE'),
+    ('Admin', 'medicalrecords', 'DELETE'),
+    ('Doctor', 'medicalrecords', 'INSERT'),
+    ('Doctor', 'medicalrecords', 'UPDATE')
+) AS g(role_name, resource_name, action_name)
+JOIN roles r ON r.role_name = g.role_name
+JOIN permissions p ON lower(p.resource_name) = g.resource_name AND upper(p.action_name) = g.action_name
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,167 @@
+-- =============================================
+-- ROLE HIERARCHY - PostgreSQL
+-- Roles inherit every grant of their parent roles. The transitive
+-- closure is materialized in role_closure and maintained by triggers,
+-- so effective permissions are a join, never a graph walk.
+-- Run after permission_engine.sql; re-running is safe.
+-- =============================================
+
+-- A role may have several parents (e.g. a 'Charge Nurse' under 'Nurse'
+-- and 'Receptionist')
+CREATE TABLE IF NOT EXISTS role_parents (
+    role_id INTEGER NOT NULL REFERENCES roles(role_id) ON DELETE CASCADE,
+    parent_role_id INTEGER NOT NULL REFERENCES roles(role_id) ON DELETE CASCADE,
+    PRIMARY KEY (role_id, parent_role_id),
+    CHECK (role_id <> parent_role_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_role_parents_parent ON role_parents(parent_role_id);
+
+-- One row per (ancestor, descendant) pair, including each role with
+-- itself at depth 0. depth is the shortest inheritance path.
+CREATE TABLE IF NOT EXISTS role_closure (
+    ancestor_id INTEGER NOT NULL REFERENCES roles(role_id) ON DELETE CASCADE,
+    descendant_id INTEGER NOT NULL REFERENCES roles(role_id) ON DELETE CASCADE,
+    depth INTEGER NOT NULL,
+    PRIMARY KEY (ancestor_id, descendant_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_role_closure_descendant ON role_closure(descendant_id, ancestor_id);
+
+-- =============================================
+-- CLOSURE MAINTENANCE
+-- =============================================
+
+-- Full rebuild; roles are few, so this is cheap and is what removals use
+CREATE OR REPLACE FUNCTION role_closure_rebuild()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE role_closure IN EXCLUSIVE MODE;
+    DELETE FROM role_closure;
+
+    INSERT INTO role_closure (ancestor_id, descendant_id, depth)
+    WITH RECURSIVE walk(ancestor_id, descendant_id, depth, path) AS (
+        SELECT role_id, role_id, 0, ARRAY[role_id]
+        FROM roles
+        UNION ALL
+        SELECT rp.parent_role_id, w.descendant_id, w.depth + 1, w.path || rp.parent_role_id
+        FROM walk w
+        JOIN role_parents rp ON rp.role_id = w.ancestor_id
+        WHERE rp.parent_role_id <> ALL(w.path)
+    )
+    SELECT ancestor_id, descendant_id, MIN(depth)
+    FROM walk
+    GROUP BY ancestor_id, descendant_id;
+END;
+$$ LANGUAGE plpgsql;
+
+-- New roles start with just their self row
+CREATE OR REPLACE FUNCTION trg_role_closure_self()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO role_closure (ancestor_id, descendant_id, depth)
+    VALUES (NEW.role_id, NEW.role_id, 0)
+    ON CONFLICT DO NOTHING;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_roles_closure ON roles;
+CREATE TRIGGER trg_roles_closure
+AFTER INSERT ON roles
+FOR EACH ROW EXECUTE FUNCTION trg_role_closure_self();
+
+-- Reject edges that would make a role its own ancestor. Hierarchy writers
+-- are serialized so two concurrent edges cannot form a cycle together.
+CREATE OR REPLACE FUNCTION trg_role_parents_check()
+RETURNS TRIGGER AS $$
+BEGIN
+    LOCK TABLE role_parents IN SHARE ROW EXCLUSIVE MODE;
+
+    IF EXISTS (
+        SELECT 1 FROM role_closure
+        WHERE ancestor_id = NEW.role_id AND descendant_id = NEW.parent_role_id
+    ) THEN
+        RAISE EXCEPTION 'Role % cannot inherit from role %: it would inherit from itself',
+            NEW.role_id, NEW.parent_role_id
+            USING ERRCODE = 'check_violation';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_role_parents_check ON role_parents;
+CREATE TRIGGER trg_role_parents_check
+BEFORE INSERT OR UPDATE ON role_parents
+FOR EACH ROW EXECUTE FUNCTION trg_role_parents_check();
+
+-- Adding an edge (child -> parent): every ancestor of the parent becomes an
+-- ancestor of every descendant of the child. Row-level, so later rows of
+-- the same statement are checked against an up-to-date closure.
+CREATE OR REPLACE FUNCTION trg_role_parents_insert()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO role_closure AS rc (ancestor_id, descendant_id, depth)
+    SELECT a.ancestor_id, d.descendant_id, MIN(a.depth + 1 + d.depth)
+    FROM role_closure a
+    CROSS JOIN role_closure d
+    WHERE a.descendant_id = NEW.parent_role_id
+      AND d.ancestor_id = NEW.role_id
+    GROUP BY a.ancestor_id, d.descendant_id
+    ON CONFLICT (ancestor_id, descendant_id)
+    DO UPDATE SET depth = LEAST(rc.depth, EXCLUDED.depth);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_role_parents_insert ON role_parents;
+CREATE TRIGGER trg_role_parents_insert
+AFTER INSERT ON role_parents
+FOR EACH ROW EXECUTE FUNCTION trg_role_parents_insert();
+
+-- Removing or moving an edge may drop paths that other edges still
+-- provide; rebuild once per statement instead of tracking path counts
+CREATE OR REPLACE FUNCTION trg_role_parents_rebuild()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM role_closure_rebuild();
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_role_parents_rebuild ON role_parents;
+CREATE TRIGGER trg_role_parents_rebuild
+AFTER UPDATE OR DELETE ON role_parents
+FOR EACH STATEMENT EXECUTE FUNCTION trg_role_parents_rebuild();
+
+-- Effective grants change with the closure: have API processes reload
+-- (trg_bump_permission_version comes from permission_engine.sql)
+DROP TRIGGER IF EXISTS trg_role_closure_version ON role_closure;
+CREATE TRIGGER trg_role_closure_version
+AFTER INSERT OR UPDATE OR DELETE ON role_closure
+FOR EACH STATEMENT EXECUTE FUNCTION trg_bump_permission_version();
+
+-- =============================================
+-- EFFECTIVE PERMISSIONS
+-- One row per (role, permission) the role holds, directly or through
+-- any ancestor. inherited_from lists the ancestors granting it.
+-- =============================================
+
+CREATE OR REPLACE VIEW vw_effective_permissions AS
+SELECT
+    c.descendant_id AS role_id,
+    rp.permission_id,
+    BOOL_OR(c.depth = 0) AS direct,
+    COALESCE(
+        ARRAY_AGG(r.role_name ORDER BY c.depth, r.role_name) FILTER (WHERE c.depth > 0),
+        '{}'
+    ) AS inherited_from
+FROM role_closure c
+JOIN role_permissions rp ON rp.role_id = c.ancestor_id
+JOIN roles r ON r.role_id = c.ancestor_id
+GROUP BY c.descendant_id, rp.permission_id;
+
+-- Backfill for existing roles/edges
+SELECT role_closure_rebuild();
+
+ANALYZE role_closure;
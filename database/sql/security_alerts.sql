@@ -0,0 +1,87 @@
+-- =============================================
+-- SECURITY ALERTS - PostgreSQL
+-- Active alerts written by the API's streaming alert engine
+-- (server/app/utils/alerts.py), which counts audit events in sliding
+-- windows per username, IP and table. One row per (rule, subject):
+-- re-triggering an expired alert reopens the same row.
+-- GET /api/audit/security-alerts reads this table instead of
+-- aggregating AuditLog.
+-- Run after audit_notify.sql; re-running is safe.
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS security_alerts (
+    alert_id BIGSERIAL PRIMARY KEY,
+    rule VARCHAR(50) NOT NULL,                 -- failed_login_user, delete_burst_table, ...
+    subject_type VARCHAR(20) NOT NULL,         -- username, ip_address, table_name
+    subject VARCHAR(200) NOT NULL,
+    severity VARCHAR(20) NOT NULL,             -- medium, high, critical
+    severity_rank SMALLINT NOT NULL,           -- 1..3, for ordering/escalation
+    event_count INTEGER NOT NULL,              -- events in the window when last reported
+    message TEXT NOT NULL,
+    first_seen TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_seen TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at TIMESTAMP NOT NULL,             -- last_seen + rule window; active while in the future
+    UNIQUE (rule, subject)
+);
+
+CREATE INDEX IF NOT EXISTS idx_security_alerts_active
+    ON security_alerts(expires_at DESC, severity_rank DESC, last_seen DESC);
+
+-- Report (or reopen) an alert. Several API processes may report the same
+-- alert from their own windows: the highest count and severity win.
+CREATE OR REPLACE FUNCTION security_alert_report(
+    p_rule VARCHAR,
+    p_subject_type VARCHAR,
+    p_subject VARCHAR,
+    p_severity VARCHAR,
+    p_severity_rank INT,
+    p_event_count INT,
+    p_message TEXT,
+    p_window_seconds INT
+)
+RETURNS BIGINT AS $$
+    INSERT INTO security_alerts AS a (
+        rule, subject_type, subject, severity, severity_rank, event_count, message,
+        first_seen, last_seen, expires_at
+    )
+    VALUES (
+        p_rule, p_subject_type, p_subject, p_severity, p_severity_rank, p_event_count, p_message,
+        LOCALTIMESTAMP, LOCALTIMESTAMP, LOCALTIMESTAMP + make_interval(secs => p_window_seconds)
+    )
+    ON CONFLICT (rule, subject) DO UPDATE SET
+        severity = CASE WHEN a.expires_at <= LOCALTIMESTAMP OR EXCLUDED.severity_rank >= a.severity_rank
+                        THEN EXCLUDED.severity ELSE a.severity END,
+        severity_rank = CASE WHEN a.expires_at <= LOCALTIMESTAMP THEN EXCLUDED.severity_rank
+                             ELSE GREATEST(a.severity_rank, EXCLUDED.severity_rank) END,
+        event_count = CASE WHEN a.expires_at <= LOCALTIMESTAMP THEN EXCLUDED.event_count
+                           ELSE GREATEST(a.event_count, EXCLUDED.event_count) END,
+        message = EXCLUDED.message,
+        first_seen = CASE WHEN a.expires_at <= LOCALTIMESTAMP THEN EXCLUDED.first_seen ELSE a.first_seen END,
+        last_seen = EXCLUDED.last_seen,
+        expires_at = GREATEST(a.expires_at, EXCLUDED.expires_at)
+    RETURNING alert_id;
+$$ LANGUAGE sql;
+
+-- Push alert changes to SSE subscribers (channel shared with audit_notify.sql)
+CREATE OR REPLACE FUNCTION trg_security_alerts_notify()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('security_alerts', json_build_object(
+        'alert_id', NEW.alert_id,
+        'rule', NEW.rule,
+        'subject_type', NEW.subject_type,
+        'subject', NEW.subject,
+        'severity', NEW.severity,
+        'event_count', NEW.event_count,
+        'message', NEW.message,
+        'last_seen', NEW.last_seen,
+        'expires_at', NEW.expires_at
+    )::text);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_security_alerts_notify ON security_alerts;
+CREATE TRIGGER trg_security_alerts_notify
+AFTER INSERT OR UPDATE ON security_alerts
+FOR EACH ROW EXECUTE FUNCTION trg_security_alerts_notify();
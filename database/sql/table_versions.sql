@@ -0,0 +1,70 @@
+-- =============================================
+-- TABLE VERSIONS - PostgreSQL
+-- Change counter per table, bumped once per writing statement in the
+-- writing transaction. The API derives collection ETags and
+-- Last-Modified from it (GET /api/patients, /api/appointments,
+-- /api/medical-records) and answers If-None-Match with 304 without
+-- running the list query.
+-- Each table's counter is split over 32 shard rows and a writer bumps the
+-- shard of its backend (pg_backend_pid() % 32), so concurrent writers
+-- almost never wait on each other's row lock; readers sum the shards.
+-- Run after patient_summary.sql; re-running is safe.
+-- =============================================
+
+-- Single-row counters of the first version serialized every writer
+DROP TABLE IF EXISTS table_versions;
+
+CREATE TABLE IF NOT EXISTS table_version_shards (
+    table_name VARCHAR(63) NOT NULL,           -- TG_TABLE_NAME (lower case)
+    shard SMALLINT NOT NULL,
+    version BIGINT NOT NULL DEFAULT 1,
+    changed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (table_name, shard)
+);
+
+INSERT INTO table_version_shards (table_name, shard)
+SELECT t.table_name, s.shard
+FROM (VALUES ('patients'), ('appointments'), ('medicalrecords'), ('patient_summary'), ('users'))
+     AS t(table_name)
+CROSS JOIN generate_series(0, 31) AS s(shard)
+ON CONFLICT DO NOTHING;
+
+CREATE OR REPLACE FUNCTION trg_bump_table_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    -- clock_timestamp keeps changed_at moving forward even when a
+    -- transaction that started earlier commits later
+    UPDATE table_version_shards
+    SET version = version + 1,
+        changed_at = GREATEST(changed_at, clock_timestamp()::timestamp)
+    WHERE table_name = TG_TABLE_NAME
+      AND shard = pg_backend_pid() % 32;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_patients_version ON Patients;
+CREATE TRIGGER trg_patients_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON Patients
+FOR EACH STATEMENT EXECUTE FUNCTION trg_bump_table_version();
+
+DROP TRIGGER IF EXISTS trg_appointments_version ON Appointments;
+CREATE TRIGGER trg_appointments_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON Appointments
+FOR EACH STATEMENT EXECUTE FUNCTION trg_bump_table_version();
+
+DROP TRIGGER IF EXISTS trg_medicalrecords_version ON MedicalRecords;
+CREATE TRIGGER trg_medicalrecords_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON MedicalRecords
+FOR EACH STATEMENT EXECUTE FUNCTION trg_bump_table_version();
+
+DROP TRIGGER IF EXISTS trg_patient_summary_version ON patient_summary;
+CREATE TRIGGER trg_patient_summary_version
+AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON patient_summary
+FOR EACH STATEMENT EXECUTE FUNCTION trg_bump_table_version();
+
+-- Lists show doctor usernames; password rehashes on login must not count
+DROP TRIGGER IF EXISTS trg_users_version ON Users;
+CREATE TRIGGER trg_users_version
+AFTER UPDATE OF username ON Users
+FOR EACH STATEMENT EXECUTE FUNCTION trg_bump_table_version();
@@ -0,0 +1,30 @@
+-- =============================================
+-- TOKEN REVOCATION - PostgreSQL
+-- JWT ids (jti) revoked before their expiry, e.g. on logout.
+-- API processes hold these in a Bloom filter and only query this
+-- table to confirm a filter hit. Rows are useless once the token
+-- expires and are purged by the API (revoked_tokens_purge).
+-- Re-running is safe.
+-- =============================================
+
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    jti VARCHAR(64) PRIMARY KEY,
+    user_id INTEGER,
+    revoked_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at TIMESTAMPTZ NOT NULL             -- the token's own exp
+);
+
+-- Incremental refresh (revoked_at > last seen) and expiry purge
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_revoked_at ON revoked_tokens(revoked_at);
+CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expires_at ON revoked_tokens(expires_at);
+
+CREATE OR REPLACE FUNCTION revoked_tokens_purge()
+RETURNS INTEGER AS $$
+DECLARE
+    v_deleted INT;
+BEGIN
+    DELETE FROM revoked_tokens WHERE expires_at < now();
+    GET DIAGNOSTICS v_deleted = ROW_COUNT;
+    RETURN v_deleted;
+END;
+$$ LANGUAGE plpgsql;
@@ -1,7 +1,18 @@
-from flask import Flask, jsonify
+from flask import Flask, g, jsonify, request
 from flask_cors import CORS
 from app.config import Config
-from app.utils.database import get_db_connection
+from app.utils.database import get_pool, get_pool_stats, init_app as init_db
+from app.utils.prepared import get_statement_stats
+from app.utils.audit import audit_log, sink as audit_sink
+from app.utils.alerts import engine as alert_engine
+from app.utils.auth import role_required, token_cache
+from app.utils.passwords import HashingUnavailable, hasher
+from app.utils.permissions import engine as permission_engine
+from app.utils.throttle import throttle as login_throttle
+from app.utils.revocation import revocations
+from app.utils.cache import stats_cache
+from app.utils.events import hub as event_hub
+from app.utils.conditional import collection_versions
 import psycopg2
 
 def create_app():
@@ -17,19 +28,32 @@ def create_app():
         r"/api/*": {
             "origins": "*",
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "allow_headers": ["Content-Type", "Authorization", "If-Match", "If-None-Match", "If-Modified-Since"],
+            "expose_headers": ["ETag", "Last-Modified"]
         }
     })
     
-    # Test database connection on startup
+    # One pooled connection and one commit per request
+    init_db(app)
+    
+    # Test database connection on startup (also warms the pool to DB_POOL_MIN_SIZE)
     try:
-        conn = get_db_connection()
-        conn.close()
+        get_pool().fill()
         print("✅ Database connection successful!")
     except psycopg2.Error as e:
         print(f"❌ Database connection failed: {e}")
         print("⚠️  Make sure PostgreSQL is running and credentials are correct in .env")
     
+    # Pick the bcrypt cost for this host unless it is pinned
+    if not hasher.rounds:
+        rounds = hasher.calibrate(Config.BCRYPT_TARGET_MS, Config.BCRYPT_MIN_ROUNDS, Config.BCRYPT_MAX_ROUNDS,
+                                  tolerance=Config.BCRYPT_REHASH_TOLERANCE)
+        print(f"🔐 bcrypt cost {rounds} (~{hasher.estimated_hash_ms:.0f} ms, budget {Config.BCRYPT_TARGET_MS:.0f} ms)")
+    
+    # Maintenance CLI commands
+    from app import cli
+    cli.init_app(app)
+    
     # Register blueprints
     from app.routes import dashboard, users, roles, permissions, audit, auth, patients, medicalrecords, appointments
     
@@ -43,13 +67,60 @@ def create_app():
     app.register_blueprint(medicalrecords.medicalrecords_bp, url_prefix='/api/medical-records')
     app.register_blueprint(appointments.appointments_bp, url_prefix='/api/appointments')
     
-    # Health check route
+    # Denied requests feed the alert engine (and the audit trail)
+    @app.after_request
+    def audit_access_denied(response):
+        if response.status_code == 403 and g.get('current_user'):
+            parts = request.path.strip('/').split('/')
+            resource = parts[1] if len(parts) > 1 and parts[0] == 'api' else request.path
+            audit_log('ACCESS_DENIED', resource, g.current_user.get('username', 'Unknown'), 'failed',
+                      f'{request.method} {request.path}')
+        return response
+    
+    @app.errorhandler(HashingUnavailable)
+    def hashing_unavailable(e):
+        response = jsonify({
+            'success': False,
+            'message': e.description
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    
+    # Health check route (public: up/down only)
     @app.route('/api/health')
     def health():
+        try:
+            with get_pool().connection() as conn:
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                finally:
+                    conn.rollback()
+        except Exception:
+            return jsonify({'status': 'down'}), 503
+        return jsonify({'status': 'up'})
+    
+    # Runtime statistics of pools, caches and background workers
+    @app.route('/api/health/details')
+    @role_required(['Admin'])
+    def health_details():
         return jsonify({
             'status': 'OK',
             'message': 'Hospital RBAC API is running',
-            'version': '1.0.0'
+            'version': '1.0.0',
+            'db_pool': get_pool_stats(),
+            'prepared_statements': get_statement_stats(),
+            'audit_sink': audit_sink.stats(),
+            'token_cache': token_cache.stats(),
+            'password_hasher': hasher.stats(),
+            'permissions': permission_engine.stats(),
+            'login_throttle': login_throttle.stats(),
+            'token_revocations': revocations.stats(),
+            'stats_cache': stats_cache.stats(),
+            'audit_events': event_hub.stats(),
+            'alert_engine': alert_engine.stats(),
+            'table_versions': collection_versions.stats()
         })
     
     # Root route
@@ -60,6 +131,7 @@ def create_app():
             'version': '1.0.0',
             'endpoints': {
                 'health': '/api/health',
+                'health_details': '/api/health/details',
                 'auth': '/api/auth/*',
                 'dashboard': '/api/dashboard/*',
                 'users': '/api/users/*',
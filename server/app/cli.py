@@ -0,0 +1,114 @@
+"""
+Maintenance commands (run with `flask --app run <command>`)
+"""
+import click
+from flask.cli import AppGroup
+from app.config import Config
+from app.utils.audit import audit_log
+from app.utils.database import execute_query, get_pool
+from app.utils.patient_import import PatientImporter, open_csv, summarize
+
+audit_cli = AppGroup('audit', help='Audit log maintenance')
+patients_cli = AppGroup('patients', help='Patient data tools')
+
+
+@audit_cli.command('partitions')
+@click.option('--ahead', type=int, default=None,
+              help='Months of future partitions to pre-create (default AUDIT_PARTITIONS_AHEAD)')
+@click.option('--retain-months', type=int, default=None,
+              help='Detach and archive partitions older than this; 0 keeps everything '
+                   '(default AUDIT_RETENTION_MONTHS)')
+def maintain_partitions(ahead, retain_months):
+    """
+    Create upcoming monthly AuditLog partitions and apply retention
+    Intended for a daily cron job; safe to run repeatedly
+    """
+    ahead = Config.AUDIT_PARTITIONS_AHEAD if ahead is None else ahead
+    retain_months = Config.AUDIT_RETENTION_MONTHS if retain_months is None else retain_months
+
+    try:
+        created = execute_query("SELECT audit_ensure_partitions(%s) AS name", (ahead,))
+        detached = []
+        if retain_months > 0:
+            detached = execute_query(
+                "SELECT audit_detach_partitions(%s, %s) AS name",
+                (retain_months, Config.AUDIT_ARCHIVE_SCHEMA)
+            )
+    except Exception as e:
+        raise click.ClickException(f"Partition maintenance failed: {e}")
+
+    for row in created:
+        click.echo(f"✅ Created partition {row['name']}")
+    for row in detached:
+        click.echo(f"📦 Archived partition {row['name']}")
+    if not created and not detached:
+        click.echo("✅ Audit partitions are up to date")
+
+
+@patients_cli.command('import')
+@click.argument('csv_file', type=click.File('rb'))
+@click.option('--user', 'username', required=True,
+              help='Existing username recorded as creator and in the audit log')
+@click.option('--batch-size', type=int, default=None,
+              help='Valid rows per COPY (default PATIENT_IMPORT_BATCH_SIZE)')
+@click.option('--dry-run', is_flag=True, help='Validate and report without importing')
+def import_patients(csv_file, username, batch_size, dry_run):
+    """
+    Bulk-create patients from a CSV file (same rules as POST /api/patients/import)
+    Valid rows are imported in one transaction; invalid rows and duplicates are listed
+    """
+    user = execute_query("SELECT user_id FROM users WHERE username = %s", (username,), fetch_one=True)
+    if not user:
+        raise click.ClickException(f"Unknown user: {username}")
+
+    with get_pool().connection() as conn:
+        importer = PatientImporter(
+            conn,
+            batch_size=batch_size or Config.PATIENT_IMPORT_BATCH_SIZE,
+            max_errors=Config.PATIENT_IMPORT_MAX_ERRORS,
+            created_by=user['user_id']
+        )
+        try:
+            result = importer.run(open_csv(csv_file), dry_run=dry_run)
+        except ValueError as e:
+            conn.rollback()
+            raise click.ClickException(str(e))
+        except Exception as e:
+            conn.rollback()
+            raise click.ClickException(f"Import failed: {e}")
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+
+    if not dry_run:
+        audit_log('IMPORT', 'patients', username, 'success', summarize(result, csv_file.name), sync=True)
+
+    for entry in result['errors']:
+        click.echo(f"❌ Line {entry['line']}: {'; '.join(entry['errors'])}")
+    for line in result['duplicate_lines']:
+        click.echo(f"⚠️  Line {line}: duplicate patient, skipped")
+    if result['truncated']:
+        click.echo(f"⚠️  Report truncated to {Config.PATIENT_IMPORT_MAX_ERRORS} entries per kind")
+    verb = 'Would import' if dry_run else 'Imported'
+    click.echo(f"✅ {verb} {result['imported']} of {result['rows']} rows "
+               f"({result['duplicates']} duplicates, {result['invalid']} invalid)")
+
+
+@patients_cli.command('refresh-summaries')
+def refresh_summaries():
+    """
+    Recompute patient_summary rows whose next appointment day has passed
+    Intended for a daily cron job shortly after midnight; safe to run repeatedly
+    """
+    try:
+        row = execute_query("SELECT patient_summary_refresh_due() AS refreshed", fetch_one=True)
+    except Exception as e:
+        raise click.ClickException(f"Summary refresh failed: {e}")
+    click.echo(f"✅ Refreshed {row['refreshed']} patient summaries")
+
+
+def init_app(app):
+    """Register the maintenance commands"""
+    app.cli.add_command(audit_cli)
+    app.cli.add_command(patients_cli)
@@ -17,5 +17,110 @@ class Config:
     DB_USER = os.environ.get('DB_USER', 'postgres')
     DB_PASSWORD = os.environ.get('DB_PASSWORD', '')
     
+    # Connection pool
+    DB_POOL_MIN_SIZE = int(os.environ.get('DB_POOL_MIN_SIZE', '1'))
+    DB_POOL_MAX_SIZE = int(os.environ.get('DB_POOL_MAX_SIZE', '10'))
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))  # seconds to wait for a free connection
+    DB_POOL_HEALTHCHECK_INTERVAL = float(os.environ.get('DB_POOL_HEALTHCHECK_INTERVAL', '30'))  # idle seconds before ping
+    
+    # Server-side prepared statements (set cache size to 0 behind PgBouncer transaction pooling)
+    DB_STATEMENT_CACHE_SIZE = int(os.environ.get('DB_STATEMENT_CACHE_SIZE', '128'))  # per connection
+    DB_PREPARE_THRESHOLD = int(os.environ.get('DB_PREPARE_THRESHOLD', '2'))  # executions before PREPARE
+    
+    # Streaming responses (?stream=1): rows fetched per server-side cursor round trip
+    DB_STREAM_ITERSIZE = int(os.environ.get('DB_STREAM_ITERSIZE', '2000'))
+    
+    # Pagination (list endpoints)
+    PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', '50'))
+    PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', '200'))
+    
+    # Audit log writer: events are queued and written in batches by a background thread
+    AUDIT_ASYNC = os.environ.get('AUDIT_ASYNC', 'true').lower() in ('1', 'true', 'yes')
+    AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', '10000'))
+    AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', '500'))
+    AUDIT_FLUSH_INTERVAL_MS = int(os.environ.get('AUDIT_FLUSH_INTERVAL_MS', '200'))
+    AUDIT_ENQUEUE_TIMEOUT_MS = int(os.environ.get('AUDIT_ENQUEUE_TIMEOUT_MS', '50'))  # block on a full queue, then spool
+    AUDIT_SPOOL_PATH = os.environ.get('AUDIT_SPOOL_PATH', 'audit_spool.jsonl')  # used while the database is unavailable
+    
+    # Audit log partitions (flask --app run audit partitions)
+    AUDIT_PARTITIONS_AHEAD = int(os.environ.get('AUDIT_PARTITIONS_AHEAD', '3'))  # future months to pre-create
+    AUDIT_RETENTION_MONTHS = int(os.environ.get('AUDIT_RETENTION_MONTHS', '0'))  # 0 keeps every partition attached
+    AUDIT_ARCHIVE_SCHEMA = os.environ.get('AUDIT_ARCHIVE_SCHEMA', 'audit_archive')  # detached partitions go here
+    
+    # Audit log search (GET /api/audit)
+    AUDIT_PAGE_SIZE_MAX = int(os.environ.get('AUDIT_PAGE_SIZE_MAX', '1000'))
+    AUDIT_COUNT_CAP = int(os.environ.get('AUDIT_COUNT_CAP', '10000'))  # exact totals up to this, planner estimate above
+    
+    # Verified JWT payloads cached per process (0 disables); entries expire with the token
+    JWT_CACHE_SIZE = int(os.environ.get('JWT_CACHE_SIZE', '4096'))
+    
+    # Password hashing pool (bcrypt off the request threads; 0 workers hashes inline)
+    AUTH_HASH_WORKERS = int(os.environ.get('AUTH_HASH_WORKERS', str(min(4, os.cpu_count() or 1))))
+    # workers + queue is capped below DB_POOL_MAX_SIZE: each admitted login needs a connection afterwards
+    AUTH_HASH_QUEUE_SIZE = int(os.environ.get('AUTH_HASH_QUEUE_SIZE', '4'))  # waiting hashes before 503
+    AUTH_HASH_TIMEOUT = float(os.environ.get('AUTH_HASH_TIMEOUT', '5'))  # seconds a request waits for its hash
+    
+    # bcrypt cost: pinned with BCRYPT_ROUNDS, otherwise calibrated at startup to the
+    # highest cost hashing within BCRYPT_TARGET_MS (pin it when workers must agree)
+    BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '0'))
+    BCRYPT_TARGET_MS = float(os.environ.get('BCRYPT_TARGET_MS', '250'))
+    BCRYPT_MIN_ROUNDS = int(os.environ.get('BCRYPT_MIN_ROUNDS', '10'))
+    BCRYPT_MAX_ROUNDS = int(os.environ.get('BCRYPT_MAX_ROUNDS', '16'))
+    # Calibrated costs may differ by host: hashes within this many rounds of it are kept
+    BCRYPT_REHASH_TOLERANCE = int(os.environ.get('BCRYPT_REHASH_TOLERANCE', '1'))
+    
+    # Permission engine: seconds between permission_version checks per process
+    PERMISSION_REFRESH_INTERVAL = float(os.environ.get('PERMISSION_REFRESH_INTERVAL', '2'))
+    
+    # Login throttling: sliding-window failure counts per username and per client IP.
+    # 'database' also shares counts across processes via login_throttle.sql
+    LOGIN_THROTTLE_BACKEND = os.environ.get('LOGIN_THROTTLE_BACKEND', 'memory')
+    LOGIN_THROTTLE_WINDOW = int(os.environ.get('LOGIN_THROTTLE_WINDOW', '900'))  # seconds failures are remembered
+    LOGIN_MAX_FAILURES_USER = int(os.environ.get('LOGIN_MAX_FAILURES_USER', '5'))
+    LOGIN_MAX_FAILURES_IP = int(os.environ.get('LOGIN_MAX_FAILURES_IP', '20'))
+    LOGIN_LOCKOUT_BASE = int(os.environ.get('LOGIN_LOCKOUT_BASE', '60'))  # first lockout; doubles on each repeat
+    LOGIN_LOCKOUT_MAX = int(os.environ.get('LOGIN_LOCKOUT_MAX', '3600'))
+    LOGIN_THROTTLE_MAX_ENTRIES = int(os.environ.get('LOGIN_THROTTLE_MAX_ENTRIES', '10000'))  # LRU bound per process
+    
+    # Token revocation (logout): Bloom filter of revoked jti per process
+    REVOCATION_REFRESH_INTERVAL = float(os.environ.get('REVOCATION_REFRESH_INTERVAL', '5'))  # seconds; max delay across processes
+    REVOCATION_REBUILD_INTERVAL = float(os.environ.get('REVOCATION_REBUILD_INTERVAL', '300'))  # full rebuild, drops expired ids
+    REVOCATION_FALSE_POSITIVE_RATE = float(os.environ.get('REVOCATION_FALSE_POSITIVE_RATE', '0.01'))
+    
+    # Dashboard / stats endpoints: seconds a result is shared, then served stale while one request refreshes it
+    STATS_CACHE_TTL = float(os.environ.get('STATS_CACHE_TTL', '10'))  # 0 disables
+    STATS_CACHE_STALE_TTL = float(os.environ.get('STATS_CACHE_STALE_TTL', '60'))
+    
+    # Live audit events over SSE (GET /api/audit/events), fed by one LISTEN connection per process
+    SSE_CLIENT_BUFFER = int(os.environ.get('SSE_CLIENT_BUFFER', '256'))  # events per client before the oldest are dropped
+    SSE_MAX_CLIENTS = int(os.environ.get('SSE_MAX_CLIENTS', '100'))  # per process; each holds a worker thread
+    SSE_HEARTBEAT = float(os.environ.get('SSE_HEARTBEAT', '15'))  # seconds between keepalive comments
+    SSE_RETRY_MS = int(os.environ.get('SSE_RETRY_MS', '3000'))  # client reconnect delay
+    SSE_TICKET_TTL = int(os.environ.get('SSE_TICKET_TTL', '60'))  # seconds a ?ticket= from /events/ticket can open a stream
+    
+    # Security alert engine: events per sliding window that raise an alert (x2 high, x3 critical)
+    ALERT_FAILED_LOGINS = int(os.environ.get('ALERT_FAILED_LOGINS', '5'))  # per username
+    ALERT_FAILED_LOGINS_IP = int(os.environ.get('ALERT_FAILED_LOGINS_IP', '10'))  # per client IP
+    ALERT_LOGIN_WINDOW = int(os.environ.get('ALERT_LOGIN_WINDOW', '900'))
+    ALERT_ACCESS_DENIED = int(os.environ.get('ALERT_ACCESS_DENIED', '5'))  # 403s per username (x2 per IP)
+    ALERT_ACCESS_WINDOW = int(os.environ.get('ALERT_ACCESS_WINDOW', '600'))
+    ALERT_DELETE_BURST = int(os.environ.get('ALERT_DELETE_BURST', '20'))  # deletes per username (x2 per table)
+    ALERT_DELETE_WINDOW = int(os.environ.get('ALERT_DELETE_WINDOW', '300'))
+    
+    # Patient search (GET /api/patients/search)
+    PATIENT_SEARCH_LIMIT_DEFAULT = int(os.environ.get('PATIENT_SEARCH_LIMIT_DEFAULT', '20'))
+    PATIENT_SEARCH_LIMIT_MAX = int(os.environ.get('PATIENT_SEARCH_LIMIT_MAX', '50'))
+    PATIENT_SEARCH_TIMEOUT_MS = int(os.environ.get('PATIENT_SEARCH_TIMEOUT_MS', '500'))  # statement_timeout; 0 disables
+    
+    # Bulk patient import (POST /api/patients/import, flask patients import)
+    PATIENT_IMPORT_BATCH_SIZE = int(os.environ.get('PATIENT_IMPORT_BATCH_SIZE', '1000'))  # valid rows per COPY
+    PATIENT_IMPORT_MAX_ERRORS = int(os.environ.get('PATIENT_IMPORT_MAX_ERRORS', '1000'))  # rows listed in the report
+    
+    # Patient chart (GET /api/patients/<id>/chart): default rows per section, overridable per request up to the max
+    CHART_UPCOMING_LIMIT = int(os.environ.get('CHART_UPCOMING_LIMIT', '10'))
+    CHART_PAST_LIMIT = int(os.environ.get('CHART_PAST_LIMIT', '20'))
+    CHART_RECORDS_LIMIT = int(os.environ.get('CHART_RECORDS_LIMIT', '20'))
+    CHART_SECTION_LIMIT_MAX = int(os.environ.get('CHART_SECTION_LIMIT_MAX', '200'))
+    
     # CORS
     CORS_HEADERS = 'Content-Type'
@@ -1,14 +1,42 @@
 from flask import Blueprint, request, jsonify
-from app.utils.database import execute_query
-from app.utils.auth import token_required, role_required
+from app.utils.audit import audit_log
+from app.utils.database import execute_query, fetch_result, stream_query
+from app.utils.auth import token_required
+from app.utils.permissions import permission_required
+from app.utils.pagination import get_page_args, build_page
+from app.utils.streaming import wants_stream, stream_response
+from app.utils.serializer import json_response
+from app.utils.conditional import (
+    collection_versions, resource_validators, not_modified, with_validators,
+    if_match_versions, precondition_failed
+)
+from app.utils.cache import stats_cache
 
 appointments_bp = Blueprint('appointments', __name__)
 
 @appointments_bp.route('/', methods=['GET'])
 @token_required
 def get_appointments(current_user):
-    """Get all appointments - All authenticated users can view"""
+    """Get appointments page by page (latest first) - All authenticated users can view"""
     try:
+        try:
+            limit, cursor = get_page_args(('date', 'time', 'integer'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        # Unchanged since the client's copy: answer before running the list query
+        etag, last_modified = collection_versions.validators(
+            'appointments', ('appointments', 'patients', 'users')
+        )
+        cached = not_modified(etag, last_modified, weak=True)
+        if cached is not None:
+            return cached
+        
+        # Keyset pagination on (appointment_date, appointment_time, appointment_id)
+        # - idx_appointments_date_time_id
         query = """
             SELECT a.appointment_id, a.patient_id, a.doctor_id, 
                    a.appointment_date, a.appointment_time, a.status, 
@@ -18,14 +46,37 @@ def get_appointments(current_user):
             FROM appointments a
             JOIN patients p ON a.patient_id = p.patient_id
             LEFT JOIN users u ON a.doctor_id = u.user_id
-            ORDER BY a.appointment_date DESC, a.appointment_time DESC
         """
-        appointments = execute_query(query)
-        
-        return jsonify({
-            'success': True,
-            'appointments': appointments
-        }), 200
+        params = []
+        if cursor:
+            query += """
+            WHERE (a.appointment_date, a.appointment_time, a.appointment_id)
+                < (%s::date, %s::time, %s::integer)
+            """
+            params.extend(cursor)
+        query += " ORDER BY a.appointment_date DESC, a.appointment_time DESC, a.appointment_id DESC"
+        
+        # ?stream=1 exports every remaining row through a server-side cursor
+        if wants_stream():
+            return with_validators(
+                stream_response(stream_query(query, tuple(params) or None), 'appointments'),
+                etag, last_modified, weak=True
+            )
+        
+        query += " LIMIT %s"
+        params.append(limit + 1)
+        
+        appointments, next_cursor = build_page(
+            fetch_result(query, tuple(params)), limit,
+            ('appointment_date', 'appointment_time', 'appointment_id')
+        )
+        
+        return with_validators(json_response(
+            success=True,
+            appointments=appointments,
+            next_cursor=next_cursor,
+            limit=limit
+        ), etag, last_modified, weak=True)
         
     except Exception as e:
         return jsonify({
@@ -43,7 +94,8 @@ def get_appointment(current_user, appointment_id):
                    a.appointment_date, a.appointment_time, a.status, 
                    a.reason, a.notes, a.created_at, a.updated_at,
                    p.first_name || ' ' || p.last_name as patient_name,
-                   u.username as doctor_name
+                   u.username as doctor_name,
+                   p.updated_at as patient_updated_at
             FROM appointments a
             JOIN patients p ON a.patient_id = p.patient_id
             LEFT JOIN users u ON a.doctor_id = u.user_id
@@ -57,10 +109,19 @@ def get_appointment(current_user, appointment_id):
                 'message': 'Appointment not found'
             }), 404
         
-        return jsonify({
+        # The embedded patient name changes the representation too
+        appointment = appointment[0]
+        etag, last_modified = resource_validators(
+            appointment['updated_at'], appointment.pop('patient_updated_at')
+        )
+        cached = not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+        
+        return with_validators(jsonify({
             'success': True,
-            'appointment': appointment[0]
-        }), 200
+            'appointment': appointment
+        }), etag, last_modified)
         
     except Exception as e:
         return jsonify({
@@ -83,12 +144,9 @@ def get_patient_appointments(current_user, patient_id):
             WHERE a.patient_id = %s
             ORDER BY a.appointment_date DESC, a.appointment_time DESC
         """
-        appointments = execute_query(query, (patient_id,))
+        appointments = fetch_result(query, (patient_id,))
         
-        return jsonify({
-            'success': True,
-            'appointments': appointments
-        }), 200
+        return json_response(success=True, appointments=appointments)
         
     except Exception as e:
         return jsonify({
@@ -97,7 +155,7 @@ def get_patient_appointments(current_user, patient_id):
         }), 500
 
 @appointments_bp.route('/', methods=['POST'])
-@role_required(['Admin', 'Receptionist'])
+@permission_required('appointments', 'INSERT')
 def create_appointment(current_user):
     """Create new appointment - Admin and Receptionist only (per matrix)"""
     try:
@@ -140,17 +198,7 @@ def create_appointment(current_user):
         ), fetch=True)
         
         # Log the action in audit log
-        audit_query = """
-            INSERT INTO auditlog (event_type, table_name, username, status, details)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        execute_query(audit_query, (
-            'INSERT',
-            'appointments',
-            current_user['username'],
-            'success',
-            f"Created appointment for patient ID: {patient_id}"
-        ), fetch=False)
+        audit_log('INSERT', 'appointments', current_user['username'], 'success', f"Created appointment for patient ID: {patient_id}")
         
         return jsonify({
             'success': True,
@@ -165,11 +213,15 @@ def create_appointment(current_user):
         }), 500
 
 @appointments_bp.route('/<int:appointment_id>', methods=['PUT'])
-@role_required(['Admin', 'Receptionist'])
+@permission_required('appointments', 'UPDATE')
 def update_appointment(current_user, appointment_id):
-    """Update appointment - Admin and Receptionist only (per matrix)"""
+    """
+    Update appointment - Admin and Receptionist only (per matrix)
+    With If-Match (the ETag from GET) the update only applies if nobody changed the appointment since
+    """
     try:
         data = request.get_json()
+        expected = if_match_versions()
         
         # Build dynamic UPDATE query
         update_fields = []
@@ -196,26 +248,44 @@ def update_appointment(current_user, appointment_id):
             SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
             WHERE appointment_id = %s
         """
+        if expected is not None:
+            # Compare-and-set in the UPDATE itself: no row lock held between GET and PUT
+            query += " AND updated_at = ANY(%s::timestamp[])"
+            values.append(expected)
+        query += """
+            RETURNING updated_at,
+                      (SELECT updated_at FROM patients p WHERE p.patient_id = appointments.patient_id)
+                          AS patient_updated_at
+        """
         
-        execute_query(query, tuple(values), fetch=False)
+        updated = execute_query(query, tuple(values))
+        
+        if not updated:
+            current = execute_query("""
+                SELECT a.updated_at, p.updated_at AS patient_updated_at
+                FROM appointments a
+                JOIN patients p ON a.patient_id = p.patient_id
+                WHERE a.appointment_id = %s
+            """, (appointment_id,))
+            if current:
+                return precondition_failed(resource_validators(
+                    current[0]['updated_at'], current[0]['patient_updated_at']
+                )[0])
+            return jsonify({
+                'success': False,
+                'message': 'Appointment not found'
+            }), 404
         
         # Log the action in audit log
-        audit_query = """
-            INSERT INTO auditlog (event_type, table_name, username, status, details)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        execute_query(audit_query, (
-            'UPDATE',
-            'appointments',
-            current_user['username'],
-            'success',
-            f"Updated appointment ID: {appointment_id}"
-        ), fetch=False)
+        audit_log('UPDATE', 'appointments', current_user['username'], 'success', f"Updated appointment ID: {appointment_id}")
         
-        return jsonify({
+        etag, last_modified = resource_validators(
+            updated[0]['updated_at'], updated[0]['patient_updated_at']
+        )
+        return with_validators(jsonify({
             'success': True,
             'message': 'Appointment updated successfully'
-        }), 200
+        }), etag, last_modified)
         
     except Exception as e:
         return jsonify({
@@ -224,7 +294,7 @@ def update_appointment(current_user, appointment_id):
         }), 500
 
 @appointments_bp.route('/<int:appointment_id>', methods=['DELETE'])
-@role_required(['Admin', 'Receptionist'])
+@permission_required('appointments', 'DELETE')
 def delete_appointment(current_user, appointment_id):
     """Delete appointment - Admin and Receptionist only (per matrix)"""
     try:
@@ -248,17 +318,7 @@ def delete_appointment(current_user, appointment_id):
         execute_query(query, (appointment_id,), fetch=False)
         
         # Log the action in audit log
-        audit_query = """
-            INSERT INTO auditlog (event_type, table_name, username, status, details)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        execute_query(audit_query, (
-            'DELETE',
-            'appointments',
-            current_user['username'],
-            'success',
-            f"Deleted appointment for patient: {appointment[0]['patient_name']}"
-        ), fetch=False)
+        audit_log('DELETE', 'appointments', current_user['username'], 'success', f"Deleted appointment for patient: {appointment[0]['patient_name']}")
         
         return jsonify({
             'success': True,
@@ -276,38 +336,11 @@ def delete_appointment(current_user, appointment_id):
 def get_appointment_stats(current_user):
     """Get appointment statistics"""
     try:
-        # Count by status
-        status_query = """
-            SELECT status, COUNT(*) as count
-            FROM appointments
-            GROUP BY status
-        """
-        status_stats = execute_query(status_query)
-        
-        # Count today's appointments
-        today_query = """
-            SELECT COUNT(*) as count
-            FROM appointments
-            WHERE appointment_date = CURRENT_DATE
-        """
-        today_count = execute_query(today_query)
-        
-        # Count upcoming appointments
-        upcoming_query = """
-            SELECT COUNT(*) as count
-            FROM appointments
-            WHERE appointment_date >= CURRENT_DATE
-            AND status != 'Cancelled'
-        """
-        upcoming_count = execute_query(upcoming_query)
+        stats = stats_cache.get('appointments.stats', _load_appointment_stats)
         
         return jsonify({
             'success': True,
-            'stats': {
-                'by_status': status_stats,
-                'today': today_count[0]['count'] if today_count else 0,
-                'upcoming': upcoming_count[0]['count'] if upcoming_count else 0
-            }
+            'stats': stats
         }), 200
         
     except Exception as e:
@@ -315,3 +348,25 @@ def get_appointment_stats(current_user):
             'success': False,
             'message': f'Error fetching appointment stats: {str(e)}'
         }), 500
+
+def _load_appointment_stats():
+    """Counts by status, today and upcoming in one pass over appointments"""
+    query = """
+        SELECT
+            COALESCE(json_agg(json_build_object('status', status, 'count', count)
+                              ORDER BY count DESC), '[]') AS by_status,
+            COALESCE(SUM(today), 0)::bigint AS today,
+            COALESCE(SUM(upcoming), 0)::bigint AS upcoming
+        FROM (
+            SELECT
+                status,
+                COUNT(*) AS count,
+                COUNT(*) FILTER (WHERE appointment_date = CURRENT_DATE) AS today,
+                COUNT(*) FILTER (WHERE appointment_date >= CURRENT_DATE
+                                 AND status != 'Cancelled') AS upcoming
+            FROM appointments
+            GROUP BY status
+        ) s
+    """
+    # Own transaction: a failed refresh falls back to the cached value
+    return execute_query(query, fetch_one=True, own_connection=True)
@@ -1,75 +1,148 @@
-from flask import Blueprint, request, jsonify
-from app.utils.database import execute_query
-from app.utils.auth import role_required
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify
+from app.config import Config
+from app.utils.database import execute_query, fetch_result, stream_query
+from app.utils.pagination import get_page_args, build_page
+from app.utils.serializer import json_response
+from app.utils.streaming import stream_response
+from app.utils.auth import generate_stream_ticket, role_required, token_required
+from app.utils.events import hub, sse_stream
 
 bp = Blueprint('audit', __name__, url_prefix='/api/audit')
 
+ALERT_ICONS = {'failed': '🔒', 'access': '⛔', 'delete': '🗑️'}
+
+# Must match idx_auditlog_search_trgm (performance_indexes.sql) exactly
+SEARCH_EXPR = "(a.username || ' ' || COALESCE(a.table_name, '') || ' ' || COALESCE(a.details, ''))"
+
+def _parse_timestamp(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f'{name} must be an ISO 8601 timestamp')
+
+def _audit_filters():
+    """
+    Build the WHERE clause shared by the list and export endpoints
+    
+    Query params: event_type, status, ip, from, to (ISO timestamps, `to`
+    exclusive) and search (substring of username/table/details)
+    
+    Returns:
+        (where_sql, params)
+    Raises:
+        ValueError on a malformed timestamp
+    """
+    clauses = []
+    params = []
+    
+    event_type = request.args.get('event_type')
+    if event_type:
+        clauses.append("a.event_type = %s")
+        params.append(event_type)
+    
+    # Statuses are stored as 'success'/'failed' and 'SUCCESS'/'FAILED'
+    status = request.args.get('status')
+    if status:
+        clauses.append("lower(a.status) = %s")
+        params.append(status.lower())
+    
+    ip_address = request.args.get('ip')
+    if ip_address:
+        clauses.append("a.ip_address = %s")
+        params.append(ip_address)
+    
+    # Time bounds prune AuditLog partitions
+    time_from = _parse_timestamp('from')
+    if time_from:
+        clauses.append("a.event_time >= %s::timestamp")
+        params.append(time_from)
+    time_to = _parse_timestamp('to')
+    if time_to:
+        clauses.append("a.event_time < %s::timestamp")
+        params.append(time_to)
+    
+    search = request.args.get('search')
+    if search:
+        # Trigram GIN index serves the infix ILIKE; escape LIKE wildcards
+        escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        clauses.append(f"{SEARCH_EXPR} ILIKE %s")
+        params.append(f'%{escaped}%')
+    
+    where = (" WHERE " + " AND ".join(clauses)) if clauses else ""
+    return where, params
+
+def _count_matches(where, params):
+    """
+    Exact count up to AUDIT_COUNT_CAP, planner estimate beyond it
+    
+    Returns:
+        (total, is_estimate)
+    """
+    cap = Config.AUDIT_COUNT_CAP
+    capped = execute_query(
+        f"SELECT COUNT(*) AS total FROM (SELECT 1 FROM auditlog a{where} LIMIT %s) matches",
+        tuple(params) + (cap + 1,),
+        fetch_one=True
+    )['total']
+    if capped <= cap:
+        return capped, False
+    
+    plan = execute_query(
+        f"EXPLAIN (FORMAT JSON) SELECT 1 FROM auditlog a{where}",
+        tuple(params) or None,
+        fetch_one=True
+    )
+    estimate = int(next(iter(plan.values()))[0]['Plan']['Plan Rows'])
+    return max(estimate, capped), True
+
 @bp.route('/', methods=['GET'])
 @role_required(['Admin'])  # Only Admin can view audit logs
 def get_audit_logs():
-    """Get audit logs with pagination and filters"""
+    """Get audit logs page by page (newest first) with filters"""
     try:
-        page = int(request.args.get('page', 1))
-        limit = int(request.args.get('limit', 10))
-        event_type = request.args.get('event_type')
-        search = request.args.get('search')
+        try:
+            limit, cursor = get_page_args(('timestamp', 'bigint'), Config.AUDIT_PAGE_SIZE_MAX)
+            where, params = _audit_filters()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
-        offset = (page - 1) * limit
-        
-        # Debug log
-        print(f"🔍 Audit Log Query - page: {page}, limit: {limit}, event_type: {event_type}, search: {search}")
-        
-        # Base query - SỬA TÊN BẢNG
-        query = """
+        # Keyset pagination on (event_time, audit_id) - idx_auditlog_event_time_id
+        query = f"""
             SELECT a.audit_id, a.event_type, a.table_name, 
-                   a.username, a.event_time as timestamp,
+                   a.username, a.event_time, a.event_time as timestamp,
                    a.status, a.details, a.ip_address
-            FROM auditlog a
-            WHERE 1=1
+            FROM auditlog a{where}
         """
-        params = []
-        
-        # Add filters
-        if event_type:
-            query += " AND a.event_type = %s"
-            params.append(event_type)
+        page_params = list(params)
+        if cursor:
+            query += (" AND" if where else " WHERE") + \
+                " (a.event_time, a.audit_id) < (%s::timestamp, %s::bigint)"
+            page_params.extend(cursor)
+        query += " ORDER BY a.event_time DESC, a.audit_id DESC LIMIT %s"
+        page_params.append(limit + 1)
         
-        if search:
-            query += " AND (a.username ILIKE %s OR a.table_name ILIKE %s)"
-            params.extend([f'%{search}%', f'%{search}%'])
+        logs, next_cursor = build_page(
+            fetch_result(query, tuple(page_params)), limit, ('event_time', 'audit_id')
+        )
         
-        # Order and pagination
-        query += " ORDER BY a.event_time DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
+        # The total only changes with the filters, so skip it on later pages
+        total, total_estimated = (None, False) if cursor else _count_matches(where, params)
         
-        print(f"📊 Query: {query}")
-        print(f"📊 Params: {params}")
-        
-        logs = execute_query(query, tuple(params))
-        
-        print(f"✅ Found {len(logs)} logs")
-        
-        # Get total count
-        count_query = "SELECT COUNT(*) as total FROM auditlog WHERE 1=1"
-        count_params = []
-        
-        if event_type:
-            count_query += " AND event_type = %s"
-            count_params.append(event_type)
-        
-        if search:
-            count_query += " AND (username ILIKE %s OR table_name ILIKE %s)"
-            count_params.extend([f'%{search}%', f'%{search}%'])
-        
-        total = execute_query(count_query, tuple(count_params) if count_params else None)[0]['total']
-        
-        return jsonify({
-            'success': True,
-            'data': logs,
-            'total': total,
-            'page': page,
-            'limit': limit
-        })
+        return json_response(
+            success=True,
+            data=logs,
+            total=total,
+            total_estimated=total_estimated,
+            next_cursor=next_cursor,
+            limit=limit
+        )
     except Exception as e:
         print(f"Error in get_audit_logs: {str(e)}")
         return jsonify({
@@ -78,17 +151,52 @@ def get_audit_logs():
             'error': str(e)
         }), 500
 
+@bp.route('/export', methods=['GET'])
+@role_required(['Admin'])
+def export_audit_logs():
+    """Stream the filtered audit log (JSON array, or NDJSON with ?format=ndjson)"""
+    try:
+        try:
+            where, params = _audit_filters()
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        query = f"""
+            SELECT a.audit_id, a.event_type, a.table_name, 
+                   a.username, a.event_time as timestamp,
+                   a.status, a.details, a.ip_address
+            FROM auditlog a{where}
+            ORDER BY a.event_time DESC, a.audit_id DESC
+        """
+        
+        return stream_response(stream_query(query, tuple(params) or None), 'data')
+    except Exception as e:
+        print(f"Error in export_audit_logs: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Error exporting audit logs',
+            'error': str(e)
+        }), 500
+
 @bp.route('/stats', methods=['GET'])
 def get_audit_stats():
     """Get audit statistics"""
     try:
+        # Hourly rollup (audit_rollups.sql): scans buckets, not audit rows
         query = """
             SELECT 
-                COUNT(*) as total_events,
-                COUNT(CASE WHEN event_type = 'FAILED_LOGIN' THEN 1 END) as failed_logins,
+                COALESCE(SUM(event_count), 0) as total_events,
+                -- auth.login records LOGIN/failed; FAILED_LOGIN comes from older data
+                COALESCE(SUM(event_count) FILTER (
+                    WHERE event_type = 'FAILED_LOGIN'
+                       OR (event_type = 'LOGIN' AND lower(status) = 'failed')), 0) as failed_logins,
                 COUNT(DISTINCT username) as active_users,
-                COUNT(CASE WHEN event_time >= NOW() - INTERVAL '24 hours' THEN 1 END) as events_24h
-            FROM auditlog
+                COALESCE(SUM(event_count) FILTER (
+                    WHERE bucket >= date_trunc('hour', LOCALTIMESTAMP) - INTERVAL '23 hours'), 0) as events_24h
+            FROM audit_rollup_hourly
         """
         
         stats = execute_query(query)[0]
@@ -107,28 +215,30 @@ def get_audit_stats():
 
 @bp.route('/security-alerts', methods=['GET'])
 def get_security_alerts():
-    """Get recent security alerts"""
+    """Get active security alerts (materialized by the alert engine)"""
     try:
-        # Query failed login attempts in last 24 hours
+        limit = min(int(request.args.get('limit', 10)), 100)
+        
         query = """
             SELECT 
-                audit_id as id,
-                'Failed Login Attempt' as message,
-                event_time as timestamp,
-                CASE 
-                    WHEN COUNT(*) OVER (PARTITION BY username) > 5 THEN 'critical'
-                    WHEN COUNT(*) OVER (PARTITION BY username) > 3 THEN 'high'
-                    ELSE 'medium'
-                END as severity,
-                '🔒' as icon
-            FROM auditlog
-            WHERE event_type = 'FAILED_LOGIN' 
-                AND event_time >= NOW() - INTERVAL '24 hours'
-            ORDER BY event_time DESC
-            LIMIT 10
+                alert_id as id,
+                rule,
+                subject_type,
+                subject,
+                message,
+                last_seen as timestamp,
+                first_seen,
+                event_count,
+                severity
+            FROM security_alerts
+            WHERE expires_at > LOCALTIMESTAMP
+            ORDER BY severity_rank DESC, last_seen DESC
+            LIMIT %s
         """
         
-        alerts = execute_query(query)
+        alerts = execute_query(query, (limit,))
+        for alert in alerts:
+            alert['icon'] = ALERT_ICONS.get(alert['rule'].split('_', 1)[0], '⚠️')
         
         return jsonify({
             'success': True,
@@ -141,3 +251,53 @@ def get_security_alerts():
             'message': 'Error fetching security alerts',
             'error': str(e)
         }), 500
+
+@bp.route('/events/ticket', methods=['POST'])
+@role_required(['Admin'])
+def issue_stream_ticket(current_user):
+    """
+    Ticket for GET /api/audit/events?ticket=..., valid for SSE_TICKET_TTL
+    seconds and only for the event stream
+    """
+    return jsonify({
+        'success': True,
+        'data': {
+            'ticket': generate_stream_ticket(current_user),
+            'expires_in': Config.SSE_TICKET_TTL
+        }
+    })
+
+@bp.route('/events', methods=['GET'])
+@token_required(allow_query_token=True)
+def stream_audit_events(current_user):
+    """
+    Server-Sent Events: new audit rows (`audit`) and alert changes (`alert`)
+    
+    Admin only. EventSource cannot send headers, so it passes a ticket from
+    POST /api/audit/events/ticket as ?ticket= (checked when the stream
+    opens; fetch a new one to reconnect after it expires).
+    """
+    if current_user['role_name'] != 'Admin':
+        return jsonify({
+            'success': False,
+            'message': 'Access denied. Required roles: Admin'
+        }), 403
+    
+    subscriber = hub.subscribe()
+    if subscriber is None:
+        response = jsonify({
+            'success': False,
+            'message': 'Too many live event subscribers, please retry'
+        })
+        response.status_code = 503
+        response.headers['Retry-After'] = str(Config.SSE_RETRY_MS // 1000 or 1)
+        return response
+    
+    return Response(
+        sse_stream(subscriber, Config.SSE_HEARTBEAT),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'   # nginx: do not buffer the stream
+        }
+    )
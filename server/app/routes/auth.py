@@ -1,13 +1,59 @@
 """
 Authentication routes: login, logout, current user
 """
+import psycopg2
 from flask import Blueprint, jsonify, request
-from app.utils.database import execute_query
+from app.utils.database import execute_query, end_request_transaction, get_pool
 from app.utils.decorators import handle_errors
-from app.utils.auth import hash_password, verify_password, generate_token, token_required
+from app.utils.audit import audit_log
+from app.utils.auth import hash_password, verify_password, needs_rehash, generate_token, token_required, role_required
+from app.utils.passwords import HashingUnavailable
+from app.utils.throttle import throttle
+from app.utils.revocation import revoke_token
 
 bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+def _locked_response(retry_after):
+    """429 for a throttled login, with Retry-After"""
+    response = jsonify({
+        'success': False,
+        'message': f'Too many failed login attempts. Try again in {retry_after} seconds.'
+    })
+    response.status_code = 429
+    response.headers['Retry-After'] = str(retry_after)
+    return response
+
+def _login_failed(username, ip, details):
+    """Count the failure, audit it (and any lockout it triggers), return 401"""
+    locked_for = throttle.record_failure(username, ip)
+    
+    audit_log('LOGIN', 'users', username, 'failed', details)
+    if locked_for:
+        audit_log('LOCKOUT', 'users', username, 'failed',
+                  f'Login locked for {locked_for}s after repeated failures from {ip}')
+    
+    return jsonify({
+        'success': False,
+        'message': 'Invalid username or password'
+    }), 401
+
+def _store_rehash(user, new_hash):
+    """Save an upgraded hash in a short transaction of its own (best effort)"""
+    try:
+        with get_pool().connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "UPDATE users SET password_hash = %s WHERE user_id = %s AND password_hash = %s",
+                        (new_hash, user['user_id'], user['password_hash'])
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+    except psycopg2.Error as e:
+        print(f"⚠️  Password rehash for {user['username']} not saved: {e}")
+
 @bp.route('/login', methods=['POST'])
 @handle_errors
 def login():
@@ -25,6 +71,12 @@ def login():
             'message': 'Username and password are required'
         }), 400
     
+    # Throttled principals are turned away before the user lookup and bcrypt
+    ip = request.remote_addr
+    retry_after = throttle.check(username, ip)
+    if retry_after:
+        return _locked_response(retry_after)
+    
     # Get user from database
     query = """
         SELECT 
@@ -40,54 +92,24 @@ def login():
     
     user = execute_query(query, (username,), fetch_one=True)
     
+    # Hold no pooled connection while waiting for bcrypt
+    end_request_transaction()
+    
     if not user:
-        # Log failed login attempt
-        print(f"[AUDIT] Logging failed login for user not found: {username}")
-        try:
-            log_query = """
-                INSERT INTO auditlog (event_type, username, table_name, details, status)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            execute_query(log_query, (
-                'LOGIN',
-                username,
-                'users',
-                f'Failed login attempt - user not found',
-                'failed'
-            ), fetch=False)
-            print(f"[AUDIT] Successfully logged failed login for: {username}")
-        except Exception as e:
-            print(f"[AUDIT ERROR] Failed to log: {str(e)}")
-        
-        return jsonify({
-            'success': False,
-            'message': 'Invalid username or password'
-        }), 401
+        return _login_failed(username, ip, 'Failed login attempt - user not found')
     
     # Verify password
     if not verify_password(password, user['password_hash']):
-        # Log failed login attempt
-        print(f"[AUDIT] Logging failed login for incorrect password: {username}")
+        return _login_failed(username, ip, 'Failed login attempt - incorrect password')
+    
+    throttle.record_success(username)
+    
+    # Move the stored hash to the current target cost while we have the password
+    if needs_rehash(user['password_hash']):
         try:
-            log_query = """
-                INSERT INTO auditlog (event_type, username, table_name, details, status)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            execute_query(log_query, (
-                'LOGIN',
-                username,
-                'users',
-                f'Failed login attempt - incorrect password',
-                'failed'
-            ), fetch=False)
-            print(f"[AUDIT] Successfully logged failed login for: {username}")
-        except Exception as e:
-            print(f"[AUDIT ERROR] Failed to log: {str(e)}")
-        
-        return jsonify({
-            'success': False,
-            'message': 'Invalid username or password'
-        }), 401
+            _store_rehash(user, hash_password(password))
+        except HashingUnavailable:
+            pass  # Pool is busy; upgrade on a later login
     
     # Generate JWT token
     token = generate_token(
@@ -98,17 +120,7 @@ def login():
     )
     
     # Log successful login
-    log_query = """
-        INSERT INTO auditlog (event_type, username, table_name, details, status)
-        VALUES (%s, %s, %s, %s, %s)
-    """
-    execute_query(log_query, (
-        'LOGIN',
-        username,
-        'users',
-        f'Successful login',
-        'success'
-    ), fetch=False)
+    audit_log('LOGIN', 'users', username, 'success', 'Successful login')
     
     return jsonify({
         'success': True,
@@ -124,27 +136,60 @@ def login():
         }
     })
 
+@bp.route('/unlock', methods=['POST'])
+@role_required(['Admin'])
+@handle_errors
+def unlock_login(current_user):
+    """
+    Clear the failed-login window of a username and/or client IP
+    
+    Body: {"username": ..., "ip": ...} (at least one)
+    """
+    data = request.get_json() or {}
+    username = data.get('username')
+    ip = data.get('ip')
+    
+    if not username and not ip:
+        return jsonify({
+            'success': False,
+            'message': 'username or ip is required'
+        }), 400
+    
+    released = throttle.unlock(username=username, ip=ip)
+    
+    target = ', '.join(f'{k}={v}' for k, v in (('username', username), ('ip', ip)) if v)
+    audit_log('UNLOCK', 'users', current_user['username'], 'success', f'Login throttle cleared for {target}')
+    
+    return jsonify({
+        'success': True,
+        'message': 'Login unlocked',
+        'data': {'released': released}
+    })
+
+@bp.route('/lockouts', methods=['GET'])
+@role_required(['Admin'])
+@handle_errors
+def get_lockouts():
+    """Principals currently locked in this server process (seconds remaining)"""
+    return jsonify({
+        'success': True,
+        'data': throttle.locked()
+    })
+
 @bp.route('/logout', methods=['POST'])
 @token_required
 @handle_errors
 def logout():
     """
-    Logout endpoint - log the logout event
+    Logout endpoint - revoke the token and log the logout event
     """
     user = request.current_user
     
+    # The token is rejected from now on, not only when it expires
+    revoke_token(user)
+    
     # Log logout
-    log_query = """
-        INSERT INTO auditlog (event_type, username, table_name, details, status)
-        VALUES (%s, %s, %s, %s, %s)
-    """
-    execute_query(log_query, (
-        'LOGOUT',
-        user['username'],
-        'users',
-        f'User logged out',
-        'success'
-    ), fetch=False)
+    audit_log('LOGOUT', 'users', user['username'], 'success', 'User logged out')
     
     return jsonify({
         'success': True,
@@ -210,6 +255,9 @@ def change_password():
     query = "SELECT password_hash FROM users WHERE user_id = %s"
     result = execute_query(query, (user['user_id'],), fetch_one=True)
     
+    # Hold no pooled connection while waiting for bcrypt (twice)
+    end_request_transaction()
+    
     if not result:
         return jsonify({
             'success': False,
@@ -226,26 +274,21 @@ def change_password():
     # Hash new password
     new_hash = hash_password(new_password)
     
-    # Update password
+    # Update password (on a fresh connection); only if nobody changed it meanwhile
     update_query = """
         UPDATE users 
         SET password_hash = %s, updated_at = CURRENT_TIMESTAMP
-        WHERE user_id = %s
+        WHERE user_id = %s AND password_hash = %s
     """
-    execute_query(update_query, (new_hash, user['user_id']), fetch=False)
+    updated = execute_query(update_query, (new_hash, user['user_id'], result['password_hash']), fetch=False)
+    if not updated:
+        return jsonify({
+            'success': False,
+            'message': 'Password was changed by another request; please retry'
+        }), 409
     
-    # Log password change
-    log_query = """
-        INSERT INTO auditlog (event_type, username, table_name, details, status)
-        VALUES (%s, %s, %s, %s, %s)
-    """
-    execute_query(log_query, (
-        'UPDATE',
-        user['username'],
-        'users',
-        'Password changed',
-        'success'
-    ), fetch=False)
+    # Log password change in the same transaction as the update
+    audit_log('UPDATE', 'users', user['username'], 'success', 'Password changed', sync=True)
     
     return jsonify({
         'success': True,
@@ -1,65 +1,24 @@
 from flask import Blueprint, jsonify, request
 from app.utils.database import execute_query
 from app.utils.auth import token_required
+from app.utils.cache import stats_cache
 
 bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 
+def _percent_change(current, previous):
+    """Period-over-period change as ('+12%', 'up')"""
+    if not previous:
+        return (f'+{current}', 'up') if current else ('0%', 'down')
+    change = round((current - previous) * 100 / previous)
+    return f'{change:+d}%', 'up' if change >= 0 else 'down'
+
 @bp.route('/stats', methods=['GET'])
 @token_required  # All authenticated users can view dashboard
 def get_stats(current_user):
     """Get dashboard statistics"""
     try:
-        # Get user count
-        user_count = execute_query("SELECT COUNT(*) as count FROM users")[0]['count']
-        
-        # Get role count
-        role_count = execute_query("SELECT COUNT(*) as count FROM roles")[0]['count']
-        
-        # Get failed logins (last 24 hours)
-        failed_logins = execute_query("""
-            SELECT COUNT(*) as count 
-            FROM auditlog 
-            WHERE event_type = 'FAILED_LOGIN' 
-                AND event_time >= NOW() - INTERVAL '24 hours'
-        """)[0]['count']
-        
-        # Get total audit entries
-        audit_count = execute_query("SELECT COUNT(*) as count FROM auditlog")[0]['count']
-        
-        stats = [
-            {
-                'label': 'Total Users',
-                'value': str(user_count),
-                'change': '+12%',
-                'trend': 'up',
-                'icon': '👥',
-                'color': '#007aff'
-            },
-            {
-                'label': 'Active Roles',
-                'value': str(role_count),
-                'change': '+3',
-                'trend': 'up',
-                'icon': '🔑',
-                'color': '#34c759'
-            },
-            {
-                'label': 'Failed Logins',
-                'value': str(failed_logins),
-                'change': '-15%',
-                'trend': 'down',
-                'icon': '❌',
-                'color': '#ff3b30'
-            },
-            {
-                'label': 'Audit Entries',
-                'value': str(audit_count),
-                'change': '+234',
-                'trend': 'up',
-                'icon': '📊',
-                'color': '#af52de'
-            }
-        ]
+        # One round trip, shared by every caller for STATS_CACHE_TTL seconds
+        stats = stats_cache.get('dashboard.stats', _load_stats)
         
         return jsonify({
             'success': True,
@@ -75,6 +34,76 @@ def get_stats(current_user):
             'error': str(e)
         }), 500
 
+def _load_stats():
+    """Dashboard cards from a single query"""
+    # Users / roles are small tables; audit figures come from the hourly
+    # rollup (O(buckets), not O(rows)). "Last 24 hours" is the current
+    # hour plus the 23 before it. Loaded outside the request transaction:
+    # a failed refresh must leave the cached value servable.
+    row = execute_query("""
+        WITH w AS (
+            SELECT date_trunc('hour', LOCALTIMESTAMP) - INTERVAL '23 hours' AS day_start,
+                   date_trunc('hour', LOCALTIMESTAMP) - INTERVAL '47 hours' AS prev_start
+        ),
+        audit AS (
+            SELECT
+                COALESCE(SUM(r.event_count), 0) AS audit_count,
+                COALESCE(SUM(r.event_count) FILTER (WHERE r.bucket >= w.day_start), 0) AS audit_24h,
+                COALESCE(SUM(r.event_count) FILTER (
+                    WHERE (r.event_type = 'FAILED_LOGIN' OR (r.event_type = 'LOGIN' AND lower(r.status) = 'failed')) AND r.bucket >= w.day_start), 0) AS failed_24h,
+                COALESCE(SUM(r.event_count) FILTER (
+                    WHERE (r.event_type = 'FAILED_LOGIN' OR (r.event_type = 'LOGIN' AND lower(r.status) = 'failed'))
+                      AND r.bucket >= w.prev_start AND r.bucket < w.day_start), 0) AS failed_prev_24h,
+                COUNT(DISTINCT u.role_id) FILTER (WHERE r.bucket >= w.day_start) AS active_roles_24h
+            FROM w
+            LEFT JOIN audit_rollup_hourly r ON TRUE
+            LEFT JOIN users u ON u.username = r.username
+            GROUP BY w.day_start, w.prev_start
+        )
+        SELECT
+            (SELECT COUNT(*) FROM users) AS user_count,
+            (SELECT COUNT(*) FROM users WHERE created_at >= LOCALTIMESTAMP - INTERVAL '7 days') AS new_users,
+            (SELECT COUNT(*) FROM roles) AS role_count,
+            audit.*
+        FROM audit
+    """, fetch_one=True, own_connection=True)
+    failed_change, failed_trend = _percent_change(row['failed_24h'], row['failed_prev_24h'])
+    
+    return [
+        {
+            'label': 'Total Users',
+            'value': str(row['user_count']),
+            'change': f"+{row['new_users']}",
+            'trend': 'up',
+            'icon': '👥',
+            'color': '#007aff'
+        },
+        {
+            'label': 'Active Roles',
+            'value': str(row['role_count']),
+            'change': f"{row['active_roles_24h']} active",
+            'trend': 'up' if row['active_roles_24h'] else 'down',
+            'icon': '🔑',
+            'color': '#34c759'
+        },
+        {
+            'label': 'Failed Logins',
+            'value': str(row['failed_24h']),
+            'change': failed_change,
+            'trend': failed_trend,
+            'icon': '❌',
+            'color': '#ff3b30'
+        },
+        {
+            'label': 'Audit Entries',
+            'value': str(row['audit_count']),
+            'change': f"+{row['audit_24h']}",
+            'trend': 'up',
+            'icon': '📊',
+            'color': '#af52de'
+        }
+    ]
+
 @bp.route('/activities', methods=['GET'])
 @token_required
 def get_recent_activities(current_user):
@@ -112,17 +141,7 @@ def get_recent_activities(current_user):
 def get_role_distribution(current_user):
     """Get role distribution"""
     try:
-        query = """
-            SELECT 
-                r.role_name as name,
-                COUNT(u.user_id) as value
-            FROM roles r
-            LEFT JOIN users u ON r.role_id = u.role_id
-            GROUP BY r.role_name
-            ORDER BY value DESC
-        """
-        
-        distribution = execute_query(query)
+        distribution = stats_cache.get('dashboard.role_distribution', _load_role_distribution)
         
         return jsonify({
             'success': True,
@@ -135,3 +154,15 @@ def get_role_distribution(current_user):
             'message': 'Error fetching role distribution',
             'error': str(e)
         }), 500
+
+def _load_role_distribution():
+    query = """
+        SELECT 
+            r.role_name as name,
+            COUNT(u.user_id) as value
+        FROM roles r
+        LEFT JOIN users u ON r.role_id = u.role_id
+        GROUP BY r.role_name
+        ORDER BY value DESC
+    """
+    return execute_query(query, own_connection=True)
@@ -1,15 +1,42 @@
 from flask import Blueprint, request, jsonify
-from app.utils.database import execute_query
-from app.utils.auth import token_required, role_required
+from app.utils.audit import audit_log
+from app.utils.database import execute_query, fetch_result, stream_query
+from app.utils.auth import token_required
+from app.utils.permissions import permission_required
+from app.utils.pagination import get_page_args, build_page
+from app.utils.streaming import wants_stream, stream_response
+from app.utils.serializer import json_response
+from app.utils.conditional import (
+    collection_versions, resource_validators, not_modified, with_validators,
+    if_match_versions, precondition_failed
+)
 
 medicalrecords_bp = Blueprint('medicalrecords', __name__)
 
 @medicalrecords_bp.route('/', methods=['GET'])
 @token_required
 def get_medical_records(current_user):
-    """Get all medical records - All authenticated users can view"""
+    """Get medical records page by page (latest first) - All authenticated users can view"""
     try:
+        try:
+            limit, cursor = get_page_args(('date', 'timestamp', 'integer'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        # Unchanged since the client's copy: answer before running the list query
+        etag, last_modified = collection_versions.validators(
+            'medical-records', ('medicalrecords', 'patients', 'users')
+        )
+        cached = not_modified(etag, last_modified, weak=True)
+        if cached is not None:
+            return cached
+        
         # All roles can SELECT medical records according to matrix
+        # Keyset pagination on (record_date, created_at, record_id)
+        # - idx_medicalrecords_date_created_id
         query = """
             SELECT mr.record_id, mr.patient_id, mr.doctor_id, mr.diagnosis, 
                    mr.treatment, mr.prescription, mr.notes, mr.record_date,
@@ -19,14 +46,37 @@ def get_medical_records(current_user):
             FROM medicalrecords mr
             JOIN patients p ON mr.patient_id = p.patient_id
             LEFT JOIN users u ON mr.doctor_id = u.user_id
-            ORDER BY mr.record_date DESC, mr.created_at DESC
         """
-        records = execute_query(query)
+        params = []
+        if cursor:
+            query += """
+            WHERE (mr.record_date, mr.created_at, mr.record_id)
+                < (%s::date, %s::timestamp, %s::integer)
+            """
+            params.extend(cursor)
+        query += " ORDER BY mr.record_date DESC, mr.created_at DESC, mr.record_id DESC"
         
-        return jsonify({
-            'success': True,
-            'records': records
-        }), 200
+        # ?stream=1 exports every remaining row through a server-side cursor
+        if wants_stream():
+            return with_validators(
+                stream_response(stream_query(query, tuple(params) or None), 'records'),
+                etag, last_modified, weak=True
+            )
+        
+        query += " LIMIT %s"
+        params.append(limit + 1)
+        
+        records, next_cursor = build_page(
+            fetch_result(query, tuple(params)), limit,
+            ('record_date', 'created_at', 'record_id')
+        )
+        
+        return with_validators(json_response(
+            success=True,
+            records=records,
+            next_cursor=next_cursor,
+            limit=limit
+        ), etag, last_modified, weak=True)
         
     except Exception as e:
         return jsonify({
@@ -44,7 +94,8 @@ def get_medical_record(current_user, record_id):
                    mr.treatment, mr.prescription, mr.notes, mr.record_date,
                    mr.created_at, mr.updated_at,
                    p.first_name || ' ' || p.last_name as patient_name,
-                   u.username as doctor_name
+                   u.username as doctor_name,
+                   p.updated_at as patient_updated_at
             FROM medicalrecords mr
             JOIN patients p ON mr.patient_id = p.patient_id
             LEFT JOIN users u ON mr.doctor_id = u.user_id
@@ -58,10 +109,19 @@ def get_medical_record(current_user, record_id):
                 'message': 'Medical record not found'
             }), 404
         
-        return jsonify({
+        # The embedded patient name changes the representation too
+        record = record[0]
+        etag, last_modified = resource_validators(
+            record['updated_at'], record.pop('patient_updated_at')
+        )
+        cached = not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+        
+        return with_validators(jsonify({
             'success': True,
-            'record': record[0]
-        }), 200
+            'record': record
+        }), etag, last_modified)
         
     except Exception as e:
         return jsonify({
@@ -84,12 +144,9 @@ def get_patient_records(current_user, patient_id):
             WHERE mr.patient_id = %s
             ORDER BY mr.record_date DESC
         """
-        records = execute_query(query, (patient_id,))
+        records = fetch_result(query, (patient_id,))
         
-        return jsonify({
-            'success': True,
-            'records': records
-        }), 200
+        return json_response(success=True, records=records)
         
     except Exception as e:
         return jsonify({
@@ -98,7 +155,7 @@ def get_patient_records(current_user, patient_id):
         }), 500
 
 @medicalrecords_bp.route('/', methods=['POST'])
-@role_required(['Admin', 'Doctor'])
+@permission_required('medicalrecords', 'INSERT')
 def create_medical_record(current_user):
     """Create new medical record - Admin and Doctor only (per matrix)"""
     try:
@@ -146,17 +203,7 @@ def create_medical_record(current_user):
         ), fetch=True)
         
         # Log the action in audit log
-        audit_query = """
-            INSERT INTO auditlog (event_type, table_name, username, status, details)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        execute_query(audit_query, (
-            'INSERT',
-            'medicalrecords',
-            current_user['username'],
-            'success',
-            f"Created medical record for patient ID: {patient_id}"
-        ), fetch=False)
+        audit_log('INSERT', 'medicalrecords', current_user['username'], 'success', f"Created medical record for patient ID: {patient_id}")
         
         return jsonify({
             'success': True,
@@ -171,11 +218,15 @@ def create_medical_record(current_user):
         }), 500
 
 @medicalrecords_bp.route('/<int:record_id>', methods=['PUT'])
-@role_required(['Admin', 'Doctor'])
+@permission_required('medicalrecords', 'UPDATE')
 def update_medical_record(current_user, record_id):
-    """Update medical record - Admin and Doctor only (per matrix)"""
+    """
+    Update medical record - Admin and Doctor only (per matrix)
+    With If-Match (the ETag from GET) the update only applies if nobody changed the record since
+    """
     try:
         data = request.get_json()
+        expected = if_match_versions()
         
         # If user is Doctor, verify they own this record
         if current_user['role_name'] == 'Doctor':
@@ -211,26 +262,44 @@ def update_medical_record(current_user, record_id):
             SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
             WHERE record_id = %s
         """
+        if expected is not None:
+            # Compare-and-set in the UPDATE itself: no row lock held between GET and PUT
+            query += " AND updated_at = ANY(%s::timestamp[])"
+            values.append(expected)
+        query += """
+            RETURNING updated_at,
+                      (SELECT updated_at FROM patients p WHERE p.patient_id = medicalrecords.patient_id)
+                          AS patient_updated_at
+        """
         
-        execute_query(query, tuple(values), fetch=False)
+        updated = execute_query(query, tuple(values))
+        
+        if not updated:
+            current = execute_query("""
+                SELECT mr.updated_at, p.updated_at AS patient_updated_at
+                FROM medicalrecords mr
+                JOIN patients p ON mr.patient_id = p.patient_id
+                WHERE mr.record_id = %s
+            """, (record_id,))
+            if current:
+                return precondition_failed(resource_validators(
+                    current[0]['updated_at'], current[0]['patient_updated_at']
+                )[0])
+            return jsonify({
+                'success': False,
+                'message': 'Medical record not found'
+            }), 404
         
         # Log the action in audit log
-        audit_query = """
-            INSERT INTO auditlog (event_type, table_name, username, status, details)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        execute_query(audit_query, (
-            'UPDATE',
-            'medicalrecords',
-            current_user['username'],
-            'success',
-            f"Updated medical record ID: {record_id}"
-        ), fetch=False)
+        audit_log('UPDATE', 'medicalrecords', current_user['username'], 'success', f"Updated medical record ID: {record_id}")
         
-        return jsonify({
+        etag, last_modified = resource_validators(
+            updated[0]['updated_at'], updated[0]['patient_updated_at']
+        )
+        return with_validators(jsonify({
             'success': True,
             'message': 'Medical record updated successfully'
-        }), 200
+        }), etag, last_modified)
         
     except Exception as e:
         return jsonify({
@@ -239,7 +308,7 @@ def update_medical_record(current_user, record_id):
         }), 500
 
 @medicalrecords_bp.route('/<int:record_id>', methods=['DELETE'])
-@role_required(['Admin'])
+@permission_required('medicalrecords', 'DELETE')
 def delete_medical_record(current_user, record_id):
     """Delete medical record - Admin only (per matrix)"""
     try:
@@ -263,17 +332,7 @@ def delete_medical_record(current_user, record_id):
         execute_query(query, (record_id,), fetch=False)
         
         # Log the action in audit log
-        audit_query = """
-            INSERT INTO auditlog (event_type, table_name, username, status, details)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        execute_query(audit_query, (
-            'DELETE',
-            'medicalrecords',
-            current_user['username'],
-            'success',
-            f"Deleted medical record for patient: {record[0]['patient_name']}"
-        ), fetch=False)
+        audit_log('DELETE', 'medicalrecords', current_user['username'], 'success', f"Deleted medical record for patient: {record[0]['patient_name']}")
         
         return jsonify({
             'success': True,
@@ -1,27 +1,294 @@
+import re
+from datetime import date
+import psycopg2
 from flask import Blueprint, request, jsonify
-from app.utils.database import execute_query
-from app.utils.auth import token_required, role_required
+from app.config import Config
+from app.utils.audit import audit_log
+from app.utils.database import execute_query, fetch_result, stream_query, get_request_connection
+from app.utils.auth import token_required
+from app.utils.permissions import permission_required
+from app.utils.pagination import get_page_args, build_page
+from app.utils.streaming import wants_stream, stream_response
+from app.utils.serializer import json_response, RawJSON
+from app.utils.conditional import (
+    collection_versions, resource_validators, not_modified, with_validators,
+    if_match_versions, precondition_failed
+)
+from app.utils.patient_import import PATIENT_REQUIRED_FIELDS, PatientImporter, open_csv, summarize
 
 patients_bp = Blueprint('patients', __name__)
 
+# Search expressions - must match the PATIENT SEARCH indexes in performance_indexes.sql exactly
+NAME_EXPR = "lower(first_name || ' ' || last_name)"
+PHONE_EXPR = "regexp_replace(phone, '[^0-9]', '', 'g')"
+EMAIL_EXPR = "lower(btrim(email))"
+
+# Whole chart in one statement: each section is a json_agg over an index range
+# (idx_appointments_patient_date, idx_medicalrecords_patient_date)
+CHART_SQL = """
+    SELECT json_build_object(
+        'patient', json_build_object(
+            'patient_id', p.patient_id,
+            'first_name', p.first_name,
+            'last_name', p.last_name,
+            'date_of_birth', p.date_of_birth,
+            'gender', p.gender,
+            'phone', p.phone,
+            'email', p.email,
+            'address', p.address,
+            'created_at', p.created_at,
+            'updated_at', p.updated_at
+        ),
+        'upcoming_appointments', COALESCE((
+            SELECT json_agg(a ORDER BY a.appointment_date, a.appointment_time)
+            FROM (
+                SELECT a.appointment_id, a.doctor_id, u.username AS doctor_name,
+                       a.appointment_date, a.appointment_time, a.status,
+                       a.reason, a.notes, a.created_at
+                FROM appointments a
+                LEFT JOIN users u ON a.doctor_id = u.user_id
+                WHERE a.patient_id = p.patient_id AND a.appointment_date >= CURRENT_DATE
+                ORDER BY a.appointment_date, a.appointment_time
+                LIMIT %s
+            ) a
+        ), '[]'),
+        'past_appointments', COALESCE((
+            SELECT json_agg(a ORDER BY a.appointment_date DESC, a.appointment_time DESC)
+            FROM (
+                SELECT a.appointment_id, a.doctor_id, u.username AS doctor_name,
+                       a.appointment_date, a.appointment_time, a.status,
+                       a.reason, a.notes, a.created_at
+                FROM appointments a
+                LEFT JOIN users u ON a.doctor_id = u.user_id
+                WHERE a.patient_id = p.patient_id AND a.appointment_date < CURRENT_DATE
+                ORDER BY a.appointment_date DESC, a.appointment_time DESC
+                LIMIT %s
+            ) a
+        ), '[]'),
+        'medical_records', COALESCE((
+            SELECT json_agg(r ORDER BY r.record_date DESC, r.created_at DESC)
+            FROM (
+                SELECT mr.record_id, mr.doctor_id, u.username AS doctor_name,
+                       mr.diagnosis, mr.treatment, mr.prescription, mr.notes,
+                       mr.record_date, mr.created_at, mr.updated_at
+                FROM medicalrecords mr
+                LEFT JOIN users u ON mr.doctor_id = u.user_id
+                WHERE mr.patient_id = p.patient_id
+                ORDER BY mr.record_date DESC, mr.created_at DESC
+                LIMIT %s
+            ) r
+        ), '[]'),
+        'totals', json_build_object(
+            'upcoming_appointments', (SELECT count(*) FROM appointments
+                                      WHERE patient_id = p.patient_id AND appointment_date >= CURRENT_DATE),
+            'past_appointments', (SELECT count(*) FROM appointments
+                                  WHERE patient_id = p.patient_id AND appointment_date < CURRENT_DATE),
+            'medical_records', (SELECT count(*) FROM medicalrecords WHERE patient_id = p.patient_id)
+        )
+    )::text AS chart
+    FROM patients p
+    WHERE p.patient_id = %s
+"""
+
+# Query arg -> default limit for each chart section
+CHART_SECTIONS = (
+    ('upcoming', 'CHART_UPCOMING_LIMIT'),
+    ('past', 'CHART_PAST_LIMIT'),
+    ('records', 'CHART_RECORDS_LIMIT'),
+)
+
+# Rows each match branch (exact / prefix / fuzzy) may contribute before ranking;
+# keeps a search bounded however many patients share a common prefix
+SEARCH_CANDIDATES = 200
+
+# Trigrams need at least this many characters to say anything useful
+FUZZY_MIN_LENGTH = 3
+
+def _like_prefix(value):
+    """Escape LIKE wildcards in user input and append %"""
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def _search_args(args):
+    """
+    Normalize the search query string
+
+    Returns:
+        (name, filters, limit): name is lower-cased with single spaces (or None);
+        filters is a list of (sql, param) matched by every result
+    Raises:
+        ValueError on bad input
+    """
+    name = ' '.join((args.get('q') or '').lower().split()) or None
+
+    filters = []
+    phone = args.get('phone')
+    if phone:
+        digits = re.sub(r'[^0-9]', '', phone)
+        if len(digits) < 3:
+            raise ValueError('phone must contain at least 3 digits')
+        # Prefix match: a partial number narrows as the user types
+        filters.append((f"phone IS NOT NULL AND {PHONE_EXPR} LIKE %s", digits + '%'))
+
+    email = args.get('email')
+    if email:
+        filters.append((f"email IS NOT NULL AND {EMAIL_EXPR} = %s", email.strip().lower()))
+
+    dob = args.get('dob')
+    if dob:
+        try:
+            filters.append(("date_of_birth = %s", date.fromisoformat(dob)))
+        except ValueError:
+            raise ValueError('dob must be a date (YYYY-MM-DD)')
+
+    if not name and not filters:
+        raise ValueError('Provide at least one of q, phone, email or dob')
+
+    try:
+        limit = int(args.get('limit', Config.PATIENT_SEARCH_LIMIT_DEFAULT))
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    limit = max(1, min(limit, Config.PATIENT_SEARCH_LIMIT_MAX))
+
+    return name, filters, limit
+
+def _search_query(name, filters, limit):
+    """Build the ranked search query and its parameters"""
+    columns = """patient_id, first_name, last_name, date_of_birth,
+                   gender, phone, email, address, created_at, updated_at"""
+    filter_sql = ''.join(f" AND {sql}" for sql, _ in filters)
+    filter_params = [param for _, param in filters]
+
+    if not name:
+        # Filters only: the most selective index wins, order alphabetically
+        query = f"""
+            SELECT {columns}, NULL AS match, NULL::real AS score
+            FROM patients
+            WHERE TRUE{filter_sql}
+            ORDER BY last_name, first_name, patient_id
+            LIMIT %s
+        """
+        return query, filter_params + [limit]
+
+    prefix = _like_prefix(name)
+
+    # Each branch is index-backed and capped; UNION removes duplicates
+    branches = [
+        ("(lower(last_name) = %s OR lower(first_name) = %s OR " + NAME_EXPR + " = %s)",
+         [name, name, name]),
+        ("(lower(last_name) LIKE %s OR lower(first_name) LIKE %s OR " + NAME_EXPR + " LIKE %s)",
+         [prefix, prefix, prefix]),
+    ]
+    if len(name) >= FUZZY_MIN_LENGTH:
+        # pg_trgm.similarity_threshold (default 0.3) decides what is close enough
+        branches.append((f"{NAME_EXPR} %% %s", [name]))
+
+    candidates = []
+    params = []
+    for condition, condition_params in branches:
+        candidates.append(
+            f"(SELECT patient_id FROM patients WHERE {condition}{filter_sql} LIMIT %s)"
+        )
+        params.extend(condition_params + filter_params + [SEARCH_CANDIDATES])
+
+    query = f"""
+        WITH candidates AS (
+            {' UNION '.join(candidates)}
+        ),
+        ranked AS (
+            SELECT p.*,
+                   CASE
+                       WHEN lower(p.last_name) = %s OR lower(p.first_name) = %s
+                            OR {NAME_EXPR} = %s THEN 0
+                       WHEN lower(p.last_name) LIKE %s OR lower(p.first_name) LIKE %s
+                            OR {NAME_EXPR} LIKE %s THEN 1
+                       ELSE 2
+                   END AS match_rank,
+                   similarity({NAME_EXPR}, %s) AS score
+            FROM candidates c
+            JOIN patients p USING (patient_id)
+        )
+        SELECT {columns},
+               (ARRAY['exact', 'prefix', 'fuzzy'])[match_rank + 1] AS match,
+               round(score::numeric, 3)::real AS score
+        FROM ranked
+        ORDER BY match_rank, ranked.score DESC, last_name, first_name, patient_id
+        LIMIT %s
+    """
+    params.extend([name, name, name, prefix, prefix, prefix, name, limit])
+    return query, params
+
 @patients_bp.route('/', methods=['GET'])
 @token_required
 def get_patients(current_user):
-    """Get all patients - All authenticated users can view"""
+    """
+    Get patients page by page (newest first) - All authenticated users can view
+    Each row carries last visit, next appointment, counts and assigned doctor from patient_summary
+    """
     try:
+        try:
+            limit, cursor = get_page_args(('timestamp', 'integer'))
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        # Unchanged since the client's copy: answer before running the list query
+        # next_appointment_* are hidden once their day passes (CURRENT_DATE)
+        etag, last_modified = collection_versions.validators(
+            'patients', ('patients', 'patient_summary', 'users'), by_date=True
+        )
+        cached = not_modified(etag, last_modified, weak=True)
+        if cached is not None:
+            return cached
+        
         # All roles can SELECT patients according to matrix
+        # Keyset pagination on (created_at, patient_id) - idx_patients_created_at_id;
+        # history figures come from patient_summary (one primary-key probe per row)
         query = """
-            SELECT patient_id, first_name, last_name, date_of_birth, 
-                   gender, phone, email, address, created_at, updated_at
-            FROM patients
-            ORDER BY created_at DESC
+            SELECT p.patient_id, p.first_name, p.last_name, p.date_of_birth, 
+                   p.gender, p.phone, p.email, p.address, p.created_at, p.updated_at,
+                   s.last_visit,
+                   CASE WHEN s.next_appointment_date >= CURRENT_DATE
+                        THEN s.next_appointment_id END AS next_appointment_id,
+                   CASE WHEN s.next_appointment_date >= CURRENT_DATE
+                        THEN s.next_appointment_date END AS next_appointment_date,
+                   CASE WHEN s.next_appointment_date >= CURRENT_DATE
+                        THEN s.next_appointment_time END AS next_appointment_time,
+                   COALESCE(s.appointment_count, 0) AS appointment_count,
+                   COALESCE(s.record_count, 0) AS record_count,
+                   s.assigned_doctor_id,
+                   d.username AS assigned_doctor_name
+            FROM patients p
+            LEFT JOIN patient_summary s ON s.patient_id = p.patient_id
+            LEFT JOIN users d ON d.user_id = s.assigned_doctor_id
         """
-        patients = execute_query(query)
+        params = []
+        if cursor:
+            query += " WHERE (p.created_at, p.patient_id) < (%s::timestamp, %s::integer)"
+            params.extend(cursor)
+        query += " ORDER BY p.created_at DESC, p.patient_id DESC"
         
-        return jsonify({
-            'success': True,
-            'patients': patients
-        }), 200
+        # ?stream=1 exports every remaining row through a server-side cursor
+        if wants_stream():
+            return with_validators(
+                stream_response(stream_query(query, tuple(params) or None), 'patients'),
+                etag, last_modified, weak=True
+            )
+        
+        query += " LIMIT %s"
+        params.append(limit + 1)
+        
+        patients, next_cursor = build_page(
+            fetch_result(query, tuple(params)), limit, ('created_at', 'patient_id')
+        )
+        
+        return with_validators(json_response(
+            success=True,
+            patients=patients,
+            next_cursor=next_cursor,
+            limit=limit
+        ), etag, last_modified, weak=True)
         
     except Exception as e:
         return jsonify({
@@ -29,6 +296,55 @@ def get_patients(current_user):
             'message': f'Error fetching patients: {str(e)}'
         }), 500
 
+@patients_bp.route('/search', methods=['GET'])
+@token_required
+def search_patients(current_user):
+    """
+    Find patients for the front desk - All authenticated users can search
+
+    Query args (at least one of q, phone, email, dob):
+        q: Name; exact, then prefix, then fuzzy matches (first, last or "first last")
+        phone: Any formatting; matched on digits, partial numbers match by prefix
+        email: Case-insensitive exact match
+        dob: Date of birth, YYYY-MM-DD
+        limit: Results (default PATIENT_SEARCH_LIMIT_DEFAULT, max PATIENT_SEARCH_LIMIT_MAX)
+    """
+    try:
+        try:
+            name, filters, limit = _search_args(request.args)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        query, params = _search_query(name, filters, limit)
+        
+        if Config.PATIENT_SEARCH_TIMEOUT_MS > 0:
+            # Cancel a pathological search instead of holding a connection
+            execute_query(f"SET LOCAL statement_timeout = {int(Config.PATIENT_SEARCH_TIMEOUT_MS)}", fetch=False)
+        
+        try:
+            patients = fetch_result(query, tuple(params))
+        except psycopg2.errors.QueryCanceled:
+            return jsonify({
+                'success': False,
+                'message': 'Search took too long; add more characters or another filter'
+            }), 503
+        
+        return json_response(
+            success=True,
+            patients=patients,
+            count=len(patients),
+            limit=limit
+        )
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error searching patients: {str(e)}'
+        }), 500
+
 @patients_bp.route('/<int:patient_id>', methods=['GET'])
 @token_required
 def get_patient(current_user, patient_id):
@@ -48,10 +364,15 @@ def get_patient(current_user, patient_id):
                 'message': 'Patient not found'
             }), 404
         
-        return jsonify({
+        etag, last_modified = resource_validators(patient[0]['updated_at'])
+        cached = not_modified(etag, last_modified)
+        if cached is not None:
+            return cached
+        
+        return with_validators(jsonify({
             'success': True,
             'patient': patient[0]
-        }), 200
+        }), etag, last_modified)
         
     except Exception as e:
         return jsonify({
@@ -59,16 +380,54 @@ def get_patient(current_user, patient_id):
             'message': f'Error fetching patient: {str(e)}'
         }), 500
 
+@patients_bp.route('/<int:patient_id>/chart', methods=['GET'])
+@token_required
+def get_patient_chart(current_user, patient_id):
+    """
+    Patient demographics, upcoming and past appointments and medical records
+    in one query - All authenticated users can view
+
+    Query args ?upcoming=, ?past=, ?records= set rows per section
+    (defaults CHART_*_LIMIT, max CHART_SECTION_LIMIT_MAX); `totals` gives the full counts.
+    """
+    try:
+        limits = []
+        for arg, setting in CHART_SECTIONS:
+            try:
+                limit = int(request.args.get(arg, getattr(Config, setting)))
+            except (TypeError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'message': f'{arg} must be an integer'
+                }), 400
+            limits.append(max(0, min(limit, Config.CHART_SECTION_LIMIT_MAX)))
+        
+        # The chart is built as JSON text by PostgreSQL and passed through unparsed
+        chart = execute_query(CHART_SQL, tuple(limits) + (patient_id,), fetch_one=True)
+        
+        if not chart:
+            return jsonify({
+                'success': False,
+                'message': 'Patient not found'
+            }), 404
+        
+        return json_response(success=True, chart=RawJSON(chart['chart']))
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error fetching patient chart: {str(e)}'
+        }), 500
+
 @patients_bp.route('/', methods=['POST'])
-@role_required(['Admin', 'Receptionist'])
+@permission_required('patients', 'INSERT')
 def create_patient(current_user):
     """Create new patient - Admin and Receptionist only (per matrix)"""
     try:
         data = request.get_json()
         
         # Validate required fields
-        required_fields = ['first_name', 'last_name', 'date_of_birth', 'gender']
-        for field in required_fields:
+        for field in PATIENT_REQUIRED_FIELDS:
             if not data.get(field):
                 return jsonify({
                     'success': False,
@@ -93,17 +452,7 @@ def create_patient(current_user):
         ))
         
         # Log the action in audit log
-        audit_query = """
-            INSERT INTO auditlog (event_type, table_name, username, status, details)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        execute_query(audit_query, (
-            'INSERT',
-            'patients',
-            current_user['username'],
-            'success',
-            f"Created patient: {data['first_name']} {data['last_name']}"
-        ), fetch=False)
+        audit_log('INSERT', 'patients', current_user['username'], 'success', f"Created patient: {data['first_name']} {data['last_name']}")
         
         return jsonify({
             'success': True,
@@ -117,12 +466,73 @@ def create_patient(current_user):
             'message': f'Error creating patient: {str(e)}'
         }), 500
 
+@patients_bp.route('/import', methods=['POST'])
+@permission_required('patients', 'INSERT')
+def import_patients(current_user):
+    """
+    Bulk-create patients from a CSV upload - Admin and Receptionist only (per matrix)
+
+    Send the file as multipart field `file` or as a text/csv body. The header
+    must contain first_name, last_name, date_of_birth and gender (phone, email
+    and address are optional). Valid rows are imported, invalid rows and
+    duplicates are reported by line number. ?dry_run=1 validates without importing.
+    """
+    try:
+        upload = request.files.get('file')
+        if upload is not None:
+            raw, source = upload.stream, upload.filename or 'upload'
+        elif request.mimetype in ('text/csv', 'text/plain'):
+            raw, source = request.stream, 'request body'
+        else:
+            return jsonify({
+                'success': False,
+                'message': 'Send a CSV file as multipart field "file" or a text/csv body'
+            }), 400
+        
+        dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'yes')
+        conn = get_request_connection()
+        importer = PatientImporter(
+            conn,
+            batch_size=Config.PATIENT_IMPORT_BATCH_SIZE,
+            max_errors=Config.PATIENT_IMPORT_MAX_ERRORS,
+            created_by=current_user.get('user_id')
+        )
+        
+        try:
+            result = importer.run(open_csv(raw), dry_run=dry_run)
+        except ValueError as e:
+            # Bad header or encoding: nothing is merged
+            conn.rollback()
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        if dry_run:
+            conn.rollback()
+        else:
+            # One summarized entry, committed with the imported rows
+            audit_log('IMPORT', 'patients', current_user['username'], 'success',
+                      summarize(result, source), sync=True)
+        
+        return json_response(success=True, **result)
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error importing patients: {str(e)}'
+        }), 500
+
 @patients_bp.route('/<int:patient_id>', methods=['PUT'])
-@role_required(['Admin'])
+@permission_required('patients', 'UPDATE')
 def update_patient(current_user, patient_id):
-    """Update patient - Admin only (per matrix)"""
+    """
+    Update patient - Admin only (per matrix)
+    With If-Match (the ETag from GET) the update only applies if nobody changed the patient since
+    """
     try:
         data = request.get_json()
+        expected = if_match_versions()
         
         # Build dynamic UPDATE query based on provided fields
         update_fields = []
@@ -149,26 +559,31 @@ def update_patient(current_user, patient_id):
             SET {', '.join(update_fields)}, updated_at = CURRENT_TIMESTAMP
             WHERE patient_id = %s
         """
+        if expected is not None:
+            # Compare-and-set in the UPDATE itself: no row lock held between GET and PUT
+            query += " AND updated_at = ANY(%s::timestamp[])"
+            values.append(expected)
+        query += " RETURNING updated_at"
         
-        execute_query(query, tuple(values), fetch=False)
+        updated = execute_query(query, tuple(values))
+        
+        if not updated:
+            current = execute_query("SELECT updated_at FROM patients WHERE patient_id = %s", (patient_id,))
+            if current:
+                return precondition_failed(resource_validators(current[0]['updated_at'])[0])
+            return jsonify({
+                'success': False,
+                'message': 'Patient not found'
+            }), 404
         
         # Log the action in audit log
-        audit_query = """
-            INSERT INTO auditlog (event_type, table_name, username, status, details)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        execute_query(audit_query, (
-            'UPDATE',
-            'patients',
-            current_user['username'],
-            'success',
-            f"Updated patient ID: {patient_id}"
-        ), fetch=False)
+        audit_log('UPDATE', 'patients', current_user['username'], 'success', f"Updated patient ID: {patient_id}")
         
-        return jsonify({
+        etag, last_modified = resource_validators(updated[0]['updated_at'])
+        return with_validators(jsonify({
             'success': True,
             'message': 'Patient updated successfully'
-        }), 200
+        }), etag, last_modified)
         
     except Exception as e:
         return jsonify({
@@ -177,7 +592,7 @@ def update_patient(current_user, patient_id):
         }), 500
 
 @patients_bp.route('/<int:patient_id>', methods=['DELETE'])
-@role_required(['Admin'])
+@permission_required('patients', 'DELETE')
 def delete_patient(current_user, patient_id):
     """Delete patient - Admin only (per matrix)"""
     try:
@@ -196,17 +611,7 @@ def delete_patient(current_user, patient_id):
         execute_query(query, (patient_id,), fetch=False)
         
         # Log the action in audit log
-        audit_query = """
-            INSERT INTO auditlog (event_type, table_name, username, status, details)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        execute_query(audit_query, (
-            'DELETE',
-            'patients',
-            current_user['username'],
-            'success',
-            f"Deleted patient: {patient[0]['first_name']} {patient[0]['last_name']}"
-        ), fetch=False)
+        audit_log('DELETE', 'patients', current_user['username'], 'success', f"Deleted patient: {patient[0]['first_name']} {patient[0]['last_name']}")
         
         return jsonify({
             'success': True,
@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request
 from app.utils.database import execute_query
 from app.utils.decorators import handle_errors
+from app.utils.auth import role_required
+from app.utils.permissions import engine
 
 bp = Blueprint('permissions', __name__, url_prefix='/api/permissions')
 
@@ -28,12 +30,28 @@ def get_all_permissions():
 @bp.route('/matrix', methods=['GET'])
 @handle_errors
 def get_permission_matrix():
-    """Get complete permission matrix"""
+    """
+    Get complete permission matrix
+    
+    `permissions` holds effective grants (direct or inherited from a parent
+    role); `direct` and `inherited` split them by source.
+    """
     
-    # Get all roles
-    roles_query = "SELECT role_name FROM roles ORDER BY role_id"
+    # Roles with their parent role names
+    roles_query = """
+        SELECT 
+            r.role_name,
+            COALESCE(ARRAY_AGG(pr.role_name ORDER BY pr.role_name)
+                     FILTER (WHERE pr.role_name IS NOT NULL), '{}') as parents
+        FROM roles r
+        LEFT JOIN role_parents rel ON rel.role_id = r.role_id
+        LEFT JOIN roles pr ON pr.role_id = rel.parent_role_id
+        GROUP BY r.role_id, r.role_name
+        ORDER BY r.role_id
+    """
     roles_result = execute_query(roles_query)
     roles = [r['role_name'] for r in roles_result]
+    parents = {r['role_name']: r['parents'] for r in roles_result}
     
     # Get all resources and actions
     resources_query = """
@@ -46,53 +64,65 @@ def get_permission_matrix():
     resources_result = execute_query(resources_query)
     resources = [{'name': r['resource_name'], 'actions': r['actions']} for r in resources_result]
     
-    # Get all role-permission mappings
+    # Effective role-permission mappings, resolved through role_closure
     permissions_query = """
         SELECT 
             r.role_name,
             p.resource_name,
-            p.action_name
-        FROM role_permissions rp
-        JOIN roles r ON rp.role_id = r.role_id
-        JOIN permissions p ON rp.permission_id = p.permission_id
+            p.action_name,
+            ep.direct,
+            ep.inherited_from
+        FROM vw_effective_permissions ep
+        JOIN roles r ON ep.role_id = r.role_id
+        JOIN permissions p ON ep.permission_id = p.permission_id
+        ORDER BY p.action_name
     """
     permissions_result = execute_query(permissions_query)
     
-    # Build permissions dict
-    permissions = {}
+    # Build permissions dicts
+    permissions, direct, inherited = {}, {}, {}
     for role in roles:
-        permissions[role] = {}
-        for resource in resources:
-            permissions[role][resource['name']] = []
+        for matrix in (permissions, direct, inherited):
+            matrix[role] = {resource['name']: [] for resource in resources}
     
     for perm in permissions_result:
         role = perm['role_name']
         resource = perm['resource_name']
         action = perm['action_name']
-        if role in permissions and resource in permissions[role]:
-            permissions[role][resource].append(action)
+        if role not in permissions or resource not in permissions[role]:
+            continue
+        permissions[role][resource].append(action)
+        if perm['direct']:
+            direct[role][resource].append(action)
+        if perm['inherited_from']:
+            inherited[role][resource].append({'action': action, 'from': perm['inherited_from']})
     
     return jsonify({
         'success': True,
         'data': {
             'roles': roles,
+            'parents': parents,
             'resources': resources,
-            'permissions': permissions
+            'permissions': permissions,
+            'direct': direct,
+            'inherited': inherited
         }
     })
 
 @bp.route('/role/<int:role_id>', methods=['GET'])
 @handle_errors
 def get_permissions_by_role(role_id):
-    """Get all permissions for a specific role"""
+    """Get all effective permissions for a specific role, direct and inherited"""
     query = """
         SELECT 
             p.resource_name,
             p.action_name,
-            p.description
-        FROM role_permissions rp
-        JOIN permissions p ON rp.permission_id = p.permission_id
-        WHERE rp.role_id = %s
+            p.description,
+            ep.direct,
+            ep.inherited_from
+        FROM vw_effective_permissions ep
+        JOIN permissions p ON ep.permission_id = p.permission_id
+        WHERE ep.role_id = %s
         ORDER BY p.resource_name, p.action_name
     """
     
@@ -104,6 +134,7 @@ def get_permissions_by_role(role_id):
     })
 
 @bp.route('/grant', methods=['POST'])
+@role_required(['Admin'])
 @handle_errors
 def grant_permission():
     """Grant a permission to a role"""
@@ -137,13 +168,17 @@ def grant_permission():
     
     result = execute_query(grant_query, (role_id, permission['permission_id']), fetch_one=True)
     
-    return jsonify({
+    response = jsonify({
         'success': True,
         'message': 'Permission granted successfully',
         'data': result
     })
+    # Re-check the version once the request transaction has committed
+    response.call_on_close(engine.invalidate)
+    return response
 
 @bp.route('/revoke', methods=['POST'])
+@role_required(['Admin'])
 @handle_errors
 def revoke_permission():
     """Revoke a permission from a role"""
@@ -182,7 +217,9 @@ def revoke_permission():
             'message': 'Permission not found for this role'
         }), 404
     
-    return jsonify({
+    response = jsonify({
         'success': True,
         'message': 'Permission revoked successfully'
     })
+    response.call_on_close(engine.invalidate)
+    return response
@@ -1,7 +1,9 @@
 from flask import Blueprint, jsonify, request
+from app.utils.audit import audit_log
 from app.utils.database import execute_query, execute_transaction
 from app.utils.decorators import handle_errors
 from app.utils.auth import role_required
+from app.utils.permissions import engine as permission_engine
 
 bp = Blueprint('roles', __name__, url_prefix='/api/roles')
 
@@ -14,11 +16,16 @@ def get_all_roles():
         SELECT 
             r.role_id,
             r.role_name,
-            COUNT(u.user_id) as user_count,
-            0 as permission_count
+            (SELECT COUNT(*) FROM users u WHERE u.role_id = r.role_id) as user_count,
+            (SELECT COUNT(*) FROM vw_effective_permissions ep
+             WHERE ep.role_id = r.role_id) as permission_count,
+            (SELECT COUNT(*) FROM role_permissions rp
+             WHERE rp.role_id = r.role_id) as direct_permission_count,
+            COALESCE((SELECT ARRAY_AGG(pr.role_name ORDER BY pr.role_name)
+                      FROM role_parents rel
+                      JOIN roles pr ON pr.role_id = rel.parent_role_id
+                      WHERE rel.role_id = r.role_id), '{}') as parents
         FROM roles r
-        LEFT JOIN users u ON r.role_id = u.role_id
-        GROUP BY r.role_id, r.role_name
         ORDER BY r.role_id
     """
     
@@ -43,12 +50,21 @@ def get_role(role_id):
     """Get role by ID"""
     query = """
         SELECT r.*, 
-               COUNT(DISTINCT u.user_id) as user_count,
-               0 as permission_count
+               (SELECT COUNT(*) FROM users u WHERE u.role_id = r.role_id) as user_count,
+               (SELECT COUNT(*) FROM vw_effective_permissions ep
+                WHERE ep.role_id = r.role_id) as permission_count,
+               (SELECT COUNT(*) FROM role_permissions rp
+                WHERE rp.role_id = r.role_id) as direct_permission_count,
+               COALESCE((SELECT ARRAY_AGG(pr.role_name ORDER BY pr.role_name)
+                         FROM role_parents rel
+                         JOIN roles pr ON pr.role_id = rel.parent_role_id
+                         WHERE rel.role_id = r.role_id), '{}') as parents,
+               COALESCE((SELECT ARRAY_AGG(ar.role_name ORDER BY c.depth, ar.role_name)
+                         FROM role_closure c
+                         JOIN roles ar ON ar.role_id = c.ancestor_id
+                         WHERE c.descendant_id = r.role_id AND c.depth > 0), '{}') as ancestors
         FROM roles r
-        LEFT JOIN users u ON r.role_id = u.role_id
         WHERE r.role_id = %s
-        GROUP BY r.role_id
     """
     
     role = execute_query(query, (role_id,), fetch_one=True)
@@ -90,16 +106,18 @@ def create_role():
 @bp.route('/<int:role_id>/permissions', methods=['GET'])
 @handle_errors
 def get_role_permissions(role_id):
-    """Get permissions for a role"""
+    """Get effective permissions for a role, flagged direct and/or inherited"""
     query = """
         SELECT 
             p.permission_id,
             p.resource_name,
             p.action_name,
-            p.description
-        FROM role_permissions rp
-        JOIN permissions p ON rp.permission_id = p.permission_id
-        WHERE rp.role_id = %s
+            p.description,
+            ep.direct,
+            ep.inherited_from
+        FROM vw_effective_permissions ep
+        JOIN permissions p ON ep.permission_id = p.permission_id
+        WHERE ep.role_id = %s
         ORDER BY p.resource_name, p.action_name
     """
     
@@ -110,6 +128,78 @@ def get_role_permissions(role_id):
         'data': permissions
     })
 
+@bp.route('/<int:role_id>/parents', methods=['PUT'])
+@role_required(['Admin'])
+@handle_errors
+def set_role_parents(role_id, current_user):
+    """
+    Replace the parent roles of a role
+    
+    Body: {"parentIds": [..]}. The role inherits every grant of its parents
+    (and of their ancestors); role_closure is updated by triggers.
+    """
+    data = request.get_json() or {}
+    parent_ids = data.get('parentIds', [])
+    
+    if not isinstance(parent_ids, list) or not all(isinstance(p, int) for p in parent_ids):
+        return jsonify({
+            'success': False,
+            'message': 'parentIds must be a list of role ids'
+        }), 400
+    parent_ids = sorted(set(parent_ids))
+    
+    role = execute_query("SELECT role_name FROM roles WHERE role_id = %s", (role_id,), fetch_one=True)
+    if not role:
+        return jsonify({
+            'success': False,
+            'message': 'Role not found'
+        }), 404
+    
+    if parent_ids:
+        found = execute_query(
+            "SELECT COUNT(*) as count FROM roles WHERE role_id = ANY(%s::int[])", (parent_ids,), fetch_one=True)
+        if found['count'] != len(parent_ids):
+            return jsonify({
+                'success': False,
+                'message': 'Parent role not found'
+            }), 404
+        
+        # A parent that is the role itself or one of its descendants would
+        # create a cycle (the database trigger enforces the same rule)
+        cycle = execute_query("""
+            SELECT r.role_name
+            FROM role_closure c
+            JOIN roles r ON r.role_id = c.descendant_id
+            WHERE c.ancestor_id = %s AND c.descendant_id = ANY(%s::int[])
+            LIMIT 1
+        """, (role_id, parent_ids), fetch_one=True)
+        if cycle:
+            return jsonify({
+                'success': False,
+                'message': f'Role "{role["role_name"]}" cannot inherit from "{cycle["role_name"]}": '
+                           'it would inherit from itself'
+            }), 400
+    
+    execute_transaction([
+        ("DELETE FROM role_parents WHERE role_id = %s AND NOT (parent_role_id = ANY(%s::int[]))",
+         (role_id, parent_ids)),
+        ("""INSERT INTO role_parents (role_id, parent_role_id)
+            SELECT %s, unnest(%s::int[])
+            ON CONFLICT DO NOTHING""", (role_id, parent_ids))
+    ])
+    
+    audit_log('UPDATE', 'role_parents', current_user.get('username', 'Unknown'), 'success',
+              f'Set parents of role {role["role_name"]} (ID: {role_id}) to {parent_ids}')
+    
+    response = jsonify({
+        'success': True,
+        'message': 'Role parents updated successfully',
+        'data': {'role_id': role_id, 'parent_ids': parent_ids}
+    })
+    # Re-check the permission version once the request transaction has committed
+    response.call_on_close(permission_engine.invalidate)
+    return response
+
 @bp.route('/<int:role_id>', methods=['DELETE'])
 @role_required(['Admin'])  # Only Admin can delete roles
 @handle_errors
@@ -144,21 +234,8 @@ def delete_role(role_id):
     execute_query(delete_query, (role_id,))
     
     # Log audit
-    try:
-        username = g.current_user.get('username', 'Unknown') if hasattr(g, 'current_user') else 'Unknown'
-        audit_query = """
-            INSERT INTO auditlog (event_type, table_name, username, status, details)
-            VALUES (%s, %s, %s, %s, %s)
-        """
-        execute_query(audit_query, (
-            'DELETE',
-            'roles',
-            username,
-            'success',
-            f'Deleted role: {role_name} (ID: {role_id})'
-        ))
-    except Exception as e:
-        print(f"Audit log error: {e}")
+    username = g.current_user.get('username', 'Unknown') if hasattr(g, 'current_user') else 'Unknown'
+    audit_log('DELETE', 'roles', username, 'success', f'Deleted role: {role_name} (ID: {role_id})')
     
     return jsonify({
         'success': True,
@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify, request
 from app.utils.database import execute_query, execute_transaction
 from app.utils.decorators import handle_errors
 from app.utils.auth import token_required, role_required, hash_password
+from app.utils.passwords import hasher
 
 bp = Blueprint('users', __name__, url_prefix='/api/users')
 
@@ -100,6 +101,44 @@ def get_user(user_id):
         'data': user
     })
 
+@bp.route('/password-costs', methods=['GET'])
+@role_required(['Admin'])
+@handle_errors
+def get_password_costs():
+    """Distribution of bcrypt costs across stored password hashes"""
+    query = """
+        SELECT
+            CASE WHEN password_hash ~ '^\\$2[abxy]?\\$[0-9]{2}\\$'
+                 THEN split_part(password_hash, '$', 3)::int
+            END AS cost,
+            COUNT(*) AS users
+        FROM users
+        GROUP BY 1
+        ORDER BY 1 NULLS LAST
+    """
+    distribution = execute_query(query)
+    target = hasher.rounds
+    
+    # Same rule as login (hasher.needs_rehash): costs within the tolerance
+    # band are kept, non-bcrypt hashes are replaced
+    def in_band(cost):
+        return cost is not None and abs(cost - target) <= hasher.tolerance
+    
+    return jsonify({
+        'success': True,
+        'data': {
+            'target_cost': target,
+            'rehash_tolerance': hasher.tolerance,
+            'estimated_hash_ms': round(hasher.estimated_hash_ms, 1) if hasher.estimated_hash_ms else None,
+            'distribution': distribution,
+            'at_target': sum(row['users'] for row in distribution if row['cost'] == target),
+            'within_tolerance': sum(row['users'] for row in distribution
+                                    if target is not None and in_band(row['cost'])),
+            'pending_rehash': sum(row['users'] for row in distribution
+                                  if target is not None and not in_band(row['cost']))
+        }
+    })
+
 @bp.route('/', methods=['POST'])
 @role_required(['Admin'])
 @handle_errors
@@ -0,0 +1,213 @@
+"""
+Streaming security-alert engine
+
+Every audit event recorded through audit_log() is fed to the engine,
+which keeps sliding-window counters per rule and subject (username, client
+IP or table). When a window reaches its rule's threshold the alert is
+written to security_alerts (database/sql/security_alerts.sql); it is
+re-reported when its severity escalates and refreshed while it stays hot.
+Alert writes happen on a background thread so auditing never waits on them.
+
+Windows are per process; with several server processes each reports what
+it saw, and the table keeps the highest count and severity.
+"""
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+
+from app.config import Config
+
+SEVERITIES = ((3, 'critical'), (2, 'high'), (1, 'medium'))  # (rank, name) at threshold x rank
+
+
+def is_failed_login(event):
+    """auth.login writes LOGIN/failed; older scripts and demo data use FAILED_LOGIN"""
+    event_type = event.get('event_type')
+    return event_type == 'FAILED_LOGIN' or (
+        event_type == 'LOGIN' and (event.get('status') or '').lower() == 'failed')
+
+
+def is_access_denied(event):
+    return event.get('event_type') == 'ACCESS_DENIED'
+
+
+def is_delete(event):
+    return event.get('event_type') == 'DELETE' and (event.get('status') or '').lower() == 'success'
+
+
+class Rule:
+    """
+    One detection pattern
+
+    Args:
+        name: Stored in security_alerts.rule
+        matches: Predicate over an audit event dict
+        subject_field: Event field the window is kept per (username, ip_address, table_name)
+        threshold: Events within the window that raise the alert (x2 high, x3 critical)
+        window: Sliding window in seconds
+        message: Alert text, formatted with subject and count
+    """
+
+    __slots__ = ('name', 'matches', 'subject_field', 'threshold', 'window', 'message')
+
+    def __init__(self, name, matches, subject_field, threshold, window, message):
+        self.name = name
+        self.matches = matches
+        self.subject_field = subject_field
+        self.threshold = threshold
+        self.window = window
+        self.message = message
+
+    def severity(self, count):
+        for rank, name in SEVERITIES:
+            if count >= self.threshold * rank:
+                return rank, name
+        return 0, None
+
+
+RULES = (
+    Rule('failed_login_user', is_failed_login, 'username',
+         Config.ALERT_FAILED_LOGINS, Config.ALERT_LOGIN_WINDOW,
+         '{count} failed logins for {subject}'),
+    Rule('failed_login_ip', is_failed_login, 'ip_address',
+         Config.ALERT_FAILED_LOGINS_IP, Config.ALERT_LOGIN_WINDOW,
+         '{count} failed logins from {subject}'),
+    Rule('access_denied_user', is_access_denied, 'username',
+         Config.ALERT_ACCESS_DENIED, Config.ALERT_ACCESS_WINDOW,
+         '{count} denied requests by {subject}'),
+    Rule('access_denied_ip', is_access_denied, 'ip_address',
+         Config.ALERT_ACCESS_DENIED * 2, Config.ALERT_ACCESS_WINDOW,
+         '{count} denied requests from {subject}'),
+    Rule('delete_burst_user', is_delete, 'username',
+         Config.ALERT_DELETE_BURST, Config.ALERT_DELETE_WINDOW,
+         '{count} deletes by {subject}'),
+    Rule('delete_burst_table', is_delete, 'table_name',
+         Config.ALERT_DELETE_BURST * 2, Config.ALERT_DELETE_WINDOW,
+         '{count} deletes on {subject}'),
+)
+
+
+class _Window:
+    __slots__ = ('times', 'rank', 'reported_at')
+
+    def __init__(self, maxlen):
+        self.times = deque(maxlen=maxlen)
+        self.rank = 0               # severity last reported
+        self.reported_at = 0.0
+
+
+class AlertEngine:
+    """
+    Sliding-window counters over audit events
+
+    Args:
+        rules: Rule instances
+        max_windows: Windows kept in memory; least recently used go first
+        refresh_interval: Seconds between re-reports of an unchanged active alert
+        queue_size: Pending alert writes before new ones are dropped
+    """
+
+    def __init__(self, rules=RULES, max_windows=10000, refresh_interval=30.0, queue_size=1000):
+        self.rules = rules
+        self.max_windows = max_windows
+        self.refresh_interval = refresh_interval
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._pid = None
+        self._stats = {'events': 0, 'reports': 0, 'written': 0, 'write_failures': 0,
+                       'queue_full': 0, 'evictions': 0}
+
+    def observe(self, event):
+        """Count one audit event (dict with the AuditLog columns) against every matching rule"""
+        now = time.monotonic()
+        reports = []
+        with self._lock:
+            self._stats['events'] += 1
+            for rule in self.rules:
+                subject = event.get(rule.subject_field)
+                if not subject or not rule.matches(event):
+                    continue
+                key = (rule.name, subject)
+                window = self._windows.get(key)
+                if window is None:
+                    window = self._windows[key] = _Window(rule.threshold * SEVERITIES[0][0])
+                    while len(self._windows) > self.max_windows:
+                        self._windows.popitem(last=False)
+                        self._stats['evictions'] += 1
+                else:
+                    self._windows.move_to_end(key)
+
+                cutoff = now - rule.window
+                while window.times and window.times[0] <= cutoff:
+                    window.times.popleft()
+                window.times.append(now)
+
+                count = len(window.times)
+                rank, severity = rule.severity(count)
+                if not rank:
+                    window.rank = 0
+                    continue
+                if rank > window.rank or now - window.reported_at >= self.refresh_interval:
+                    window.rank = rank
+                    window.reported_at = now
+                    reports.append((rule, subject, rank, severity, count))
+
+        for report in reports:
+            self._report(*report)
+
+    def _report(self, rule, subject, rank, severity, count):
+        self._stats['reports'] += 1
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait((rule, subject, rank, severity, count))
+        except queue.Full:
+            self._stats['queue_full'] += 1
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='alert-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            rule, subject, rank, severity, count = self._queue.get()
+            try:
+                self._write(rule, subject, rank, severity, count)
+                self._stats['written'] += 1
+            except Exception as e:
+                self._stats['write_failures'] += 1
+                print(f"❌ Security alert write failed ({rule.name} {subject}): {e}")
+
+    def _write(self, rule, subject, rank, severity, count):
+        from app.utils.database import get_pool
+
+        with get_pool().connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(
+                        "SELECT security_alert_report(%s, %s, %s, %s, %s, %s, %s, %s)",
+                        (rule.name, rule.subject_field, str(subject)[:200], severity, rank, count,
+                         rule.message.format(subject=subject, count=count), int(rule.window))
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['windows'] = len(self._windows)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+
+engine = AlertEngine()
@@ -0,0 +1,365 @@
+"""
+Audit sink: routes enqueue audit events, a background thread writes them
+in multi-row batches. Falls back to a local JSON-lines spool file when the
+database is unavailable and replays it once writes succeed again.
+
+Inside a request, events are held on flask.g and only queued (and shown to
+the alert engine) after the request transaction commits, so a rolled-back
+mutation leaves no "success" row behind. event_time is set by the database.
+"""
+import atexit
+import glob
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import psycopg2
+from psycopg2.extras import execute_values
+from flask import g, has_request_context, request
+
+from app.config import Config
+from app.utils.alerts import engine as alert_engine
+
+INSERT_SQL = """
+    INSERT INTO auditlog (event_type, table_name, username, status, details, ip_address, event_time)
+    VALUES %s
+"""
+
+# event_time is NULL unless the event was spooled (then the app clock is the best we have)
+INSERT_TEMPLATE = "(%s, %s, %s, %s, %s, %s, COALESCE(%s::timestamp, CURRENT_TIMESTAMP))"
+
+SYNC_INSERT_SQL = f"""
+    INSERT INTO auditlog (event_type, table_name, username, status, details, ip_address, event_time)
+    VALUES {INSERT_TEMPLATE}
+"""
+
+COLUMNS = ('event_type', 'table_name', 'username', 'status', 'details', 'ip_address', 'event_time')
+
+
+class AuditSink:
+    """
+    Bounded in-process queue of audit events flushed by a worker thread
+
+    Args:
+        queue_size: Maximum queued events before backpressure applies
+        batch_size: Flush as soon as this many events are queued
+        flush_interval: Seconds between flushes of a partial batch
+        enqueue_timeout: Seconds a producer blocks on a full queue before
+            writing its event straight to the spool file
+        spool_path: JSON-lines file used while the database is unavailable
+    """
+
+    def __init__(self, queue_size=10000, batch_size=500, flush_interval=0.2,
+                 enqueue_timeout=0.05, spool_path='audit_spool.jsonl'):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.spool_path = spool_path
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._spool_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'written': 0,
+            'batches': 0,
+            'spooled': 0,
+            'replayed': 0,
+            'backpressure_waits': 0,
+            'write_errors': 0,
+            'last_flush_ms': 0.0,
+        }
+
+    # ------------------------------------------------------------------ #
+    # Producer side
+    # ------------------------------------------------------------------ #
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def _ensure_started(self):
+        """Start the worker lazily, once per process (threads do not survive fork)"""
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='audit-sink', daemon=True)
+            self._thread.start()
+
+    def enqueue(self, event):
+        """
+        Queue an event for the background writer
+        On a full queue, block up to enqueue_timeout, then spool to disk
+        """
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._count('backpressure_waits')
+            try:
+                self._queue.put(event, timeout=self.enqueue_timeout)
+            except queue.Full:
+                self._spool([event])
+                return
+        self._count('enqueued')
+
+    def write_sync(self, event):
+        """Write an event immediately, inside the current request transaction if any"""
+        from app.utils.database import execute_query
+
+        execute_query(SYNC_INSERT_SQL, tuple(event[column] for column in COLUMNS), fetch=False)
+
+    # ------------------------------------------------------------------ #
+    # Worker side
+    # ------------------------------------------------------------------ #
+
+    def _drain(self, first=None):
+        batch = [first] if first is not None else []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        self._recover_replays()
+        next_replay = 0.0
+        while not self._stop.is_set():
+            try:
+                first = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                first = None
+
+            try:
+                # Give a partial batch the rest of the interval to fill up
+                if first is not None and self._queue.qsize() < self.batch_size - 1:
+                    self._stop.wait(self.flush_interval)
+
+                batch = self._drain(first)
+                if batch and not self._flush(batch):
+                    # Database is down: the batch went to the spool, retry it later
+                    next_replay = time.monotonic() + 30
+
+                if time.monotonic() >= next_replay:
+                    next_replay = time.monotonic() + 30
+                    self._replay_spool()
+            except Exception as e:
+                print(f"[AUDIT ERROR] Audit writer error: {e}")
+
+        self._flush(self._drain())
+
+    def _write(self, events):
+        from app.utils.database import get_pool
+
+        rows = [tuple(event[column] for column in COLUMNS) for event in events]
+        with get_pool().connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    execute_values(cursor, INSERT_SQL, rows, template=INSERT_TEMPLATE,
+                                   page_size=self.batch_size)
+                conn.commit()
+            except psycopg2.Error:
+                conn.rollback()
+                raise
+
+    def _flush(self, batch):
+        if not batch:
+            return True
+        started = time.monotonic()
+        try:
+            self._write(batch)
+        except Exception as e:
+            print(f"[AUDIT ERROR] Batch write failed, spooling {len(batch)} event(s): {e}")
+            self._count('write_errors')
+            self._spool(batch)
+            return False
+        with self._stats_lock:
+            self._stats['written'] += len(batch)
+            self._stats['batches'] += 1
+            self._stats['last_flush_ms'] = round((time.monotonic() - started) * 1000, 3)
+        return True
+
+    def flush(self):
+        """Synchronously write everything currently queued"""
+        while True:
+            batch = self._drain()
+            if not batch:
+                return
+            self._flush(batch)
+
+    def shutdown(self, timeout=5.0):
+        """Stop the worker and flush remaining events (registered with atexit)"""
+        self._stop.set()
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            self._thread.join(timeout)
+        self.flush()
+
+    # ------------------------------------------------------------------ #
+    # Spool file
+    # ------------------------------------------------------------------ #
+
+    def _spool(self, events):
+        """Append events to the spool file (durable fallback)"""
+        now = datetime.now()
+        lines = ''.join(
+            json.dumps(dict(event, event_time=event.get('event_time') or now), default=str) + '\n'
+            for event in events
+        )
+        with self._spool_lock:
+            try:
+                with open(self.spool_path, 'a', encoding='utf-8') as spool:
+                    spool.write(lines)
+                    spool.flush()
+                    os.fsync(spool.fileno())
+            except OSError as e:
+                print(f"[AUDIT ERROR] Could not spool {len(events)} event(s): {e}")
+                return
+        self._count('spooled', len(events))
+
+    def _replay_spool(self):
+        """Move the spool aside and write its events back to the database"""
+        if not os.path.exists(self.spool_path):
+            return
+        replay_path = f'{self.spool_path}.{os.getpid()}.replay'
+        with self._spool_lock:
+            try:
+                os.replace(self.spool_path, replay_path)
+            except OSError:
+                return
+
+        replayed = 0
+        with open(replay_path, encoding='utf-8') as spool:
+            events = (json.loads(line) for line in spool if line.strip())
+            while True:
+                batch = [event for _, event in zip(range(self.batch_size), events)]
+                if not batch:
+                    break
+                # A failed batch is re-spooled by _flush; stop and spool the rest
+                if not self._flush(batch):
+                    self._spool(list(events))
+                    break
+                replayed += len(batch)
+        os.remove(replay_path)
+        self._count('replayed', replayed)
+
+    def _recover_replays(self):
+        """
+        Put back .replay files left by a process that died while replaying
+        (runs when the worker starts). Events of that file written before the
+        crash are written again: the spool is at-least-once.
+        """
+        prefix = f'{self.spool_path}.'
+        for path in glob.glob(glob.escape(self.spool_path) + '.*.replay'):
+            try:
+                pid = int(path[len(prefix):-len('.replay')])
+            except ValueError:
+                continue
+            # Our own pid can only be a leftover (pids are reused across restarts)
+            if pid != os.getpid() and _pid_alive(pid):
+                continue
+            with self._spool_lock:
+                try:
+                    with open(path, encoding='utf-8') as leftover, \
+                            open(self.spool_path, 'a', encoding='utf-8') as spool:
+                        shutil.copyfileobj(leftover, spool)
+                        spool.flush()
+                        os.fsync(spool.fileno())
+                    os.remove(path)
+                except OSError as e:
+                    print(f"[AUDIT ERROR] Could not recover {path}: {e}")
+                    continue
+            print(f"[AUDIT] Recovered interrupted replay {path} into the spool")
+
+    def stats(self):
+        """Queue depth and write/spool counters"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats['queue_depth'] = self._queue.qsize()
+        stats['queue_capacity'] = self._queue.maxsize
+        stats['spool_pending'] = os.path.exists(self.spool_path)
+        return stats
+
+
+sink = AuditSink(
+    queue_size=Config.AUDIT_QUEUE_SIZE,
+    batch_size=Config.AUDIT_BATCH_SIZE,
+    flush_interval=Config.AUDIT_FLUSH_INTERVAL_MS / 1000,
+    enqueue_timeout=Config.AUDIT_ENQUEUE_TIMEOUT_MS / 1000,
+    spool_path=Config.AUDIT_SPOOL_PATH
+)
+atexit.register(sink.shutdown)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def audit_log(event_type, table_name, username, status, details=None, sync=False):
+    """
+    Record an audit event
+
+    Args:
+        event_type: LOGIN, LOGOUT, INSERT, UPDATE, DELETE, ...
+        table_name: Affected table
+        username: Acting user
+        status: 'success' or 'failed'
+        details: Free-text details
+        sync: Write now in the request transaction instead of queueing
+              (for events that must commit or fail with the mutation)
+
+    Inside a request, queued events and alert counting wait for the request
+    transaction to commit (dispatch_pending) and are dropped on rollback.
+    """
+    in_request = has_request_context()
+    event = {
+        'event_type': event_type,
+        'table_name': table_name,
+        'username': username,
+        'status': status,
+        'details': details,
+        'ip_address': request.remote_addr if in_request else None,
+        'event_time': None,         # database time when written
+    }
+    queued = not sync and Config.AUDIT_ASYNC
+    if not queued:
+        sink.write_sync(event)
+    if in_request:
+        g.setdefault('_audit_pending', []).append((event, queued))
+        return
+    if queued:
+        sink.enqueue(event)
+    alert_engine.observe(event)
+
+
+def dispatch_pending(committed):
+    """
+    Hand the request's audit events to the sink and the alert engine once
+    its transaction has ended; on rollback they are discarded
+    """
+    pending = g.pop('_audit_pending', None)
+    if not pending or not committed:
+        return
+    for event, queued in pending:
+        if queued:
+            sink.enqueue(event)
+        alert_engine.observe(event)
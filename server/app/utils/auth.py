@@ -1,27 +1,44 @@
 """
 Authentication utilities for JWT token management and password hashing
 """
+import hashlib
+import inspect
+import threading
+import time
+import uuid
 import jwt
-import bcrypt
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import request, jsonify
+from flask import g, request, jsonify
+from app.config import Config
+from app.utils.passwords import hasher
+from app.utils.revocation import revocations
 import os
 
 # Secret key for JWT (should be in environment variables)
 SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'your-secret-key-change-this-in-production')
 ALGORITHM = 'HS256'
 TOKEN_EXPIRATION_HOURS = 24
+STREAM_TICKET_PURPOSE = 'event-stream'
 
 def hash_password(password):
-    """Hash a password using bcrypt"""
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+    """
+    Hash a password using bcrypt (in the hashing pool)
+    Raises HashingUnavailable (503) when the pool is saturated
+    """
+    return hasher.hash(password)
 
 def verify_password(password, hashed_password):
-    """Verify a password against a hash"""
-    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    """
+    Verify a password against a hash (in the hashing pool)
+    Raises HashingUnavailable (503) when the pool is saturated
+    """
+    return hasher.verify(password, hashed_password)
+
+def needs_rehash(hashed_password):
+    """True when a stored hash is not at the current target bcrypt cost"""
+    return hasher.needs_rehash(hashed_password)
 
 def generate_token(user_id, username, role_id, role_name):
     """Generate JWT token for authenticated user"""
@@ -31,11 +48,99 @@ def generate_token(user_id, username, role_id, role_name):
         'role_id': role_id,
         'role_name': role_name,
         'exp': datetime.utcnow() + timedelta(hours=TOKEN_EXPIRATION_HOURS),
-        'iat': datetime.utcnow()
+        'iat': datetime.utcnow(),
+        'jti': uuid.uuid4().hex  # revocation handle (logout)
     }
     token = jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
     return token
 
+def generate_stream_ticket(session):
+    """
+    Short-lived ticket that opens GET /api/audit/events as ?ticket=
+    (EventSource cannot send headers). It is not accepted as a bearer
+    token and stops working when the session it came from is revoked.
+    
+    Args:
+        session: Verified payload of the caller's login token
+    """
+    now = datetime.utcnow()
+    payload = {
+        'user_id': session['user_id'],
+        'username': session['username'],
+        'role_id': session['role_id'],
+        'role_name': session['role_name'],
+        'purpose': STREAM_TICKET_PURPOSE,
+        'sid': session.get('jti'),
+        'exp': now + timedelta(seconds=Config.SSE_TICKET_TTL),
+        'iat': now,
+        'jti': uuid.uuid4().hex
+    }
+    return jwt.encode(payload, SECRET_KEY, algorithm=ALGORITHM)
+
+class TokenCache:
+    """
+    Bounded LRU of verified token payloads keyed by token digest
+    Entries expire at the token's own `exp`, so a cached token is never
+    accepted after jwt.decode would have rejected it
+    """
+    
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self._entries = OrderedDict()   # digest -> (payload, exp)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def _key(token):
+        return hashlib.sha256(token.encode('utf-8')).digest()
+    
+    def get(self, token):
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[1] > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[0]
+                del self._entries[key]
+            self.misses += 1
+        return None
+    
+    def put(self, token, payload):
+        exp = payload.get('exp')
+        if self.capacity <= 0 or not exp:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (payload, exp)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+    
+    def discard(self, token):
+        with self._lock:
+            self._entries.pop(self._key(token), None)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def stats(self):
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses
+        return {
+            'size': size,
+            'capacity': self.capacity,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+token_cache = TokenCache(Config.JWT_CACHE_SIZE)
+
 def decode_token(token):
     """Decode and validate JWT token"""
     try:
@@ -46,75 +151,131 @@ def decode_token(token):
     except jwt.InvalidTokenError:
         return None
 
-def token_required(f):
-    """Decorator to protect routes with JWT authentication"""
-    @wraps(f)
-    def decorated(*args, **kwargs):
-        token = None
-        
-        # Get token from Authorization header
-        if 'Authorization' in request.headers:
-            auth_header = request.headers['Authorization']
-            try:
-                token = auth_header.split(' ')[1]  # Format: "Bearer <token>"
-            except IndexError:
-                return jsonify({
-                    'success': False,
-                    'message': 'Invalid token format'
-                }), 401
-        
-        if not token:
-            return jsonify({
-                'success': False,
-                'message': 'Token is missing'
-            }), 401
-        
-        # Decode token
+def verify_token(token):
+    """
+    decode_token with the verified-payload cache in front of it, then the
+    revocation check (cached payloads are checked too, so a revoked token is
+    rejected even while it is still cached)
+    """
+    payload = token_cache.get(token)
+    if payload is None:
         payload = decode_token(token)
-        if not payload:
-            return jsonify({
+        if payload is None or payload.get('purpose'):
+            return None     # stream tickets are not login tokens
+        token_cache.put(token, payload)
+    if revocations.is_revoked(payload.get('jti')):
+        token_cache.discard(token)
+        return None
+    # Routes get their own copy; the cached payload stays pristine
+    return dict(payload)
+
+def verify_stream_ticket(ticket):
+    """Payload of a valid stream ticket (generate_stream_ticket), else None"""
+    payload = decode_token(ticket)
+    if payload is None or payload.get('purpose') != STREAM_TICKET_PURPOSE:
+        return None
+    if revocations.is_revoked(payload.get('sid')) or revocations.is_revoked(payload.get('jti')):
+        return None
+    return payload
+
+def _authenticate(allow_query_token=False):
+    """
+    Resolve the bearer token of the current request
+    
+    Args:
+        allow_query_token: Without an Authorization header, accept a stream
+            ticket as ?ticket= (never a login token)
+    
+    Returns:
+        (payload, None) on success, (None, error response) otherwise
+    """
+    auth_header = request.headers.get('Authorization')
+    token = None
+    verify = verify_token
+    if auth_header is not None:
+        parts = auth_header.split(' ')
+        if len(parts) < 2:
+            return None, (jsonify({
                 'success': False,
-                'message': 'Token is invalid or expired'
-            }), 401
-        
-        # Add user info to request context
-        request.current_user = payload
-        
-        # Check if function accepts current_user parameter
-        import inspect
-        sig = inspect.signature(f)
-        if 'current_user' in sig.parameters:
-            # Pass current_user as keyword argument if function accepts it
-            return f(current_user=payload, *args, **kwargs)
-        else:
-            # Don't pass if function doesn't accept it
+                'message': 'Invalid token format'
+            }), 401)
+        token = parts[1]  # Format: "Bearer <token>"
+    elif allow_query_token:
+        token = request.args.get('ticket')
+        verify = verify_stream_ticket
+    
+    if not token:
+        return None, (jsonify({
+            'success': False,
+            'message': 'Token is missing'
+        }), 401)
+    
+    payload = verify(token)
+    if not payload:
+        return None, (jsonify({
+            'success': False,
+            'message': 'Token is invalid or expired'
+        }), 401)
+    
+    # Add user info to request context
+    request.current_user = payload
+    g.current_user = payload
+    return payload, None
+
+def _accepts_current_user(f):
+    """Whether the view takes a `current_user` argument (checked once, at decoration)"""
+    return 'current_user' in inspect.signature(f).parameters
+
+def token_required(f=None, *, allow_query_token=False):
+    """
+    Decorator to protect routes with JWT authentication
+    
+    Use as @token_required, or @token_required(allow_query_token=True) to
+    also accept a stream ticket as ?ticket= (for EventSource)
+    """
+    if f is None:
+        return lambda view: token_required(view, allow_query_token=allow_query_token)
+    
+    if _accepts_current_user(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            payload, error = _authenticate(allow_query_token)
+            if error:
+                return error
+            return f(*args, current_user=payload, **kwargs)
+    else:
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            payload, error = _authenticate(allow_query_token)
+            if error:
+                return error
             return f(*args, **kwargs)
     
     return decorated
 
 def role_required(allowed_roles):
     """Decorator to restrict routes to specific roles"""
+    allowed = frozenset(allowed_roles)
+    denied_message = f'Access denied. Required roles: {", ".join(allowed_roles)}'
+    
     def decorator(f):
+        passes_user = _accepts_current_user(f)
+        
         @wraps(f)
-        @token_required
-        def decorated(current_user=None, *args, **kwargs):
-            user = request.current_user
+        def decorated(*args, **kwargs):
+            payload, error = _authenticate()
+            if error:
+                return error
             
-            if user['role_name'] not in allowed_roles:
+            if payload['role_name'] not in allowed:
                 return jsonify({
                     'success': False,
-                    'message': f'Access denied. Required roles: {", ".join(allowed_roles)}'
+                    'message': denied_message
                 }), 403
             
-            # Check if wrapped function accepts current_user parameter
-            import inspect
-            sig = inspect.signature(f)
-            if 'current_user' in sig.parameters:
-                # Pass current_user if function accepts it
-                return f(current_user=current_user, *args, **kwargs)
-            else:
-                # Don't pass if function doesn't accept it
-                return f(*args, **kwargs)
+            if passes_user:
+                return f(*args, current_user=payload, **kwargs)
+            return f(*args, **kwargs)
         
         return decorated
     return decorator
@@ -0,0 +1,119 @@
+"""
+Short-lived result cache for aggregate endpoints (dashboard, stats)
+
+Values are fresh for `ttl` seconds and may be served stale for another
+`stale_ttl` seconds while one caller refreshes them. Loads are
+single-flight: when a key is missing, concurrent callers wait for the one
+query in progress instead of each running their own.
+"""
+import threading
+import time
+
+from app.config import Config
+
+
+class _Entry:
+    __slots__ = ('value', 'loaded_at', 'loading')
+
+    def __init__(self):
+        self.value = None
+        self.loaded_at = None
+        self.loading = None         # threading.Event while a load is in flight
+
+
+class StatsCache:
+    """
+    Per-key TTL cache with single-flight loads and serve-stale refresh
+
+    Args:
+        ttl: Seconds a value is served without reloading (0 disables caching)
+        stale_ttl: Further seconds a value may be served while it is refreshed
+        wait_timeout: Seconds a caller waits for another caller's load
+    """
+
+    def __init__(self, ttl=10.0, stale_ttl=60.0, wait_timeout=10.0):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.wait_timeout = wait_timeout
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'stale_hits': 0, 'loads': 0, 'waits': 0, 'load_failures': 0}
+
+    def get(self, key, loader):
+        """
+        Cached value of `key`, calling `loader()` when it must be (re)loaded
+
+        Raises whatever `loader` raises when there is no value to fall back on.
+        """
+        if self.ttl <= 0:
+            return loader()
+
+        while True:
+            with self._lock:
+                entry = self._entries.setdefault(key, _Entry())
+                age = time.monotonic() - entry.loaded_at if entry.loaded_at is not None else None
+                usable = age is not None and age < self.ttl + self.stale_ttl
+
+                if age is not None and age < self.ttl:
+                    self._stats['hits'] += 1
+                    return entry.value
+
+                if entry.loading is not None:
+                    if usable:
+                        # Someone is already refreshing: serve the old value
+                        self._stats['stale_hits'] += 1
+                        return entry.value
+                    event = entry.loading
+                    self._stats['waits'] += 1
+                else:
+                    event = None
+                    entry.loading = threading.Event()
+                    stale = entry.value
+
+            if event is None:
+                return self._load(key, entry, loader, stale if usable else None, usable)
+
+            # Wait for the in-flight load, then look again
+            if not event.wait(self.wait_timeout):
+                return loader()
+
+    def _load(self, key, entry, loader, stale, has_stale):
+        try:
+            value = loader()
+        except Exception as e:
+            with self._lock:
+                self._stats['load_failures'] += 1
+                event, entry.loading = entry.loading, None
+            event.set()
+            if has_stale:
+                print(f"❌ Refresh of {key} failed, serving cached value: {e}")
+                return stale
+            raise
+
+        with self._lock:
+            entry.value = value
+            entry.loaded_at = time.monotonic()
+            self._stats['loads'] += 1
+            event, entry.loading = entry.loading, None
+        event.set()
+        return value
+
+    def invalidate(self, key=None):
+        """Drop one key (or everything); the next caller reloads"""
+        with self._lock:
+            if key is None:
+                for entry in self._entries.values():
+                    entry.loaded_at = None
+            elif key in self._entries:
+                self._entries[key].loaded_at = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['keys'] = len(self._entries)
+        stats['ttl'] = self.ttl
+        stats['stale_ttl'] = self.stale_ttl
+        return stats
+
+
+stats_cache = StatsCache(ttl=Config.STATS_CACHE_TTL, stale_ttl=Config.STATS_CACHE_STALE_TTL)
@@ -0,0 +1,175 @@
+"""
+Conditional requests (ETag / Last-Modified) for patients, appointments and
+medical records
+
+Single resources are validated by their updated_at, plus the updated_at of
+rows whose columns they embed (the patient name on an appointment). Their
+ETags are strong and carry the resource's own updated_at first, which PUT
+compares against If-Match in the UPDATE itself, so a stale edit fails with
+412 instead of overwriting a newer one, without holding row locks.
+
+Collections are validated by the per-table change counters in
+table_version_shards (database/sql/table_versions.sql), summed over their
+shards. A shard is bumped in the writing transaction, so the sum changes
+when the rows become visible;
+reading it before the data means a page can be newer than its ETag, never
+older. A matching If-None-Match is answered with 304 before the list
+query runs.
+"""
+import hashlib
+from datetime import datetime, time, timezone
+
+from flask import Response, jsonify, request
+
+TAG_FORMAT = '%Y%m%d%H%M%S%f'
+
+# Private data: browsers may keep it but must revalidate every time
+CACHE_CONTROL = 'private, no-cache'
+
+
+def _as_datetime(value):
+    """Row dicts from execute_query carry timestamps as ISO strings"""
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _stamp(value):
+    return _as_datetime(value).strftime(TAG_FORMAT) if value else '0'
+
+
+def _http_time(value):
+    """Naive database timestamps are server local time"""
+    return _as_datetime(value).astimezone(timezone.utc).replace(microsecond=0) if value else None
+
+
+def resource_validators(updated_at, *related):
+    """
+    (etag, last_modified) for one row
+
+    Args:
+        updated_at: The resource's own updated_at (compared by If-Match), datetime or ISO string
+        related: updated_at of embedded rows
+    """
+    etag = '.'.join([_stamp(updated_at)] + [_stamp(value) for value in related])
+    stamps = [_as_datetime(value) for value in (updated_at,) + related if value]
+    return etag, _http_time(max(stamps)) if stamps else None
+
+
+class CollectionVersions:
+    """
+    Reads table_version_shards on a pooled connection of its own, outside the
+    request transaction, and fails open (no validators) if it cannot
+    """
+
+    def __init__(self):
+        self.reads = 0
+        self.failures = 0
+
+    def validators(self, resource, tables, by_date=False):
+        """
+        (etag, last_modified) for a list of `resource` built from `tables`,
+        or (None, None) when the counters are unavailable
+        The query string is part of the tag: every page has its own.
+        by_date: The body also depends on CURRENT_DATE (the tag and
+            Last-Modified then change at midnight, database time)
+        """
+        from app.utils.database import get_pool
+
+        try:
+            with get_pool().connection() as conn:
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute(
+                            "SELECT table_name, sum(version), max(changed_at) "
+                            "FROM table_version_shards WHERE table_name = ANY(%s) "
+                            "GROUP BY table_name ORDER BY table_name",
+                            (list(tables),)
+                        )
+                        rows = cursor.fetchall()
+                        if by_date:
+                            cursor.execute("SELECT CURRENT_DATE")
+                            today = cursor.fetchone()[0]
+                finally:
+                    conn.rollback()
+        except Exception as e:
+            self.failures += 1
+            print(f"❌ Table version lookup failed, serving without validators: {e}")
+            return None, None
+
+        self.reads += 1
+        if len(rows) != len(tables):
+            return None, None
+        digest = hashlib.blake2b(digest_size=12)
+        digest.update(resource.encode('utf-8'))
+        for table_name, version, _ in rows:
+            digest.update(f'|{table_name}:{version}'.encode('utf-8'))
+        last_modified = max(changed_at for _, _, changed_at in rows)
+        if by_date:
+            digest.update(f'|date:{today.isoformat()}'.encode('utf-8'))
+            last_modified = max(last_modified, datetime.combine(today, time.min))
+        digest.update(b'?' + request.query_string)
+        return digest.hexdigest(), _http_time(last_modified)
+
+    def stats(self):
+        return {'reads': self.reads, 'failures': self.failures}
+
+
+collection_versions = CollectionVersions()
+
+
+def not_modified(etag, last_modified=None, weak=False):
+    """
+    304 response if the client's copy is current, else None
+
+    If-None-Match wins; If-Modified-Since is only used without it.
+    """
+    if etag is None:
+        return None
+    if request.if_none_match:
+        if not request.if_none_match.contains_weak(etag):
+            return None
+    elif last_modified is None or request.if_modified_since is None \
+            or last_modified > request.if_modified_since:
+        return None
+    response = Response(status=304)
+    return with_validators(response, etag, last_modified, weak)
+
+
+def with_validators(response, etag, last_modified=None, weak=False):
+    """Attach ETag, Last-Modified and Cache-Control to a response"""
+    if etag is not None:
+        response.set_etag(etag, weak=weak)
+        response.headers['Cache-Control'] = CACHE_CONTROL
+    if last_modified is not None:
+        response.last_modified = last_modified
+    return response
+
+
+def if_match_versions():
+    """
+    updated_at values the client's If-Match allows a PUT to overwrite
+
+    Returns:
+        None when there is no precondition (no If-Match, or `*`),
+        else a list of datetimes (empty when no tag can match)
+    """
+    if_match = request.if_match
+    if not if_match or if_match.star_tag:
+        return None
+    versions = []
+    for tag in if_match.as_set():          # strong comparison: weak tags never match
+        stamp = tag.split('.', 1)[0]
+        try:
+            versions.append(datetime.strptime(stamp, TAG_FORMAT))
+        except ValueError:
+            continue
+    return versions
+
+
+def precondition_failed(current_etag=None):
+    """412 for a PUT whose If-Match no longer matches"""
+    response = jsonify({
+        'success': False,
+        'message': 'Resource was modified by someone else; reload it and retry'
+    })
+    response.status_code = 412
+    return with_validators(response, current_etag)
@@ -1,11 +1,23 @@
+import threading
+import uuid
+from contextlib import contextmanager
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from flask import g, has_request_context, jsonify
 from app.config import Config
+from app.utils.pool import ConnectionPool
+from app.utils.prepared import PreparedConnection, execute as execute_prepared
+from app.utils.serializer import ResultSet, get_serializer
 from datetime import date, time, datetime
 from decimal import Decimal
 
+_pool = None
+_pool_lock = threading.Lock()
+
 def serialize_value(value):
-    """Convert non-JSON-serializable types to strings"""
+    """
+    Convert non-JSON-serializable types to strings
+    (execute_query now uses the compiled converters in utils/serializer.py)
+    """
     if isinstance(value, (date, datetime)):
         return value.isoformat()
     elif isinstance(value, time):
@@ -23,7 +35,8 @@ def serialize_row(row):
 def get_db_connection():
     """
     Create and return a PostgreSQL database connection
-    Returns connection with RealDictCursor for dict-like results
+    Cursors return plain tuples (see utils/serializer.py) and the connection
+    carries a per-connection prepared statement cache
     """
     try:
         conn = psycopg2.connect(
@@ -32,54 +45,218 @@ def get_db_connection():
             database=Config.DB_NAME,
             user=Config.DB_USER,
             password=Config.DB_PASSWORD,
-            cursor_factory=RealDictCursor
+            connection_factory=PreparedConnection
         )
         return conn
     except psycopg2.Error as e:
         print(f"❌ Database connection error: {e}")
         raise
 
-def execute_query(query, params=None, fetch=True, fetch_one=False):
+def get_pool():
+    """
+    Return the process-wide connection pool, creating it on first use
+    Connections are opened through get_db_connection()
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_db_connection,
+                    min_size=Config.DB_POOL_MIN_SIZE,
+                    max_size=Config.DB_POOL_MAX_SIZE,
+                    timeout=Config.DB_POOL_TIMEOUT,
+                    healthcheck_interval=Config.DB_POOL_HEALTHCHECK_INTERVAL
+                )
+    return _pool
+
+def get_pool_stats():
+    """Return live/idle/wait statistics of the connection pool"""
+    return get_pool().stats()
+
+# ==================== REQUEST UNIT OF WORK ====================
+# Inside a Flask request every execute_query/execute_transaction call joins a
+# single pooled connection stored on flask.g. The transaction is committed
+# once in after_request (or rolled back on 5xx / failed statements) and the
+# connection goes back to the pool in teardown_request.
+
+def get_request_connection():
+    """
+    Return the connection bound to the current request, checking one out
+    of the pool on first use. Returns None outside a request context.
+    """
+    if not has_request_context():
+        return None
+    conn = g.get('_db_conn')
+    if conn is None:
+        conn = get_pool().getconn()
+        g._db_conn = conn
+    return conn
+
+def _commit_request_transaction(response):
+    """
+    after_request hook: commit the request transaction exactly once, then
+    release the request's audit events (dropped if nothing was committed)
+    """
+    from app.utils.audit import dispatch_pending
+    
+    conn = g.get('_db_conn')
+    if conn is None:
+        dispatch_pending(response.status_code < 500)
+        return response
+    
+    rollback_only = g.get('_db_rollback_only', False)
+    if rollback_only or response.status_code >= 500:
+        conn.rollback()
+        dispatch_pending(False)
+        if rollback_only and response.status_code < 400:
+            # Handler swallowed a database error but reported success
+            response = jsonify({
+                'success': False,
+                'message': 'Transaction rolled back due to a database error'
+            })
+            response.status_code = 500
+        return response
+    
+    try:
+        conn.commit()
+    except psycopg2.Error as e:
+        conn.rollback()
+        dispatch_pending(False)
+        print(f"❌ Request transaction commit error: {e}")
+        response = jsonify({
+            'success': False,
+            'message': 'Internal server error',
+            'error': str(e)
+        })
+        response.status_code = 500
+        return response
+    dispatch_pending(True)
+    return response
+
+def end_request_transaction():
+    """
+    Commit the request transaction early and return its connection to the
+    pool, before a long wait that needs no database (a later query checks
+    out a fresh connection). A poisoned transaction is left for
+    after_request to roll back.
+    """
+    conn = g.get('_db_conn')
+    if conn is None or g.get('_db_rollback_only', False):
+        return
+    try:
+        conn.commit()
+    except psycopg2.Error:
+        _abort(conn, False)
+        raise
+    g.pop('_db_conn')
+    get_pool().putconn(conn)
+
+
+def _release_request_connection(exc=None):
+    """teardown_request hook: return the request connection to the pool"""
+    conn = g.pop('_db_conn', None)
+    if conn is None:
+        return
+    broken = conn.closed or isinstance(exc, (psycopg2.OperationalError, psycopg2.InterfaceError))
+    # putconn rolls back anything after_request did not finish
+    get_pool().putconn(conn, close=bool(broken))
+
+def init_app(app):
+    """Register the request unit-of-work hooks on the Flask app"""
+    app.after_request(_commit_request_transaction)
+    app.teardown_request(_release_request_connection)
+
+@contextmanager
+def _connection_scope(own_connection=False):
+    """
+    Yield (connection, owns_transaction)
+    Inside a request the request-bound connection is reused and the commit
+    is deferred; otherwise (or with own_connection) a pooled connection is
+    used for a single transaction.
+    """
+    conn = None if own_connection else get_request_connection()
+    if conn is not None:
+        yield conn, False
+        return
+    with get_pool().connection() as conn:
+        yield conn, True
+
+def _abort(conn, owns_transaction):
+    """Roll back after a failed statement and poison the request transaction"""
+    try:
+        conn.rollback()
+    except psycopg2.Error:
+        pass
+    if not owns_transaction:
+        g._db_rollback_only = True
+
+def execute_query(query, params=None, fetch=True, fetch_one=False, own_connection=False):
     """
     Execute a SQL query and return results
+    Joins the request transaction when called inside a Flask request
     
     Args:
         query: SQL query string
         params: Query parameters (tuple or dict)
         fetch: Whether to fetch results (True for SELECT, False for INSERT/UPDATE/DELETE)
         fetch_one: Whether to fetch only one row
+        own_connection: Run in a transaction of its own on a pooled connection,
+            so a failure does not roll back the request (cached aggregates)
     
     Returns:
         Query results or affected row count
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(query, params)
+    with _connection_scope(own_connection) as (conn, owns_transaction):
+        cursor = conn.cursor()
         
-        if fetch:
-            if fetch_one:
-                result = cursor.fetchone()
-                result = serialize_row(result) if result else None
+        try:
+            execute_prepared(cursor, query, params)
+            
+            if fetch:
+                serializer = get_serializer(cursor.description)
+                if fetch_one:
+                    result = serializer.to_dict(cursor.fetchone())
+                else:
+                    result = serializer.to_dicts(cursor.fetchall())
             else:
-                result = cursor.fetchall()
-                result = [serialize_row(row) for row in result] if result else []
-            # Commit even for SELECT with RETURNING clause
-            conn.commit()
-            conn.close()
-            return result
-        else:
-            conn.commit()
-            affected_rows = cursor.rowcount
-            conn.close()
-            return affected_rows
+                result = cursor.rowcount
             
-    except psycopg2.Error as e:
-        conn.rollback()
-        conn.close()
-        print(f"❌ Query execution error: {e}")
-        raise
+            # Commit even for SELECT with RETURNING clause; inside a request
+            # the commit happens once in after_request
+            if owns_transaction:
+                conn.commit()
+            return result
+                
+        except psycopg2.Error as e:
+            _abort(conn, owns_transaction)
+            print(f"❌ Query execution error: {e}")
+            raise
+        finally:
+            cursor.close()
+
+def fetch_result(query, params=None):
+    """
+    Execute a SELECT and return a ResultSet of tuple rows
+    Rows stay undecoded until serializer.json_response encodes them, so list
+    endpoints go from cursor to response bytes without per-row dicts
+    """
+    with _connection_scope() as (conn, owns_transaction):
+        cursor = conn.cursor()
+        
+        try:
+            execute_prepared(cursor, query, params)
+            result = ResultSet(get_serializer(cursor.description), cursor.fetchall())
+            if owns_transaction:
+                conn.commit()
+            return result
+        
+        except psycopg2.Error as e:
+            _abort(conn, owns_transaction)
+            print(f"❌ Query execution error: {e}")
+            raise
+        finally:
+            cursor.close()
 
 def execute_transaction(queries):
     """
@@ -91,19 +268,90 @@ def execute_transaction(queries):
     Returns:
         True if successful, raises exception otherwise
     """
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    with _connection_scope() as (conn, owns_transaction):
+        cursor = conn.cursor()
+        
+        try:
+            for query, params in queries:
+                execute_prepared(cursor, query, params)
+            
+            if owns_transaction:
+                conn.commit()
+            return True
+            
+        except psycopg2.Error as e:
+            _abort(conn, owns_transaction)
+            print(f"❌ Transaction error: {e}")
+            raise
+        finally:
+            cursor.close()
+
+# ==================== STREAMING ====================
+
+class RowStream:
+    """
+    Iterator over a named (server-side) cursor that owns a pooled connection
+    Rows are fetched `itersize` at a time; close() returns the connection
+    """
+    
+    def __init__(self, conn, cursor):
+        self._conn = conn
+        self._cursor = cursor
+        self._serializer = None
+    
+    def __iter__(self):
+        return self
+    
+    def __next__(self):
+        if self._cursor is None:
+            raise StopIteration
+        try:
+            row = next(self._cursor)
+        except StopIteration:
+            self.close()
+            raise
+        except psycopg2.Error as e:
+            print(f"❌ Streaming query error: {e}")
+            self.close()
+            raise
+        if self._serializer is None:
+            # description is only populated once the first batch is fetched
+            self._serializer = get_serializer(self._cursor.description)
+        return self._serializer.to_dict(row)
+    
+    def close(self):
+        """Close the server-side cursor and return the connection (idempotent)"""
+        cursor, self._cursor = self._cursor, None
+        if cursor is None:
+            return
+        try:
+            cursor.close()
+        except psycopg2.Error:
+            pass
+        # putconn rolls back the read-only transaction holding the cursor
+        get_pool().putconn(self._conn, close=bool(self._conn.closed))
+
+def stream_query(query, params=None, itersize=None):
+    """
+    Execute a SELECT through a server-side cursor and return a RowStream
     
+    The query runs on its own pooled connection (not the request transaction)
+    so the stream can outlive the view function. Errors in the statement
+    itself are raised here, before any response bytes are sent.
+    
+    Args:
+        query: SQL SELECT statement
+        params: Query parameters (tuple or dict)
+        itersize: Rows fetched per round trip (default Config.DB_STREAM_ITERSIZE)
+    """
+    pool = get_pool()
+    conn = pool.getconn()
     try:
-        for query, params in queries:
-            cursor.execute(query, params)
-        
-        conn.commit()
-        conn.close()
-        return True
-        
+        cursor = conn.cursor(name=f'stream_{uuid.uuid4().hex}')
+        cursor.itersize = itersize or Config.DB_STREAM_ITERSIZE
+        cursor.execute(query, params)
     except psycopg2.Error as e:
-        conn.rollback()
-        conn.close()
-        print(f"❌ Transaction error: {e}")
+        print(f"❌ Streaming query error: {e}")
+        pool.putconn(conn, close=bool(conn.closed))
         raise
+    return RowStream(conn, cursor)
@@ -1,5 +1,6 @@
 from functools import wraps
 from flask import jsonify
+from werkzeug.exceptions import HTTPException
 
 def handle_errors(f):
     """
@@ -10,6 +11,9 @@ def handle_errors(f):
     def decorated_function(*args, **kwargs):
         try:
             return f(*args, **kwargs)
+        except HTTPException:
+            # Deliberate HTTP errors (e.g. 503 from the hashing pool) keep their status
+            raise
         except Exception as e:
             print(f"❌ Error in {f.__name__}: {str(e)}")
             return jsonify({
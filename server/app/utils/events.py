@@ -0,0 +1,236 @@
+"""
+Live audit events for Server-Sent Events clients
+
+Each server process holds ONE dedicated LISTEN connection (not from the
+pool) on the channels filled by database/sql/audit_notify.sql, read by a
+background thread and fanned out to every subscriber. Subscribers get a
+bounded buffer: a client that cannot keep up loses its oldest events and
+is told how many it missed, so it can refetch instead of stalling the
+listener or growing memory.
+"""
+import json
+import os
+import select
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import extensions
+
+from app.config import Config
+
+CHANNELS = ('audit_events', 'security_alerts')
+
+# SSE event name per NOTIFY channel
+EVENT_NAMES = {'audit_events': 'audit', 'security_alerts': 'alert'}
+
+
+class Subscriber:
+    """One SSE client: a bounded buffer of (event, data) pairs"""
+
+    def __init__(self, buffer_size):
+        self._events = deque(maxlen=buffer_size)
+        self._ready = threading.Condition()
+        self.dropped = 0
+        self.closed = False
+
+    def push(self, event, data):
+        """Buffer one event; returns True if the oldest had to be dropped for it"""
+        with self._ready:
+            overflow = len(self._events) == self._events.maxlen
+            if overflow:
+                self.dropped += 1       # deque drops the oldest
+            self._events.append((event, data))
+            self._ready.notify()
+        return overflow
+
+    def close(self):
+        with self._ready:
+            self.closed = True
+            self._ready.notify()
+
+    def drain(self, timeout):
+        """
+        Wait up to `timeout` seconds for events
+
+        Returns:
+            (events, dropped since the last drain)
+        """
+        with self._ready:
+            if not self._events and not self.closed:
+                self._ready.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            dropped, self.dropped = self.dropped, 0
+        return events, dropped
+
+
+class EventHub:
+    """
+    Shared LISTEN connection per process, fanned out to subscribers
+
+    Args:
+        buffer_size: Events buffered per subscriber before the oldest are dropped
+        max_subscribers: Concurrent clients per process (each holds a worker thread)
+        reconnect_delay: Seconds between attempts to re-establish LISTEN
+    """
+
+    def __init__(self, buffer_size=256, max_subscribers=100, reconnect_delay=2.0):
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.reconnect_delay = reconnect_delay
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._connected = False
+        self._stats = {'notifications': 0, 'delivered': 0, 'dropped': 0, 'reconnects': 0}
+
+    def _ensure_listener(self):
+        """Start the listener thread lazily, once per process (threads do not survive fork)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='audit-event-listener', daemon=True)
+            self._thread.start()
+
+    def _connect(self):
+        conn = psycopg2.connect(
+            host=Config.DB_HOST,
+            port=Config.DB_PORT,
+            database=Config.DB_NAME,
+            user=Config.DB_USER,
+            password=Config.DB_PASSWORD
+        )
+        conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cursor:
+            for channel in CHANNELS:
+                cursor.execute(f'LISTEN {channel}')
+        return conn
+
+    def _run(self):
+        while True:
+            conn = None
+            try:
+                conn = self._connect()
+                self._connected = True
+                self._broadcast('status', {'connected': True})
+                while True:
+                    if not self._has_subscribers():
+                        # Nobody to serve: release the connection until someone subscribes
+                        return
+                    if select.select([conn], [], [], 5.0) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self._dispatch(notify.channel, notify.payload)
+            except Exception as e:
+                print(f"❌ Audit event listener error: {e}")
+                self._stats['reconnects'] += 1
+                if self._connected:
+                    self._broadcast('status', {'connected': False})
+            finally:
+                self._connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            if not self._has_subscribers():
+                return
+            time.sleep(self.reconnect_delay)
+
+    def _has_subscribers(self):
+        with self._lock:
+            if self._subscribers:
+                return True
+            # Let the next subscribe() start a fresh listener
+            self._thread = None
+            return False
+
+    def _dispatch(self, channel, payload):
+        self._stats['notifications'] += 1
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            data = {'reason': payload}
+        self._broadcast(EVENT_NAMES.get(channel, channel), data)
+
+    def _broadcast(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        dropped = sum(subscriber.push(event, data) for subscriber in subscribers)
+        self._stats['delivered'] += len(subscribers)
+        self._stats['dropped'] += dropped
+
+    def subscribe(self):
+        """
+        Register a client
+
+        Returns:
+            Subscriber, or None when max_subscribers is reached
+        """
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            subscriber = Subscriber(self.buffer_size)
+            self._subscribers.add(subscriber)
+        self._ensure_listener()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        subscriber.close()
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['subscribers'] = len(self._subscribers)
+        stats['listening'] = self._connected
+        return stats
+
+
+hub = EventHub(
+    buffer_size=Config.SSE_CLIENT_BUFFER,
+    max_subscribers=Config.SSE_MAX_CLIENTS
+)
+
+
+def sse_format(event, data, event_id=None):
+    """One SSE message"""
+    lines = [f'event: {event}']
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    lines.append('data: ' + json.dumps(data, separators=(',', ':'), default=str))
+    return '\n'.join(lines) + '\n\n'
+
+
+def sse_stream(subscriber, heartbeat=15.0):
+    """
+    Generator of SSE text for one subscriber until the client disconnects
+
+    Emits `dropped` when the client's buffer overflowed (refetch to catch up)
+    and a comment line every `heartbeat` seconds to keep proxies from closing
+    an idle connection.
+    """
+    try:
+        yield f'retry: {int(Config.SSE_RETRY_MS)}\n\n'
+        while True:
+            events, dropped = subscriber.drain(heartbeat)
+            if subscriber.closed:
+                return
+            if dropped:
+                yield sse_format('dropped', {'count': dropped})
+            if not events:
+                yield ': keepalive\n\n'
+                continue
+            yield ''.join(
+                sse_format(event, data, data.get('audit_id') if isinstance(data, dict) else None)
+                for event, data in events
+            )
+    finally:
+        hub.unsubscribe(subscriber)
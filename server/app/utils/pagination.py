@@ -0,0 +1,105 @@
+"""
+Keyset (cursor-based) pagination helpers for list endpoints
+"""
+import base64
+import json
+from datetime import date, datetime, time
+from flask import request
+from app.config import Config
+
+
+def _parse_integer(value):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError('not an integer')
+    return value
+
+
+# Cursor value parsers by key column type; each raises ValueError on a mismatch
+KEY_PARSERS = {
+    'integer': _parse_integer,
+    'bigint': _parse_integer,
+    'date': date.fromisoformat,
+    'time': time.fromisoformat,
+    'timestamp': datetime.fromisoformat,
+}
+
+
+def encode_cursor(values):
+    """Encode the sort-key values of the last row into an opaque token"""
+    raw = json.dumps(list(values), separators=(',', ':'), default=str).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, size):
+    """
+    Decode a token produced by encode_cursor
+    Raises ValueError if the token is malformed or has the wrong arity
+    """
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError('Invalid cursor')
+    if not all(isinstance(value, (str, int, float)) for value in values):
+        raise ValueError('Invalid cursor')
+    return values
+
+
+def parse_cursor(values, key_types):
+    """
+    Convert decoded cursor values to the key column types (KEY_PARSERS names)
+    Raises ValueError when a value does not fit its column (e.g. null)
+    """
+    try:
+        return [KEY_PARSERS[key_type](value) for value, key_type in zip(values, key_types)]
+    except (TypeError, ValueError):
+        raise ValueError('Invalid cursor')
+
+
+def get_page_args(key_types, max_limit=None):
+    """
+    Read `limit` and `cursor` from the query string
+    `limit` is clamped to max_limit (default Config.PAGE_SIZE_MAX)
+
+    Args:
+        key_types: Type of each keyset column, in order (see KEY_PARSERS)
+
+    Returns:
+        (limit, cursor_values) where cursor_values is None for the first page
+    Raises:
+        ValueError on a non-numeric limit, a bad cursor or ?page= beyond 1
+    """
+    # Offset paging was replaced by cursors; page=1 is just the first page
+    page = request.args.get('page')
+    if page is not None and (page.strip() != '1' or request.args.get('cursor')):
+        raise ValueError('page is not supported; pass next_cursor from the previous page as cursor')
+    try:
+        limit = int(request.args.get('limit', Config.PAGE_SIZE_DEFAULT))
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    limit = max(1, min(limit, max_limit or Config.PAGE_SIZE_MAX))
+
+    cursor = request.args.get('cursor')
+    if not cursor:
+        return limit, None
+    return limit, parse_cursor(decode_cursor(cursor, len(key_types)), key_types)
+
+
+def build_page(rows, limit, key_columns):
+    """
+    Trim a result fetched with LIMIT limit + 1 and compute next_cursor
+    `rows` is a list of dicts or a serializer.ResultSet
+
+    Returns:
+        (rows, next_cursor) where next_cursor is None on the last page
+    """
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    if hasattr(rows, 'value'):
+        # ResultSet of tuple rows
+        return rows, encode_cursor(rows.value(-1, column) for column in key_columns)
+    last = rows[-1]
+    return rows, encode_cursor(last[column] for column in key_columns)
@@ -0,0 +1,247 @@
+"""
+Password hashing service: bcrypt runs in a bounded process pool so slow
+hashes never pin request threads. Work beyond the pool's capacity is
+rejected immediately with HashingUnavailable (503) instead of queueing
+without bound.
+"""
+import atexit
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+from werkzeug.exceptions import ServiceUnavailable
+
+from app.config import Config
+
+
+class HashingUnavailable(ServiceUnavailable):
+    """Raised when the hashing pool is saturated or a hash timed out"""
+
+    def __init__(self, description='Authentication service is busy, please retry', retry_after=1):
+        super().__init__(description)
+        self.retry_after = retry_after
+
+
+# Worker functions run in the pool processes; they report their own
+# run time so queue wait and hash time can be told apart
+
+def _hashpw(password, rounds):
+    started = time.perf_counter()
+    salt = bcrypt.gensalt(rounds) if rounds else bcrypt.gensalt()
+    hashed = bcrypt.hashpw(password, salt)
+    return hashed, time.perf_counter() - started
+
+
+def _checkpw(password, hashed):
+    started = time.perf_counter()
+    matched = bcrypt.checkpw(password, hashed)
+    return matched, time.perf_counter() - started
+
+
+def hash_rounds(hashed_password):
+    """bcrypt cost of a stored hash ('$2b$12$...' -> 12), or None if not bcrypt"""
+    if not hashed_password or not hashed_password.startswith('$2'):
+        return None
+    try:
+        return int(hashed_password.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def calibrate_rounds(budget_ms, min_rounds=10, max_rounds=16, samples=3):
+    """
+    Highest bcrypt cost whose hash fits within budget_ms on this host
+
+    Times the cheapest cost (best of `samples`) and extrapolates: each
+    extra round doubles the work.
+    """
+    password = b'calibration-password'
+    salt = bcrypt.gensalt(min_rounds)
+    best = min(_timed(password, salt) for _ in range(samples))
+    rounds = min_rounds
+    while rounds < max_rounds and best * 2 ** (rounds + 1 - min_rounds) * 1000 <= budget_ms:
+        rounds += 1
+    return rounds, best * 2 ** (rounds - min_rounds) * 1000
+
+
+def _timed(password, salt):
+    started = time.perf_counter()
+    bcrypt.hashpw(password, salt)
+    return time.perf_counter() - started
+
+
+class PasswordHasher:
+    """
+    Bounded process pool for bcrypt
+
+    Args:
+        workers: Pool processes; 0 hashes inline on the calling thread
+        queue_size: Requests allowed to wait for a free process
+        timeout: Seconds a caller waits for its result before giving up
+        rounds: Target bcrypt cost for new hashes (None = library default
+            until calibrate() runs)
+        tolerance: Stored costs within this many rounds of the target are
+            not rehashed
+    """
+
+    def __init__(self, workers=2, queue_size=32, timeout=5.0, rounds=None, tolerance=0):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.rounds = rounds
+        self.tolerance = tolerance
+        self.estimated_hash_ms = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, workers + queue_size))
+        self._in_flight = 0
+        self._stats = {
+            'completed': 0,
+            'rejected': 0,
+            'timeouts': 0,
+            'hash_time_total': 0.0,
+            'wait_time_total': 0.0,
+            'latency_max': 0.0,
+        }
+
+    def _get_executor(self):
+        """Create the pool lazily, once per process (pools do not survive fork)"""
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            result, _ = fn(*args)
+            return result
+
+        # Admission control: fail fast rather than queue without bound
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._stats['rejected'] += 1
+            raise HashingUnavailable()
+
+        started = time.perf_counter()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BrokenProcessPool:
+            self._release()
+            with self._lock:
+                self._executor = None
+            raise HashingUnavailable()
+        # The slot is held until the work really finishes (or is cancelled),
+        # so callers that time out do not let more work in than the pool holds
+        future.add_done_callback(self._release)
+
+        try:
+            result, hash_time = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            with self._lock:
+                self._stats['timeouts'] += 1
+            raise HashingUnavailable()
+        except BrokenProcessPool:
+            with self._lock:
+                self._executor = None
+            raise HashingUnavailable()
+
+        latency = time.perf_counter() - started
+        with self._lock:
+            self._stats['completed'] += 1
+            self._stats['hash_time_total'] += hash_time
+            self._stats['wait_time_total'] += max(0.0, latency - hash_time)
+            self._stats['latency_max'] = max(self._stats['latency_max'], latency)
+        return result
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def calibrate(self, budget_ms, min_rounds=10, max_rounds=16, tolerance=1):
+        """
+        Set the target cost to the highest one hashing within budget_ms here
+
+        Each process calibrates on its own, so hosts may land a round apart;
+        `tolerance` keeps their hashes from being rewritten back and forth.
+        """
+        self.rounds, self.estimated_hash_ms = calibrate_rounds(budget_ms, min_rounds, max_rounds)
+        self.tolerance = tolerance
+        return self.rounds
+
+    def needs_rehash(self, hashed_password):
+        """True when a stored hash is not bcrypt or its cost is outside target +/- tolerance"""
+        if self.rounds is None:
+            return False
+        stored = hash_rounds(hashed_password)
+        return stored is None or abs(stored - self.rounds) > self.tolerance
+
+    def hash(self, password, rounds=None):
+        """bcrypt hash of `password` (str) as a str, at the target cost by default"""
+        return self._run(_hashpw, password.encode('utf-8'), rounds or self.rounds).decode('utf-8')
+
+    def verify(self, password, hashed_password):
+        """Check `password` against a stored bcrypt hash"""
+        return self._run(_checkpw, password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        """Queue depth and hash latency"""
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = self._in_flight
+        completed = stats.pop('completed')
+        hash_total = stats.pop('hash_time_total')
+        wait_total = stats.pop('wait_time_total')
+        return {
+            'rounds': self.rounds,
+            'rehash_tolerance': self.tolerance,
+            'estimated_hash_ms': round(self.estimated_hash_ms, 1) if self.estimated_hash_ms else None,
+            'workers': self.workers,
+            'capacity': self.workers + self.queue_size,
+            'in_flight': in_flight,
+            'queue_depth': max(0, in_flight - self.workers),
+            'completed': completed,
+            'rejected': stats['rejected'],
+            'timeouts': stats['timeouts'],
+            'hash_ms_avg': round(hash_total * 1000 / completed, 3) if completed else 0.0,
+            'wait_ms_avg': round(wait_total * 1000 / completed, 3) if completed else 0.0,
+            'latency_ms_max': round(stats['latency_max'] * 1000, 3),
+        }
+
+
+def admission_queue_size(workers, queue_size, pool_size):
+    """
+    Queue size that keeps admitted hashes (workers + queue) below the
+    database pool, so logins that finish hashing always find a connection
+    """
+    if workers <= 0:
+        return queue_size
+    return max(0, min(queue_size, pool_size - 1 - workers))
+
+
+_queue_size = admission_queue_size(Config.AUTH_HASH_WORKERS, Config.AUTH_HASH_QUEUE_SIZE,
+                                   Config.DB_POOL_MAX_SIZE)
+if _queue_size < Config.AUTH_HASH_QUEUE_SIZE:
+    print(f"⚠️  AUTH_HASH_QUEUE_SIZE lowered to {_queue_size} to stay below DB_POOL_MAX_SIZE")
+
+hasher = PasswordHasher(
+    workers=Config.AUTH_HASH_WORKERS,
+    queue_size=_queue_size,
+    timeout=Config.AUTH_HASH_TIMEOUT,
+    rounds=Config.BCRYPT_ROUNDS or None
+)
+atexit.register(hasher.shutdown)
@@ -0,0 +1,218 @@
+"""
+Bulk patient import from CSV
+
+Rows are read one at a time, validated with the same required fields as
+POST /api/patients and copied in batches (COPY) into a temporary staging
+table. When the file is consumed the staging table is merged into patients
+in the caller's transaction. A row matching an existing patient or an
+earlier row of the file (same first name, last name and date of birth,
+ignoring case) is skipped as a duplicate, so a corrected file can simply be
+imported again. Only the current batch and the error report (capped at
+max_errors entries) are held in memory.
+"""
+import codecs
+import csv
+import io
+from datetime import date
+
+# Shared with create_patient
+PATIENT_REQUIRED_FIELDS = ('first_name', 'last_name', 'date_of_birth', 'gender')
+PATIENT_COLUMNS = PATIENT_REQUIRED_FIELDS + ('phone', 'email', 'address')
+
+# Column sizes from create_schema.sql; COPY would reject the whole batch
+MAX_LENGTHS = {'first_name': 50, 'last_name': 50, 'gender': 10, 'phone': 20, 'email': 100}
+
+STAGING_TABLE = 'patient_import_staging'
+
+CREATE_STAGING_SQL = f"""
+    CREATE TEMP TABLE {STAGING_TABLE} (
+        line_no INTEGER PRIMARY KEY,
+        first_name VARCHAR(50),
+        last_name VARCHAR(50),
+        date_of_birth DATE,
+        gender VARCHAR(10),
+        phone VARCHAR(20),
+        email VARCHAR(100),
+        address TEXT,
+        duplicate BOOLEAN NOT NULL DEFAULT FALSE
+    ) ON COMMIT DROP
+"""
+
+COPY_SQL = f"COPY {STAGING_TABLE} (line_no, {', '.join(PATIENT_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+# Same identity as the search indexes use (idx_patients_last_name_prefix)
+MARK_DUPLICATES_SQL = f"""
+    UPDATE {STAGING_TABLE} s
+    SET duplicate = TRUE
+    WHERE EXISTS (
+            SELECT 1 FROM patients p
+            WHERE lower(p.last_name) = lower(s.last_name)
+              AND lower(p.first_name) = lower(s.first_name)
+              AND p.date_of_birth = s.date_of_birth
+          )
+       OR EXISTS (
+            SELECT 1 FROM {STAGING_TABLE} e
+            WHERE lower(e.last_name) = lower(s.last_name)
+              AND lower(e.first_name) = lower(s.first_name)
+              AND e.date_of_birth = s.date_of_birth
+              AND e.line_no < s.line_no
+          )
+"""
+
+MERGE_SQL = f"""
+    INSERT INTO patients ({', '.join(PATIENT_COLUMNS)}, created_by, updated_by)
+    SELECT {', '.join(PATIENT_COLUMNS)}, %s, %s
+    FROM {STAGING_TABLE}
+    WHERE NOT duplicate
+    ORDER BY line_no
+"""
+
+
+def open_csv(raw):
+    """Text rows from a binary stream (upload, request body or file), BOM tolerated"""
+    return codecs.iterdecode(raw, 'utf-8-sig')
+
+
+def validate_patient(row):
+    """
+    Check one patient dict
+
+    Returns:
+        (values, errors): values in PATIENT_COLUMNS order, errors a list of messages
+    """
+    errors = []
+    values = []
+    for field in PATIENT_COLUMNS:
+        value = (row.get(field) or '').strip() or None
+        if value is None:
+            if field in PATIENT_REQUIRED_FIELDS:
+                errors.append(f'Missing required field: {field}')
+        elif field == 'date_of_birth':
+            try:
+                value = date.fromisoformat(value)
+            except ValueError:
+                errors.append('date_of_birth must be a date (YYYY-MM-DD)')
+        elif field in MAX_LENGTHS and len(value) > MAX_LENGTHS[field]:
+            errors.append(f'{field} is longer than {MAX_LENGTHS[field]} characters')
+        values.append(value)
+    return values, errors
+
+
+class PatientImporter:
+    """
+    One CSV import on a caller-owned connection
+
+    The caller commits (or, for a dry run, rolls back) the transaction.
+
+    Args:
+        conn: psycopg2 connection; the staging table lives in its transaction
+        batch_size: Valid rows per COPY
+        max_errors: Error and duplicate entries kept for the report
+        created_by: user_id stored in created_by/updated_by
+    """
+
+    def __init__(self, conn, batch_size=1000, max_errors=1000, created_by=None):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.created_by = created_by
+        self.rows = 0
+        self.invalid = 0
+        self.errors = []
+
+    def run(self, lines, dry_run=False):
+        """
+        Validate, stage and merge every row of `lines` (iterable of CSV text lines)
+
+        Returns:
+            Summary dict with the per-row report
+        Raises:
+            ValueError when the header is missing a required column or the file is not UTF-8
+        """
+        reader = csv.DictReader(lines)
+        if not reader.fieldnames:
+            raise ValueError('CSV file is empty')
+        reader.fieldnames = [name.strip().lower() for name in reader.fieldnames]
+        missing = [field for field in PATIENT_REQUIRED_FIELDS if field not in reader.fieldnames]
+        if missing:
+            raise ValueError(f"CSV header is missing required columns: {', '.join(missing)}")
+        ignored = [name for name in reader.fieldnames if name not in PATIENT_COLUMNS]
+
+        with self.conn.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{STAGING_TABLE}")
+            cursor.execute(CREATE_STAGING_SQL)
+
+            batch = []
+            for row in reader:
+                self.rows += 1
+                values, errors = validate_patient(row)
+                if None in row:
+                    errors.append('Too many fields')
+                if errors:
+                    self._reject(reader.line_num, errors)
+                    continue
+                batch.append([reader.line_num] + values)
+                if len(batch) >= self.batch_size:
+                    self._copy(cursor, batch)
+                    batch = []
+            if batch:
+                self._copy(cursor, batch)
+
+            duplicates, duplicate_lines, imported = self._merge(cursor, dry_run)
+
+        return {
+            'rows': self.rows,
+            'imported': imported,
+            'duplicates': duplicates,
+            'invalid': self.invalid,
+            'errors': self.errors,
+            'duplicate_lines': duplicate_lines,
+            'truncated': len(self.errors) < self.invalid or len(duplicate_lines) < duplicates,
+            'ignored_columns': ignored,
+            'dry_run': dry_run,
+        }
+
+    def _reject(self, line, errors):
+        self.invalid += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def _copy(self, cursor, batch):
+        buffer = io.StringIO()
+        # None is written as an unquoted empty field, which COPY reads as NULL
+        csv.writer(buffer).writerows(batch)
+        buffer.seek(0)
+        cursor.copy_expert(COPY_SQL, buffer)
+
+    def _merge(self, cursor, dry_run):
+        """Skip duplicates and insert the rest; returns (duplicates, duplicate_lines, imported)"""
+        cursor.execute(
+            f"CREATE INDEX ON {STAGING_TABLE} (lower(last_name), lower(first_name), date_of_birth)"
+        )
+        cursor.execute(f"ANALYZE {STAGING_TABLE}")
+
+        # Keep concurrent inserts from slipping past the duplicate check;
+        # readers are not blocked
+        cursor.execute("LOCK TABLE patients IN SHARE ROW EXCLUSIVE MODE")
+        cursor.execute(MARK_DUPLICATES_SQL)
+        duplicates = cursor.rowcount
+
+        cursor.execute(
+            f"SELECT line_no FROM {STAGING_TABLE} WHERE duplicate ORDER BY line_no LIMIT %s",
+            (self.max_errors,)
+        )
+        duplicate_lines = [line for line, in cursor.fetchall()]
+
+        if dry_run:
+            cursor.execute(f"SELECT count(*) FROM {STAGING_TABLE} WHERE NOT duplicate")
+            return duplicates, duplicate_lines, cursor.fetchone()[0]
+
+        cursor.execute(MERGE_SQL, (self.created_by, self.created_by))
+        return duplicates, duplicate_lines, cursor.rowcount
+
+
+def summarize(result, source):
+    """One-line audit detail for an import"""
+    return (f"Bulk import from {source}: {result['imported']} imported, "
+            f"{result['duplicates']} duplicates skipped, {result['invalid']} invalid "
+            f"of {result['rows']} rows")
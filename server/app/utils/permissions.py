@@ -0,0 +1,175 @@
+"""
+Permission engine: the role -> (resource, action) matrix from
+role_permissions, held in memory as one integer bitmask per role.
+
+Each (resource, action) pair gets a bit position; a check is a dict
+lookup plus a shift. Masks are effective permissions: a role's own grants
+OR'd with those of every ancestor, read from the materialized role_closure
+(database/sql/role_hierarchy.sql). The matrix is rebuilt when permission_version (bumped
+by triggers on grant/revoke and hierarchy changes) moves
+past the version this process loaded.
+"""
+import threading
+import time
+from functools import wraps
+from flask import jsonify
+from app.config import Config
+from app.utils.auth import _accepts_current_user, _authenticate
+
+
+class Matrix:
+    """Immutable snapshot: bit index per (resource, action) and a mask per role"""
+
+    __slots__ = ('version', 'bits', 'role_masks', 'loaded_at')
+
+    def __init__(self, version, bits, role_masks):
+        self.version = version
+        self.bits = bits                # (resource, ACTION) -> bit position
+        self.role_masks = role_masks    # role_id -> int (direct | inherited)
+        self.loaded_at = time.time()
+
+    def allows(self, role_id, resource, action):
+        bit = self.bits.get((resource, action))
+        if bit is None:
+            return False
+        return (self.role_masks.get(role_id, 0) >> bit) & 1 == 1
+
+
+def _key(resource, action):
+    return resource.lower(), action.upper()
+
+
+class PermissionEngine:
+    """
+    Process-wide permission matrix with version-checked refresh
+
+    Args:
+        refresh_interval: Seconds between permission_version checks; a
+            grant/revoke made through this process applies immediately
+    """
+
+    def __init__(self, refresh_interval=2.0):
+        self.refresh_interval = refresh_interval
+        self._matrix = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reloads = 0
+
+    def _fetch(self, query):
+        """Run on a pooled connection of its own, outside the request transaction"""
+        from app.utils.database import get_pool
+
+        with get_pool().connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(query)
+                    return cursor.fetchall()
+            finally:
+                conn.rollback()
+
+    def _current_version(self):
+        rows = self._fetch("SELECT version FROM permission_version")
+        return rows[0][0] if rows else 0
+
+    def _load(self):
+        version = self._current_version()
+        rows = self._fetch("""
+            SELECT p.resource_name, p.action_name, c.descendant_id
+            FROM permissions p
+            LEFT JOIN role_permissions rp ON rp.permission_id = p.permission_id
+            LEFT JOIN role_closure c ON c.ancestor_id = rp.role_id
+            ORDER BY p.permission_id
+        """)
+
+        bits = {}
+        role_masks = {}
+        for resource_name, action_name, role_id in rows:
+            bit = bits.setdefault(_key(resource_name, action_name), len(bits))
+            if role_id is not None:
+                role_masks[role_id] = role_masks.get(role_id, 0) | (1 << bit)
+        self.reloads += 1
+        return Matrix(version, bits, role_masks)
+
+    def matrix(self):
+        """The current snapshot, reloaded if the version counter moved"""
+        matrix = self._matrix
+        now = time.monotonic()
+        if matrix is not None and now - self._checked_at < self.refresh_interval:
+            return matrix
+
+        with self._lock:
+            matrix = self._matrix
+            if matrix is not None and time.monotonic() - self._checked_at < self.refresh_interval:
+                return matrix
+            try:
+                if matrix is None or self._current_version() != matrix.version:
+                    matrix = self._load()
+                    self._matrix = matrix
+            except Exception as e:
+                if matrix is None:
+                    raise
+                print(f"❌ Permission refresh failed, keeping version {matrix.version}: {e}")
+            self._checked_at = time.monotonic()
+            return matrix
+
+    def invalidate(self):
+        """Force a version check on the next lookup (after a local grant/revoke)"""
+        self._checked_at = 0.0
+
+    def allows(self, role_id, resource, action):
+        """O(1) check of one (resource, action) for a role"""
+        resource, action = _key(resource, action)
+        return self.matrix().allows(role_id, resource, action)
+
+    def stats(self):
+        matrix = self._matrix
+        if matrix is None:
+            return {'loaded': False, 'reloads': self.reloads}
+        return {
+            'loaded': True,
+            'version': matrix.version,
+            'permissions': len(matrix.bits),
+            'roles': len(matrix.role_masks),
+            'reloads': self.reloads,
+            'loaded_at': matrix.loaded_at,
+        }
+
+
+engine = PermissionEngine(Config.PERMISSION_REFRESH_INTERVAL)
+
+
+def permission_required(resource, action):
+    """Decorator: allow the request only if the caller's role holds (resource, action)"""
+    resource, action = _key(resource, action)
+    denied_message = f'Access denied. Missing permission: {action} on {resource}'
+
+    def decorator(f):
+        passes_user = _accepts_current_user(f)
+
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            payload, error = _authenticate()
+            if error:
+                return error
+
+            try:
+                allowed = engine.matrix().allows(payload.get('role_id'), resource, action)
+            except Exception as e:
+                print(f"❌ Permission check failed: {e}")
+                return jsonify({
+                    'success': False,
+                    'message': 'Permission check unavailable'
+                }), 503
+
+            if not allowed:
+                return jsonify({
+                    'success': False,
+                    'message': denied_message
+                }), 403
+
+            if passes_user:
+                return f(*args, current_user=payload, **kwargs)
+            return f(*args, **kwargs)
+
+        return decorated
+    return decorator
@@ -0,0 +1,256 @@
+"""
+Thread-safe PostgreSQL connection pool with checkout timeout,
+health checks and fork-safe re-initialisation
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+
+
+class PoolTimeoutError(PoolError):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of psycopg2 connections
+
+    Args:
+        connect: Zero-argument callable returning a new psycopg2 connection
+        min_size: Connections opened eagerly and kept idle
+        max_size: Hard cap on open connections (idle + in use)
+        timeout: Seconds a caller waits for a free connection before PoolTimeoutError
+        healthcheck_interval: Idle seconds after which a connection is pinged on checkout
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=5.0, healthcheck_interval=30.0):
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError('Invalid pool size: require 0 <= min_size <= max_size and max_size >= 1')
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.healthcheck_interval = healthcheck_interval
+
+        self._cond = threading.Condition(threading.Lock())
+        self._reset_state()
+
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _reset_state(self):
+        """(Re)initialise bookkeeping for the current process"""
+        self._pid = os.getpid()
+        self._idle = []          # list of (connection, returned_at)
+        self._in_use = set()
+        self._opening = 0
+        self._waiting = 0
+        self._closed = False
+        self._stats = {
+            'connections_created': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'timeouts': 0,
+            'healthcheck_failures': 0,
+        }
+
+    def _after_fork(self):
+        """
+        Drop inherited connections in a forked child without closing them:
+        closing would send a Terminate message on the parent's socket
+        """
+        self._cond = threading.Condition(threading.Lock())
+        self._reset_state()
+
+    def _check_pid(self):
+        if self._pid != os.getpid():
+            self._after_fork()
+
+    # ------------------------------------------------------------------ #
+    # Opening / closing
+    # ------------------------------------------------------------------ #
+
+    def _discard(self, conn):
+        self._stats['connections_closed'] += 1
+        try:
+            if not conn.closed:
+                conn.close()
+        except psycopg2.Error:
+            pass
+
+    def fill(self):
+        """Open connections until min_size idle connections are available"""
+        self._check_pid()
+        with self._cond:
+            while self._live() < self.min_size:
+                self._idle.append((self._connect(), time.monotonic()))
+                self._stats['connections_created'] += 1
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+    # ------------------------------------------------------------------ #
+    # Checkout / return
+    # ------------------------------------------------------------------ #
+
+    def _healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - idle_since < self.healthcheck_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _live(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _checked_out(self, wait_started):
+        """Record a successful checkout; caller holds the lock"""
+        self._stats['checkouts'] += 1
+        if wait_started is not None:
+            self._stats['wait_time_total'] += time.monotonic() - wait_started
+
+    def getconn(self, timeout=None):
+        """Check out a connection, waiting up to `timeout` seconds if the pool is exhausted"""
+        self._check_pid()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        wait_started = None
+
+        while True:
+            candidate = None
+
+            # Reserve either an idle connection or a slot for a new one.
+            # Connecting and health checks happen outside the lock.
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise PoolError('Connection pool is closed')
+                    if self._idle:
+                        candidate = self._idle.pop()
+                        self._in_use.add(candidate[0])
+                        break
+                    if self._live() < self.max_size:
+                        self._opening += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f'No database connection available within {timeout:.1f}s '
+                            f'(max_size={self.max_size})'
+                        )
+                    if wait_started is None:
+                        wait_started = time.monotonic()
+                        self._stats['waits'] += 1
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if candidate is not None:
+                conn, idle_since = candidate
+                healthy = self._healthy(conn, idle_since)
+                with self._cond:
+                    if healthy:
+                        self._checked_out(wait_started)
+                        return conn
+                    self._in_use.discard(conn)
+                    self._stats['healthcheck_failures'] += 1
+                    self._discard(conn)
+                    self._cond.notify()
+                continue
+
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._opening -= 1
+                    self._cond.notify()
+                raise
+
+            with self._cond:
+                self._opening -= 1
+                self._stats['connections_created'] += 1
+                self._in_use.add(conn)
+                self._checked_out(wait_started)
+                return conn
+
+    def putconn(self, conn, close=False):
+        """Return a connection to the pool, rolling back any open transaction"""
+        if self._pid != os.getpid():
+            return
+
+        if not close and not conn.closed:
+            try:
+                if conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except psycopg2.Error:
+                close = True
+
+        with self._cond:
+            self._in_use.discard(conn)
+            if close or conn.closed or self._closed or len(self._idle) >= self.max_size:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Context manager that checks out a connection and always returns it"""
+        conn = self.getconn(timeout)
+        broken = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            broken = True
+            raise
+        finally:
+            self.putconn(conn, close=broken)
+
+    # ------------------------------------------------------------------ #
+    # Statistics
+    # ------------------------------------------------------------------ #
+
+    def stats(self):
+        """Snapshot of pool size and wait statistics"""
+        with self._cond:
+            idle = len(self._idle)
+            in_use = len(self._in_use)
+            stats = dict(self._stats)
+            stats.update({
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'live': idle + in_use,
+                'idle': idle,
+                'in_use': in_use,
+                'waiting': self._waiting,
+                'wait_time_avg_ms': round(stats['wait_time_total'] / stats['waits'] * 1000, 3)
+                                    if stats['waits'] else 0.0,
+            })
+            stats['wait_time_total'] = round(stats['wait_time_total'], 6)
+            return stats
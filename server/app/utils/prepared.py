@@ -0,0 +1,220 @@
+"""
+Per-connection cache of server-side prepared statements
+
+Statements are keyed by their SQL text (the "shape"), so the dynamic
+UPDATE ... SET builders map onto a small, bounded set of entries.
+A shape is PREPAREd once it has been executed `threshold` times on a
+connection and then run with EXECUTE; the least recently used statements
+are DEALLOCATEd when the cache is full.
+"""
+import threading
+from collections import OrderedDict
+
+import psycopg2
+from psycopg2 import extensions
+from app.config import Config
+
+PREPARABLE_COMMANDS = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'VALUES')
+
+# Shapes the server refused to prepare (e.g. untyped parameters); shared by
+# every connection in the process so the failed PREPARE is only paid once
+_unpreparable = set()
+_UNPREPARABLE_LIMIT = 1024
+
+_stats_lock = threading.Lock()
+_stats = {
+    'executions': 0,
+    'prepared_executions': 0,
+    'prepares': 0,
+    'prepare_failures': 0,
+    'evictions': 0,
+}
+
+
+def _count(key, amount=1):
+    with _stats_lock:
+        _stats[key] += amount
+
+
+def get_statement_stats():
+    """Prepare/execute counters and hit rates across all connections"""
+    with _stats_lock:
+        stats = dict(_stats)
+    executions = stats['executions']
+    prepared = stats['prepared_executions']
+    stats['execute_hit_rate'] = round(prepared / executions, 4) if executions else 0.0
+    # Share of prepared executions that reused an existing statement
+    stats['prepare_hit_rate'] = round(1 - stats['prepares'] / prepared, 4) if prepared else 0.0
+    return stats
+
+
+def to_prepared_sql(query, interpolated=True):
+    """
+    Convert a psycopg2 query using positional %s placeholders to $n form
+
+    Args:
+        query: SQL text
+        interpolated: False when the query runs without params; psycopg2
+            then sends it verbatim, so `%` is left alone as well
+
+    Returns (sql, param_count), or None if the query cannot be prepared
+    (named placeholders, unsupported command, other % directives).
+    """
+    stripped = query.lstrip()
+    if not stripped.upper().startswith(PREPARABLE_COMMANDS):
+        return None
+    if not interpolated:
+        return stripped, 0
+
+    out = []
+    count = 0
+    in_literal = False
+    i = 0
+    length = len(stripped)
+    while i < length:
+        ch = stripped[i]
+        if ch == "'":
+            in_literal = not in_literal
+            out.append(ch)
+        elif ch == '%':
+            nxt = stripped[i + 1] if i + 1 < length else ''
+            if nxt == '%':
+                out.append('%')
+                i += 1
+            elif nxt == 's' and not in_literal:
+                count += 1
+                out.append(f'${count}')
+                i += 1
+            else:
+                return None
+        else:
+            out.append(ch)
+        i += 1
+    return ''.join(out), count
+
+
+class StatementCache:
+    """LRU registry of prepared statement names for one connection"""
+
+    def __init__(self, capacity=128, threshold=2):
+        self.capacity = capacity
+        self.threshold = threshold
+        self._entries = OrderedDict()   # query -> [name or None, uses]
+        self._next_id = 0
+
+    def __len__(self):
+        return sum(1 for name, _ in self._entries.values() if name)
+
+    def clear(self):
+        """Forget all statements (after the session was reset)"""
+        self._entries.clear()
+
+    def lookup(self, query):
+        """
+        Record a use of `query` and return (name, should_prepare)
+        `name` is set when the statement is already prepared
+        """
+        entry = self._entries.get(query)
+        if entry is None:
+            entry = [None, 0]
+            self._entries[query] = entry
+        else:
+            self._entries.move_to_end(query)
+        entry[1] += 1
+        if entry[0]:
+            return entry[0], False
+        return None, entry[1] >= self.threshold
+
+    def discard(self, query):
+        """Drop `query` from the registry without deallocating it"""
+        self._entries.pop(query, None)
+
+    def add(self, query):
+        """Allocate a statement name for `query`"""
+        self._next_id += 1
+        name = f'_hrbac_ps_{self._next_id}'
+        self._entries[query][0] = name
+        return name
+
+    def evictions(self):
+        """Pop least recently used entries beyond capacity; return prepared names to DEALLOCATE"""
+        names = []
+        while len(self._entries) > self.capacity:
+            _, (name, _) = self._entries.popitem(last=False)
+            if name:
+                names.append(name)
+        return names
+
+
+class PreparedConnection(extensions.connection):
+    """psycopg2 connection carrying its own StatementCache"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = StatementCache(Config.DB_STATEMENT_CACHE_SIZE, Config.DB_PREPARE_THRESHOLD)
+
+
+def _prepare(cursor, name, sql):
+    """PREPARE inside a savepoint so a refusal does not abort the transaction"""
+    in_transaction = cursor.connection.get_transaction_status() == extensions.TRANSACTION_STATUS_INTRANS
+    try:
+        if in_transaction:
+            cursor.execute(f'SAVEPOINT _hrbac_prepare; PREPARE {name} AS {sql}; RELEASE SAVEPOINT _hrbac_prepare')
+        else:
+            cursor.execute(f'PREPARE {name} AS {sql}')
+        return True
+    except psycopg2.ProgrammingError:
+        if in_transaction:
+            cursor.execute('ROLLBACK TO SAVEPOINT _hrbac_prepare; RELEASE SAVEPOINT _hrbac_prepare')
+        else:
+            cursor.connection.rollback()
+        return False
+
+
+def execute(cursor, query, params=None):
+    """
+    Execute `query` on `cursor`, transparently using a prepared statement
+    when the connection supports it and the shape has been seen often enough
+    """
+    _count('executions')
+    conn = cursor.connection
+    cache = getattr(conn, 'statements', None)
+
+    if cache is None or cache.capacity <= 0 or query in _unpreparable or isinstance(params, dict):
+        cursor.execute(query, params)
+        return
+
+    name, should_prepare = cache.lookup(query)
+    for stale in cache.evictions():
+        cursor.execute(f'DEALLOCATE {stale}')
+        _count('evictions')
+
+    if name is None:
+        converted = to_prepared_sql(query, params is not None) if should_prepare else None
+        param_count = len(params) if params else 0
+        if converted is None or converted[1] != param_count:
+            if should_prepare:
+                _remember_unpreparable(query)
+            cursor.execute(query, params)
+            return
+
+        name = cache.add(query)
+        if not _prepare(cursor, name, converted[0]):
+            cache.discard(query)
+            _count('prepare_failures')
+            _remember_unpreparable(query)
+            cursor.execute(query, params)
+            return
+        _count('prepares')
+
+    _count('prepared_executions')
+    if params:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", tuple(params))
+    else:
+        cursor.execute(f'EXECUTE {name}')
+
+
+def _remember_unpreparable(query):
+    if len(_unpreparable) >= _UNPREPARABLE_LIMIT:
+        _unpreparable.clear()
+    _unpreparable.add(query)
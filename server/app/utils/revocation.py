@@ -0,0 +1,247 @@
+"""
+Token revocation: revoked JWT ids (jti) live in revoked_tokens, and each
+process keeps a Bloom filter of them so the common case (a token that was
+never revoked) is answered without a database round trip. Only filter
+hits are confirmed against the table.
+
+The filter picks up new revocations every `refresh_interval` seconds and
+is rebuilt from scratch every `rebuild_interval` seconds, dropping tokens
+that have expired since. Revocations made by this process apply at once.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from app.config import Config
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter over strings
+
+    Args:
+        capacity: Expected number of items
+        error_rate: Target false positive rate at that capacity
+    """
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(1, capacity)
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+
+class RevocationList:
+    """
+    Bloom-filtered view of revoked_tokens
+
+    Args:
+        refresh_interval: Seconds between fetches of newly revoked ids
+        rebuild_interval: Seconds between full rebuilds (expired ids dropped)
+        error_rate: Bloom false positive rate; each false positive costs one
+            confirming query, remembered until the next refresh
+    """
+
+    def __init__(self, refresh_interval=5.0, rebuild_interval=300.0, error_rate=0.01):
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self.error_rate = error_rate
+        self._bloom = None
+        self._watermark = None          # latest revoked_at loaded
+        self._refreshed_at = 0.0
+        self._rebuilt_at = 0.0
+        self._cleared = OrderedDict()   # jti -> None: Bloom hits confirmed not revoked
+        self._lock = threading.Lock()
+        self._stats = {'checks': 0, 'bloom_hits': 0, 'confirmed': 0, 'false_positives': 0,
+                       'rebuilds': 0, 'refresh_failures': 0}
+
+    def _execute(self, query, params=None, commit=False):
+        """Own pooled connection, outside the request transaction"""
+        from app.utils.database import get_pool
+
+        with get_pool().connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    rows = cursor.fetchall() if cursor.description else None
+                if commit:
+                    conn.commit()
+                return rows
+            finally:
+                if not commit:
+                    conn.rollback()
+
+    def _rebuild(self):
+        self._execute("SELECT revoked_tokens_purge()", commit=True)
+        rows = self._execute("""
+            SELECT jti, revoked_at FROM revoked_tokens WHERE expires_at > now()
+        """)
+        # Headroom so ids revoked before the next rebuild keep the error rate
+        bloom = BloomFilter(max(1024, len(rows) * 2), self.error_rate)
+        watermark = None
+        for jti, revoked_at in rows:
+            bloom.add(jti)
+            if watermark is None or revoked_at > watermark:
+                watermark = revoked_at
+        self._bloom = bloom
+        self._watermark = watermark
+        self._rebuilt_at = time.monotonic()
+        self._stats['rebuilds'] += 1
+
+    def _refresh(self):
+        if self._watermark is None:
+            rows = self._execute("SELECT jti, revoked_at FROM revoked_tokens WHERE expires_at > now()")
+        else:
+            # The lookback catches revocations whose transaction committed
+            # after a later-stamped one was already loaded
+            rows = self._execute("""
+                SELECT jti, revoked_at FROM revoked_tokens
+                WHERE revoked_at >= %s - INTERVAL '1 minute' AND expires_at > now()
+            """, (self._watermark,))
+        for jti, revoked_at in rows:
+            if jti not in self._bloom:
+                self._bloom.add(jti)
+            # A Bloom hit cleared earlier may have been revoked since
+            self._cleared.pop(jti, None)
+            if self._watermark is None or revoked_at > self._watermark:
+                self._watermark = revoked_at
+
+    def _filter(self):
+        """The current filter, refreshed or rebuilt when due"""
+        now = time.monotonic()
+        if self._bloom is not None and now - self._refreshed_at < self.refresh_interval:
+            return self._bloom
+
+        with self._lock:
+            now = time.monotonic()
+            if self._bloom is not None and now - self._refreshed_at < self.refresh_interval:
+                return self._bloom
+            try:
+                if self._bloom is None or now - self._rebuilt_at >= self.rebuild_interval:
+                    self._rebuild()
+                    self._cleared.clear()
+                else:
+                    self._refresh()
+            except Exception as e:
+                if self._bloom is None:
+                    raise
+                self._stats['refresh_failures'] += 1
+                print(f"❌ Revocation list refresh failed, keeping current filter: {e}")
+            self._refreshed_at = time.monotonic()
+            return self._bloom
+
+    def is_revoked(self, jti):
+        """
+        Whether a token id has been revoked
+
+        A Bloom miss is definitive. A hit is confirmed against
+        revoked_tokens; if that is not possible the token is treated as revoked.
+        """
+        if not jti:
+            return False
+        self._stats['checks'] += 1
+        try:
+            bloom = self._filter()
+        except Exception as e:
+            print(f"❌ Revocation list unavailable: {e}")
+            return True
+        if jti not in bloom:
+            return False
+
+        self._stats['bloom_hits'] += 1
+        with self._lock:
+            if jti in self._cleared:
+                self._cleared.move_to_end(jti)
+                return False
+        try:
+            rows = self._execute("SELECT 1 FROM revoked_tokens WHERE jti = %s", (jti,))
+        except Exception as e:
+            print(f"❌ Revocation check failed: {e}")
+            return True
+        if rows:
+            self._stats['confirmed'] += 1
+            return True
+
+        self._stats['false_positives'] += 1
+        with self._lock:
+            self._cleared[jti] = None
+            while len(self._cleared) > 1024:
+                self._cleared.popitem(last=False)
+        return False
+
+    def preload(self, jtis):
+        """Install a filter of `jtis` without the database (benchmarks, tests)"""
+        bloom = BloomFilter(max(1024, len(jtis) * 2), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        with self._lock:
+            self._bloom = bloom
+            self._cleared.clear()
+            self._refreshed_at = self._rebuilt_at = time.monotonic()
+
+    def add(self, jti):
+        """Record a revocation made by this process so it applies immediately"""
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+            self._cleared.pop(jti, None)
+
+    def stats(self):
+        bloom = self._bloom
+        stats = dict(self._stats)
+        stats.update({
+            'loaded': bloom is not None,
+            'entries': bloom.count if bloom else 0,
+            'bits': bloom.size if bloom else 0,
+            'hashes': bloom.hashes if bloom else 0,
+        })
+        return stats
+
+
+revocations = RevocationList(
+    refresh_interval=Config.REVOCATION_REFRESH_INTERVAL,
+    rebuild_interval=Config.REVOCATION_REBUILD_INTERVAL,
+    error_rate=Config.REVOCATION_FALSE_POSITIVE_RATE
+)
+
+
+def revoke_token(payload):
+    """
+    Revoke a verified token by its jti until its exp
+
+    Runs in the request transaction; tokens issued without a jti cannot be
+    revoked and simply run to their expiry.
+
+    Returns:
+        True if the token had a jti to revoke
+    """
+    from app.utils.database import execute_query
+
+    jti = payload.get('jti')
+    if not jti:
+        return False
+    execute_query("""
+        INSERT INTO revoked_tokens (jti, user_id, expires_at)
+        VALUES (%s, %s, to_timestamp(%s))
+        ON CONFLICT (jti) DO NOTHING
+    """, (jti, payload.get('user_id'), payload['exp']), fetch=False)
+    revocations.add(jti)
+    return True
@@ -0,0 +1,249 @@
+"""
+Fast row serialization from tuple rows + cursor.description
+
+A RowSerializer is compiled once per result shape (column names and type
+OIDs) and cached. It converts date/time/Decimal columns with a per-column
+function instead of an isinstance chain per value, and writes a JSON array
+of objects from tuple rows with orjson when installed, or with an encoder
+generated for that shape which builds no per-row dicts.
+"""
+import json
+import threading
+from collections import OrderedDict
+from json.encoder import encode_basestring_ascii
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # optional speed-up
+    orjson = None
+
+# PostgreSQL type OIDs (pg_type.oid)
+BOOL_OID = 16
+INT_OIDS = {20, 21, 23, 26}            # int8, int2, int4, oid
+TEXT_OIDS = {19, 25, 1042, 1043}       # name, text, bpchar, varchar
+FLOAT_OIDS = {700, 701}                # float4, float8
+DATE_OID = 1082
+TIME_OID = 1083
+TIMETZ_OID = 1266
+TIMESTAMP_OIDS = {1114, 1184}          # timestamp, timestamptz
+NUMERIC_OID = 1700
+
+_CACHE_SIZE = 256
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _isoformat(value):
+    return value.isoformat()
+
+
+def _time(value):
+    return value.isoformat(timespec='seconds')
+
+
+def _timetz(value):
+    return value.strftime('%H:%M:%S')
+
+
+def _dumps(value):
+    return json.dumps(value, separators=(',', ':'), default=str)
+
+
+def _python_converter(type_code, native_datetimes=False):
+    """
+    Converter to a JSON-compatible Python value, or None for identity
+    With native_datetimes, date/timestamp values are left for orjson
+    """
+    if type_code == DATE_OID or type_code in TIMESTAMP_OIDS:
+        return None if native_datetimes else _isoformat
+    if type_code == TIME_OID:
+        return _time
+    if type_code == TIMETZ_OID:
+        return _timetz
+    if type_code == NUMERIC_OID:
+        return float
+    return None
+
+
+def _json_expression(type_code, var):
+    """Python expression producing JSON text for the non-NULL value `var`"""
+    if type_code in INT_OIDS:
+        return f'str({var})'
+    if type_code in TEXT_OIDS:
+        return f'_esc({var})'
+    if type_code == BOOL_OID:
+        return f"('true' if {var} else 'false')"
+    if type_code == DATE_OID or type_code in TIMESTAMP_OIDS:
+        return f"'\"' + {var}.isoformat() + '\"'"
+    if type_code == TIME_OID:
+        return f"'\"' + {var}.isoformat(timespec='seconds') + '\"'"
+    if type_code == TIMETZ_OID:
+        return f"{var}.strftime('\"%H:%M:%S\"')"
+    if type_code == NUMERIC_OID or type_code in FLOAT_OIDS:
+        return f'repr(float({var}))'
+    return f'_dumps({var})'
+
+
+def _compile_encoder(columns):
+    """
+    Generate a function that encodes tuple rows as a JSON array string
+    Column names are embedded as escaped string literals only
+    """
+    if not columns:
+        return lambda rows: '[' + ','.join('{}' for _ in rows) + ']'
+    variables = [f'v{i}' for i in range(len(columns))]
+    pieces = []
+    for i, (name, type_code) in enumerate(columns):
+        prefix = ('{' if i == 0 else ',') + encode_basestring_ascii(name) + ':'
+        var = variables[i]
+        pieces.append(f"{prefix!r} + ('null' if {var} is None else {_json_expression(type_code, var)})")
+    source = (
+        'def encode(rows):\n'
+        f"    return '[' + ','.join([{' + '.join(pieces)} + '}}' "
+        f"for ({', '.join(variables)},) in rows]) + ']'\n"
+    )
+    namespace = {'_esc': encode_basestring_ascii, '_dumps': _dumps}
+    exec(compile(source, '<row-encoder>', 'exec'), namespace)
+    return namespace['encode']
+
+
+def _converter_list(columns, native_datetimes=False):
+    return [
+        (i, conv) for i, (_, type_code) in enumerate(columns)
+        for conv in [_python_converter(type_code, native_datetimes)] if conv is not None
+    ]
+
+
+def _apply(converters, row):
+    values = list(row)
+    for i, conv in converters:
+        value = values[i]
+        if value is not None:
+            values[i] = conv(value)
+    return values
+
+
+class RowSerializer:
+    """Per-result-shape serializer compiled from cursor.description"""
+
+    def __init__(self, columns):
+        self._columns = tuple(columns)
+        self.names = tuple(name for name, _ in columns)
+        self._index = {name: i for i, name in enumerate(self.names)}
+        self._converters = _converter_list(columns)
+        self._orjson_converters = _converter_list(columns, native_datetimes=True)
+        self._encode = None  # generated lazily when orjson is unavailable
+
+    def to_dict(self, row):
+        """Serialize one tuple row to a dict"""
+        if row is None:
+            return None
+        if not self._converters:
+            return dict(zip(self.names, row))
+        return dict(zip(self.names, _apply(self._converters, row)))
+
+    def to_dicts(self, rows):
+        """Serialize tuple rows to a list of dicts"""
+        names = self.names
+        converters = self._converters
+        if not converters:
+            return [dict(zip(names, row)) for row in rows]
+        return [dict(zip(names, _apply(converters, row))) for row in rows]
+
+    def value(self, row, name):
+        """Converted value of column `name` in a tuple row"""
+        i = self._index[name]
+        value = row[i]
+        for j, conv in self._converters:
+            if j == i and value is not None:
+                return conv(value)
+        return value
+
+    def to_json(self, rows):
+        """
+        Encode tuple rows as a JSON array of objects (bytes)
+        Uses orjson when installed (dates/timestamps encoded natively),
+        otherwise the generated encoder writes the text without dicts
+        """
+        if orjson is not None:
+            names = self.names
+            converters = self._orjson_converters
+            if converters:
+                objects = [dict(zip(names, _apply(converters, row))) for row in rows]
+            else:
+                objects = [dict(zip(names, row)) for row in rows]
+            return orjson.dumps(objects, default=str)
+
+        if self._encode is None:
+            self._encode = _compile_encoder(self._columns)
+        return self._encode(rows).encode('ascii')
+
+
+def get_serializer(description):
+    """Return the cached RowSerializer for a cursor.description"""
+    key = tuple((column.name, column.type_code) for column in description)
+    with _cache_lock:
+        serializer = _cache.get(key)
+        if serializer is not None:
+            _cache.move_to_end(key)
+            return serializer
+    serializer = RowSerializer(key)
+    with _cache_lock:
+        _cache[key] = serializer
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return serializer
+
+
+class ResultSet:
+    """Tuple rows plus their serializer, kept undecoded until the response"""
+
+    def __init__(self, serializer, rows):
+        self.serializer = serializer
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ResultSet(self.serializer, self.rows[index])
+        return self.serializer.to_dict(self.rows[index])
+
+    def value(self, index, name):
+        """Converted value of column `name` in row `index`"""
+        return self.serializer.value(self.rows[index], name)
+
+    def to_dicts(self):
+        return self.serializer.to_dicts(self.rows)
+
+    def to_json(self):
+        return self.serializer.to_json(self.rows)
+
+
+class RawJSON:
+    """JSON text built by the database (json_build_object(...)::text), spliced in as is"""
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def to_json(self):
+        return self.text.encode('utf-8')
+
+
+def json_response(status=200, **fields):
+    """
+    Build a JSON object Response; ResultSet and RawJSON fields are spliced
+    in pre-encoded, everything else goes through json.dumps
+    """
+    parts = []
+    for key, value in fields.items():
+        if isinstance(value, (ResultSet, RawJSON)):
+            encoded = value.to_json()
+        else:
+            encoded = _dumps(value).encode('utf-8')
+        parts.append(encode_basestring_ascii(key).encode('ascii') + b':' + encoded)
+    return Response(b'{' + b','.join(parts) + b'}', status=status, mimetype='application/json')
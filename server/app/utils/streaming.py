@@ -0,0 +1,81 @@
+"""
+Chunked NDJSON / JSON-array responses for large result sets
+"""
+import json
+from flask import Response, request
+
+CHUNK_SIZE = 64 * 1024  # bytes buffered before each write
+
+
+def wants_stream():
+    """True when the client asked for a streamed response (?stream=1)"""
+    return request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+
+def _wants_ndjson():
+    if request.args.get('format', '').lower() == 'ndjson':
+        return True
+    return 'application/x-ndjson' in request.headers.get('Accept', '')
+
+
+def _encode(row):
+    return json.dumps(row, separators=(',', ':'), default=str).encode('utf-8')
+
+
+def _ndjson(rows):
+    """One JSON object per line; a trailing {"error": ...} line reports a failure mid-stream"""
+    buffer = []
+    size = 0
+    try:
+        for row in rows:
+            line = _encode(row) + b'\n'
+            buffer.append(line)
+            size += len(line)
+            if size >= CHUNK_SIZE:
+                yield b''.join(buffer)
+                buffer, size = [], 0
+    except Exception as e:
+        buffer.append(_encode({'error': str(e)}) + b'\n')
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _json_array(rows, key):
+    """{"<key>": [...], "success": true} written incrementally"""
+    buffer = [b'{"' + key.encode('utf-8') + b'":[']
+    size = len(buffer[0])
+    first = True
+    try:
+        for row in rows:
+            item = _encode(row) if first else b',' + _encode(row)
+            first = False
+            buffer.append(item)
+            size += len(item)
+            if size >= CHUNK_SIZE:
+                yield b''.join(buffer)
+                buffer, size = [], 0
+        buffer.append(b'],"success":true}')
+    except Exception as e:
+        # Status is already sent: close the array and flag the failure in the body
+        buffer.append(b'],"success":false,"error":' + _encode(str(e)) + b'}')
+    yield b''.join(buffer)
+
+
+def stream_response(rows, key):
+    """
+    Build a chunked Response from a row iterator (e.g. database.stream_query)
+
+    Args:
+        rows: Iterator of JSON-serializable dicts; closed when the response ends
+        key: Envelope key for the JSON-array format (e.g. 'patients')
+    """
+    if _wants_ndjson():
+        response = Response(_ndjson(rows), mimetype='application/x-ndjson')
+    else:
+        response = Response(_json_array(rows, key), mimetype='application/json')
+
+    # Release the server-side cursor even if the client disconnects early
+    if hasattr(rows, 'close'):
+        response.call_on_close(rows.close)
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
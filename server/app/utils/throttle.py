@@ -0,0 +1,258 @@
+"""
+Login throttling: sliding windows of failed logins per username and per
+client IP, checked before the user lookup and bcrypt so a locked principal
+costs a dict lookup instead of a password hash and an audit INSERT.
+
+Reaching the failure limit locks the principal; each further lockout in
+the same window doubles its length (up to a cap). State is kept in a
+bounded LRU per process, and optionally shared across processes through
+login_throttle (database/sql/login_throttle.sql).
+"""
+import math
+import threading
+import time
+from collections import OrderedDict, deque
+
+from app.config import Config
+
+
+def user_key(username):
+    return f'user:{username.lower()}'
+
+
+def ip_key(ip):
+    return f'ip:{ip}'
+
+
+class _Window:
+    """Recent failure times (monotonic) and lock state of one principal"""
+
+    __slots__ = ('failures', 'lockouts', 'locked_until')
+
+    def __init__(self, limit):
+        self.failures = deque(maxlen=limit)
+        self.lockouts = 0
+        self.locked_until = 0.0
+
+
+class DatabaseThrottleStore:
+    """Shared windows in login_throttle, for multi-process deployments"""
+
+    def _execute(self, query, params):
+        """Own pooled connection and commit, independent of the request transaction"""
+        from app.utils.database import get_pool
+
+        with get_pool().connection() as conn:
+            try:
+                with conn.cursor() as cursor:
+                    cursor.execute(query, params)
+                    row = cursor.fetchone() if cursor.description else None
+                conn.commit()
+                return row
+            except Exception:
+                conn.rollback()
+                raise
+
+    def locked_for(self, principals):
+        """Seconds until the latest shared lock among `principals` expires (0 if none)"""
+        row = self._execute("""
+            SELECT EXTRACT(EPOCH FROM MAX(locked_until) - LOCALTIMESTAMP)
+            FROM login_throttle
+            WHERE principal = ANY(%s::varchar[]) AND locked_until > LOCALTIMESTAMP
+        """, (list(principals),))
+        return float(row[0]) if row and row[0] else 0.0
+
+    def fail(self, principal, limit, window, base, cap):
+        """Record a failure; seconds the principal is now locked for (0 if not)"""
+        row = self._execute("""
+            SELECT EXTRACT(EPOCH FROM login_throttle_fail(%s, %s, %s, %s, %s) - LOCALTIMESTAMP)
+        """, (principal, limit, window, base, cap))
+        return float(row[0]) if row and row[0] else 0.0
+
+    def clear(self, principals):
+        self._execute(
+            "DELETE FROM login_throttle WHERE principal = ANY(%s::varchar[])",
+            (list(principals),)
+        )
+
+
+class LoginThrottle:
+    """
+    Failed-login windows with lockout and exponential backoff
+
+    Args:
+        window: Seconds a failure counts towards the limit
+        user_limit: Failures per username within the window before a lockout
+        ip_limit: Failures per client IP within the window before a lockout
+        base_lockout: Seconds of the first lockout; doubled for each repeat
+        max_lockout: Upper bound on a lockout
+        max_entries: Principals tracked per process; least recently used go first
+        store: Optional shared store (DatabaseThrottleStore)
+    """
+
+    def __init__(self, window=900, user_limit=5, ip_limit=20, base_lockout=60,
+                 max_lockout=3600, max_entries=10000, store=None):
+        self.window = window
+        self.user_limit = user_limit
+        self.ip_limit = ip_limit
+        self.base_lockout = base_lockout
+        self.max_lockout = max_lockout
+        self.max_entries = max_entries
+        self.store = store
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'rejected': 0, 'failures': 0, 'lockouts': 0, 'evictions': 0, 'unlocks': 0}
+
+    def _principals(self, username, ip):
+        principals = []
+        if username:
+            principals.append((user_key(username), self.user_limit))
+        if ip:
+            principals.append((ip_key(ip), self.ip_limit))
+        return principals
+
+    def _get(self, key, limit):
+        """Window for `key`, created and marked most recently used (lock held)"""
+        entry = self._windows.get(key)
+        if entry is None:
+            entry = self._windows[key] = _Window(limit)
+            while len(self._windows) > self.max_entries:
+                self._windows.popitem(last=False)
+                self._stats['evictions'] += 1
+        else:
+            self._windows.move_to_end(key)
+        return entry
+
+    def _lockout_seconds(self, lockouts):
+        return min(self.base_lockout * 2 ** min(lockouts, 20), self.max_lockout)
+
+    def check(self, username, ip):
+        """
+        Seconds the caller must wait before another attempt (0 = allowed)
+
+        Args:
+            username: Login name as submitted
+            ip: Client address
+        """
+        principals = self._principals(username, ip)
+        now = time.monotonic()
+        remaining = 0.0
+        with self._lock:
+            for key, _ in principals:
+                entry = self._windows.get(key)
+                if entry is not None and entry.locked_until > now:
+                    remaining = max(remaining, entry.locked_until - now)
+
+        if not remaining and self.store is not None:
+            try:
+                remaining = self.store.locked_for(key for key, _ in principals)
+            except Exception as e:
+                # Fall back to this process's windows rather than block logins
+                print(f"❌ Login throttle store unavailable: {e}")
+
+        if remaining:
+            with self._lock:
+                self._stats['rejected'] += 1
+        return math.ceil(remaining)
+
+    def record_failure(self, username, ip):
+        """
+        Count a failed login against the username and the IP
+
+        Returns:
+            Seconds of the lockout this failure triggered (0 if none)
+        """
+        principals = self._principals(username, ip)
+        now = time.monotonic()
+        locked_for = 0.0
+        with self._lock:
+            self._stats['failures'] += 1
+            for key, limit in principals:
+                entry = self._get(key, limit)
+                cutoff = now - self.window
+                while entry.failures and entry.failures[0] <= cutoff:
+                    entry.failures.popleft()
+                if not entry.failures:
+                    entry.lockouts = 0      # A quiet window ends the backoff
+                entry.failures.append(now)
+                if len(entry.failures) >= limit:
+                    seconds = self._lockout_seconds(entry.lockouts)
+                    entry.lockouts += 1
+                    entry.locked_until = now + seconds
+                    self._stats['lockouts'] += 1
+                    locked_for = max(locked_for, seconds)
+
+        if self.store is not None:
+            for key, limit in principals:
+                try:
+                    shared = self.store.fail(key, limit, self.window, self.base_lockout, self.max_lockout)
+                except Exception as e:
+                    print(f"❌ Login throttle store unavailable: {e}")
+                    break
+                if shared > locked_for:
+                    # Another process pushed this principal over the limit
+                    with self._lock:
+                        entry = self._get(key, limit)
+                        entry.locked_until = max(entry.locked_until, now + shared)
+                    locked_for = shared
+        return math.ceil(locked_for)
+
+    def record_success(self, username):
+        """A successful login clears the username's window (not the IP's)"""
+        key = user_key(username)
+        with self._lock:
+            self._windows.pop(key, None)
+        if self.store is not None:
+            try:
+                self.store.clear([key])
+            except Exception as e:
+                print(f"❌ Login throttle store unavailable: {e}")
+
+    def unlock(self, username=None, ip=None):
+        """
+        Drop the windows of a username and/or IP (admin unlock)
+
+        Returns:
+            Number of locked principals released in this process
+        """
+        keys = [key for key, _ in self._principals(username, ip)]
+        now = time.monotonic()
+        released = 0
+        with self._lock:
+            for key in keys:
+                entry = self._windows.pop(key, None)
+                if entry is not None and entry.locked_until > now:
+                    released += 1
+            self._stats['unlocks'] += 1
+        if self.store is not None and keys:
+            self.store.clear(keys)
+        return released
+
+    def locked(self):
+        """Principals locked in this process, with seconds remaining"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                key: math.ceil(entry.locked_until - now)
+                for key, entry in self._windows.items()
+                if entry.locked_until > now
+            }
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['tracked'] = len(self._windows)
+        stats['backend'] = 'database' if self.store is not None else 'memory'
+        stats['locked'] = len(self.locked())
+        return stats
+
+
+throttle = LoginThrottle(
+    window=Config.LOGIN_THROTTLE_WINDOW,
+    user_limit=Config.LOGIN_MAX_FAILURES_USER,
+    ip_limit=Config.LOGIN_MAX_FAILURES_IP,
+    base_lockout=Config.LOGIN_LOCKOUT_BASE,
+    max_lockout=Config.LOGIN_LOCKOUT_MAX,
+    max_entries=Config.LOGIN_THROTTLE_MAX_ENTRIES,
+    store=DatabaseThrottleStore() if Config.LOGIN_THROTTLE_BACKEND == 'database' else None
+)
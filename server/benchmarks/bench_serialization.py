@@ -0,0 +1,89 @@
+"""
+Microbenchmark: row serialization for list endpoints
+
+Compares the previous path (RealDictCursor dict rows -> serialize_row ->
+Flask jsonify) with the compiled tuple-row path (cursor tuples ->
+RowSerializer -> JSON bytes). No database is needed: rows are synthesised
+to match the GET /api/appointments result shape.
+
+Usage (from server/):
+    python -m benchmarks.bench_serialization [rows] [repeats]
+"""
+import sys
+import timeit
+from collections import namedtuple
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from flask import Flask, jsonify
+
+from app.utils import serializer as serializer_module
+from app.utils.database import serialize_row
+from app.utils.serializer import ResultSet, get_serializer, json_response
+
+Column = namedtuple('Column', 'name type_code')
+
+DESCRIPTION = [
+    Column('appointment_id', 23), Column('patient_id', 23), Column('doctor_id', 23),
+    Column('appointment_date', 1082), Column('appointment_time', 1083),
+    Column('status', 1043), Column('reason', 25), Column('notes', 25),
+    Column('created_at', 1114), Column('updated_at', 1114),
+    Column('patient_name', 25), Column('doctor_name', 1043), Column('fee', 1700),
+]
+
+
+def make_rows(count):
+    base = datetime(2025, 1, 1, 8, 30, 0, 123456)
+    rows = []
+    for i in range(count):
+        stamp = base + timedelta(minutes=i)
+        rows.append((
+            i, i % 5000, (i % 40) or None,
+            date(2025, 1, 1) + timedelta(days=i % 365), time(8 + i % 9, (i * 7) % 60),
+            'Scheduled', 'Follow-up visit', None if i % 3 else 'Bring previous results',
+            stamp, stamp, f'Patient {i}', f'doctor{i % 40}', Decimal('125.50'),
+        ))
+    return rows
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    rows = make_rows(count)
+    names = [column.name for column in DESCRIPTION]
+    dict_rows = [dict(zip(names, row)) for row in rows]  # what RealDictCursor returned
+
+    app = Flask(__name__)
+
+    def old_path():
+        serialized = [serialize_row(row) for row in dict_rows]
+        return jsonify({'success': True, 'appointments': serialized}).get_data()
+
+    def new_path():
+        result = ResultSet(get_serializer(DESCRIPTION), rows)
+        return json_response(success=True, appointments=result).get_data()
+
+    def new_path_pure():
+        saved, serializer_module.orjson = serializer_module.orjson, None
+        try:
+            return new_path()
+        finally:
+            serializer_module.orjson = saved
+
+    with app.app_context():
+        paths = [('RealDictCursor + serialize_row + jsonify', old_path),
+                 ('tuple rows + RowSerializer (pure Python)', new_path_pure)]
+        if serializer_module.orjson is not None:
+            paths.append(('tuple rows + RowSerializer (orjson)', new_path))
+
+        print(f'{count} rows x {repeats} repeats')
+        baseline = None
+        for label, fn in paths:
+            best = min(timeit.repeat(fn, number=1, repeat=repeats))
+            baseline = baseline or best
+            print(f'  {label:<44} {best * 1000:8.1f} ms  ({baseline / best:4.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
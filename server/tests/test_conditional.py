@@ -0,0 +1,84 @@
+"""
+Collection validators: the patient list tag changes when the date does
+"""
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app import create_app
+from app.utils import database
+from app.utils.conditional import collection_versions
+
+VERSIONS = [
+    ('patient_summary', 3, datetime(2026, 10, 16, 9, 0)),
+    ('patients', 5, datetime(2026, 10, 16, 9, 0)),
+    ('users', 1, datetime(2026, 1, 1, 0, 0)),
+]
+
+
+class _Cursor:
+    def __init__(self, today):
+        self.today = today
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        pass
+
+    def fetchall(self):
+        return VERSIONS
+
+    def fetchone(self):
+        return (self.today,)
+
+
+class _Connection:
+    def __init__(self, today):
+        self.today = today
+
+    def cursor(self):
+        return _Cursor(self.today)
+
+    def rollback(self):
+        pass
+
+
+class _Pool:
+    def __init__(self, today):
+        self.today = today
+
+    @contextmanager
+    def connection(self, timeout=None):
+        yield _Connection(self.today)
+
+
+@pytest.fixture
+def app():
+    return create_app()
+
+
+def _validators(app, monkeypatch, today, by_date):
+    monkeypatch.setattr(database, 'get_pool', lambda: _Pool(today))
+    with app.test_request_context('/api/patients/'):
+        return collection_versions.validators(
+            'patients', ('patients', 'patient_summary', 'users'), by_date=by_date
+        )
+
+
+def test_date_dependent_tag_changes_at_midnight(app, monkeypatch):
+    before = _validators(app, monkeypatch, date(2026, 10, 16), by_date=True)
+    after = _validators(app, monkeypatch, date(2026, 10, 17), by_date=True)
+    assert before[0] != after[0]
+    expected = datetime(2026, 10, 17).astimezone(timezone.utc)
+    assert after[1] == expected
+
+
+def test_date_independent_tag_ignores_the_date(app, monkeypatch):
+    before = _validators(app, monkeypatch, date(2026, 10, 16), by_date=False)
+    after = _validators(app, monkeypatch, date(2026, 10, 17), by_date=False)
+    assert before == after
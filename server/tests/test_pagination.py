@@ -0,0 +1,40 @@
+"""
+Keyset cursors: encode/decode round trip and conversion to key column types
+"""
+from datetime import date, datetime, time
+
+import pytest
+
+from app.utils.pagination import decode_cursor, encode_cursor, parse_cursor
+
+
+def test_round_trip_converts_to_key_types():
+    token = encode_cursor([datetime(2024, 5, 1, 8, 30, 15, 250000), 42])
+    values = parse_cursor(decode_cursor(token, 2), ('timestamp', 'integer'))
+    assert values == [datetime(2024, 5, 1, 8, 30, 15, 250000), 42]
+
+
+def test_date_and_time_keys():
+    values = parse_cursor(['2024-05-01', '09:15:00', 7], ('date', 'time', 'integer'))
+    assert values == [date(2024, 5, 1), time(9, 15), 7]
+
+
+@pytest.mark.parametrize('values, key_types', [
+    (['yesterday', 1], ('timestamp', 'integer')),
+    (['2024-05-01 08:30:00', '1'], ('timestamp', 'integer')),
+    (['2024-05-01 08:30:00', 1.5], ('timestamp', 'bigint')),
+    (['2024-05-01 08:30:00', True], ('timestamp', 'integer')),
+    ([20240501, '09:15', 1], ('date', 'time', 'integer')),
+])
+def test_values_of_the_wrong_type_are_rejected(values, key_types):
+    with pytest.raises(ValueError):
+        parse_cursor(values, key_types)
+
+
+def test_null_and_wrong_arity_are_rejected():
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor([None, 1]), 2)
+    with pytest.raises(ValueError):
+        decode_cursor(encode_cursor(['2024-05-01 08:30:00']), 2)
+    with pytest.raises(ValueError):
+        decode_cursor('not-base64!', 2)
@@ -0,0 +1,60 @@
+"""
+to_prepared_sql: psycopg2 %s placeholders -> PostgreSQL $n
+"""
+from app.utils.prepared import to_prepared_sql
+
+
+def test_positional_placeholders_are_numbered():
+    sql, count = to_prepared_sql("SELECT * FROM users WHERE user_id = %s AND role_id = %s")
+    assert sql == "SELECT * FROM users WHERE user_id = $1 AND role_id = $2"
+    assert count == 2
+
+
+def test_leading_whitespace_is_stripped():
+    assert to_prepared_sql("\n    DELETE FROM users WHERE user_id = %s") == \
+        ("DELETE FROM users WHERE user_id = $1", 1)
+
+
+def test_query_without_placeholders():
+    assert to_prepared_sql("SELECT count(*) FROM patients") == ("SELECT count(*) FROM patients", 0)
+
+
+def test_escaped_percent_becomes_literal_percent():
+    sql, count = to_prepared_sql("SELECT * FROM patients WHERE last_name LIKE %s || '%%'")
+    assert sql == "SELECT * FROM patients WHERE last_name LIKE $1 || '%'"
+    assert count == 1
+
+
+def test_escaped_percent_outside_literal():
+    assert to_prepared_sql("SELECT 10 %% %s") == ("SELECT 10 % $1", 1)
+
+
+def test_query_without_params_is_left_verbatim():
+    # psycopg2 does not interpolate when params is None, so %% stays %%
+    query = "SELECT * FROM patients WHERE last_name LIKE 'A%%'"
+    assert to_prepared_sql(query, interpolated=False) == (query, 0)
+
+
+def test_placeholder_inside_literal_is_rejected():
+    assert to_prepared_sql("SELECT '%s' FROM users WHERE user_id = %s") is None
+
+
+def test_named_placeholders_are_rejected():
+    assert to_prepared_sql("SELECT * FROM users WHERE username = %(username)s") is None
+
+
+def test_other_directives_are_rejected():
+    assert to_prepared_sql("SELECT * FROM users WHERE user_id = %d") is None
+    assert to_prepared_sql("SELECT 'abc' %") is None
+
+
+def test_unsupported_commands_are_rejected():
+    assert to_prepared_sql("CREATE TABLE t (id INT)") is None
+    assert to_prepared_sql("LISTEN audit_events") is None
+    assert to_prepared_sql("COPY patients FROM STDIN", interpolated=False) is None
+
+
+def test_quote_inside_literal_toggles_correctly():
+    sql, count = to_prepared_sql("SELECT 'it''s' AS x, %s AS y")
+    assert sql == "SELECT 'it''s' AS x, $1 AS y"
+    assert count == 1
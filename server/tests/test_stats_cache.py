@@ -0,0 +1,83 @@
+"""
+Cached aggregates: a failed refresh serves the cached value with 200
+"""
+import time
+from contextlib import contextmanager
+
+import psycopg2
+import pytest
+
+from app import create_app
+from app.utils import auth, database
+from app.utils.auth import generate_token
+from app.utils.cache import stats_cache
+
+
+class _FailingCursor:
+    def __init__(self, conn):
+        self.connection = conn
+
+    def execute(self, query, params=None):
+        raise psycopg2.OperationalError('server closed the connection unexpectedly')
+
+    def close(self):
+        pass
+
+
+class _FailingConnection:
+    closed = False
+
+    def cursor(self):
+        return _FailingCursor(self)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class _FailingPool:
+    """Every statement fails, on request-bound and own connections alike"""
+
+    def getconn(self, timeout=None):
+        return _FailingConnection()
+
+    def putconn(self, conn, close=False):
+        pass
+
+    @contextmanager
+    def connection(self, timeout=None):
+        yield _FailingConnection()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app = create_app()
+    monkeypatch.setattr(database, 'get_pool', lambda: _FailingPool())
+    monkeypatch.setattr(auth.revocations, 'is_revoked', lambda jti: False)
+    stats_cache.invalidate()
+    yield app.test_client()
+    stats_cache.invalidate()
+
+
+def _warm_then_expire(key, value):
+    """Cache `value` under `key`, then age it past ttl but within stale_ttl"""
+    stats_cache.get(key, lambda: value)
+    stats_cache._entries[key].loaded_at = time.monotonic() - stats_cache.ttl - 1
+
+
+@pytest.mark.parametrize('path, key, field, value', [
+    ('/api/appointments/stats', 'appointments.stats', 'stats',
+     {'by_status': [{'status': 'Scheduled', 'count': 3}], 'today': 1, 'upcoming': 3}),
+    ('/api/dashboard/role-distribution', 'dashboard.role_distribution', 'data',
+     [{'name': 'Admin', 'value': 1}]),
+])
+def test_failed_refresh_serves_stale_value(client, path, key, field, value):
+    _warm_then_expire(key, value)
+    token = generate_token(1, 'admin', 1, 'Admin')
+
+    response = client.get(path, headers={'Authorization': f'Bearer {token}'})
+
+    assert response.status_code == 200
+    assert response.get_json()[field] == value